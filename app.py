@@ -2,6 +2,8 @@ from dash import Dash, html, dcc
 import dash
 import dash_bootstrap_components as dbc
 
+from utils.server_utils import install_compression, install_layout_cache
+
 app = Dash(
     __name__,
     use_pages=True,
@@ -11,6 +13,11 @@ app = Dash(
 
 server = app.server
 
+# Large callback responses are compressed
+install_compression(server)
+# Static page layouts are serialized once and served from memory
+install_layout_cache(server)
+
 # Desired page order
 NAV_ORDER = [
     "Home",
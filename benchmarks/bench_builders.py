@@ -0,0 +1,139 @@
+"""
+Option/row builder benchmarks on full-season inputs.
+
+Compares the old iterrows / per-row split(":") implementations against the
+builders the pages use in utils.layout_utils and utils.math_utils.
+
+    python -m benchmarks.bench_builders
+"""
+import random
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from utils.layout_utils import driver_options, dropdown_options, table_rows
+from utils.math_utils import parse_lap_times
+from utils.season_utils import SeasonStandings
+
+ROUNDS = 24
+DRIVERS = 20
+REPEAT = 20
+
+# ---------------------------------------------------------
+# SYNTHETIC SEASON
+# ---------------------------------------------------------
+def season_results():
+    """One session.results-like frame per round."""
+    codes = [f"D{i:02d}" for i in range(DRIVERS)]
+    return {
+        f"Round {r}": pd.DataFrame({
+            "Abbreviation": codes,
+            "FullName": [f"Driver {c}" for c in codes],
+            "LastName": [f"Last{c}" for c in codes],
+            "DriverNumber": [str(i + 1) for i in range(DRIVERS)],
+            "Position": np.random.permutation(DRIVERS) + 1,
+        })
+        for r in range(1, ROUNDS + 1)
+    }
+
+
+def standings_results(results):
+    """The same season as the long-form table SeasonStandings is built from."""
+    return pd.DataFrame([
+        {
+            "round": r, "race": name, "kind": "race", "code": row["Abbreviation"],
+            "driver": row["FullName"], "team": "Team", "position": int(row["Position"]),
+            "points": 0.0, "status": "Finished",
+        }
+        for r, (name, df) in enumerate(results.items(), start=1)
+        for _, row in df.iterrows()
+    ])
+
+
+def lap_time_strings(n):
+    return [
+        f"{random.randint(1, 2)}:{random.uniform(0, 59.999):06.3f}" if random.random() > 0.05 else None
+        for _ in range(n)
+    ]
+
+
+def schedule_frame():
+    return pd.DataFrame({
+        "RoundNumber": np.arange(1, ROUNDS + 1),
+        "EventName": [f"Grand Prix {r}" for r in range(1, ROUNDS + 1)],
+        "OfficialEventName": [f"FORMULA 1 GRAND PRIX {r} 2025" for r in range(1, ROUNDS + 1)],
+    })
+
+
+# ---------------------------------------------------------
+# PREVIOUS IMPLEMENTATIONS
+# ---------------------------------------------------------
+def extract_drivers_loop(results):
+    drivers = {}
+    for df in results.values():
+        for _, r in df.iterrows():
+            drivers[r["Abbreviation"]] = r["FullName"]
+    return [{"label": f"{v} ({k})", "value": k} for k, v in sorted(drivers.items())]
+
+
+def schedule_options_loop(schedule):
+    return [
+        {"label": row["OfficialEventName"], "value": int(row["RoundNumber"])}
+        for _, row in schedule.iterrows()
+    ]
+
+
+def schedule_options_vectorized(schedule):
+    return dropdown_options(schedule, "OfficialEventName", schedule["RoundNumber"].astype(int))
+
+
+def lap_times_loop(times):
+    return [
+        int(t.split(":")[0]) * 60 + float(t.split(":")[1]) if ":" in t else float(t)
+        for t in times if t
+    ]
+
+
+def result_rows_loop(results):
+    return [
+        {"pos": int(r["Position"]), "driver": r["FullName"], "number": r["DriverNumber"]}
+        for df in results.values()
+        for _, r in df.iterrows()
+    ]
+
+
+def result_rows_vectorized(results):
+    df = pd.concat(results.values())
+    return table_rows(df, {"pos": "Position", "driver": "FullName", "number": "DriverNumber"})
+
+
+# ---------------------------------------------------------
+# RUN
+# ---------------------------------------------------------
+def bench(name, old, new):
+    t_old = min(timeit.repeat(old, number=1, repeat=REPEAT))
+    t_new = min(timeit.repeat(new, number=1, repeat=REPEAT))
+    print(f"{name:<22} {t_old * 1e3:9.2f} ms {t_new * 1e3:9.2f} ms {t_old / t_new:7.1f}x")
+
+
+def main():
+    results = season_results()
+    standings = SeasonStandings(2025, standings_results(results))
+    schedule = schedule_frame()
+    times = lap_time_strings(ROUNDS * DRIVERS * 60)
+
+    assert extract_drivers_loop(results) == driver_options(standings.driver_names)
+    assert schedule_options_loop(schedule) == schedule_options_vectorized(schedule)
+    parsed = parse_lap_times(times)
+    assert np.allclose(lap_times_loop(times), parsed[~np.isnan(parsed)])
+
+    print(f"{'builder':<22} {'loop':>12} {'current':>12} {'speedup':>8}")
+    bench("driver options", lambda: extract_drivers_loop(results), lambda: driver_options(standings.driver_names))
+    bench("schedule options", lambda: schedule_options_loop(schedule), lambda: schedule_options_vectorized(schedule))
+    bench("result rows", lambda: result_rows_loop(results), lambda: result_rows_vectorized(results))
+    bench("lap time parsing", lambda: lap_times_loop(times), lambda: parse_lap_times(times))
+
+
+if __name__ == "__main__":
+    main()
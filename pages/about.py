@@ -1,6 +1,6 @@
 from dash import html, register_page
 
-register_page(__name__, path="/about", name="About")
+register_page(__name__, path="/about", name="About", cache_layout=True)
 
 layout = html.Div(
     [
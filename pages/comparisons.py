@@ -1,19 +1,30 @@
-from dash import html, dcc, register_page, callback, Input, Output
+from dash import html, dcc, register_page, callback, Input, Output, State, Patch, no_update
 from dash.exceptions import PreventUpdate
-import fastf1
-import fastf1.plotting
 import plotly.graph_objects as go
-import os
 
-register_page(__name__, path="/comparisons", name="Comparisons")
+from utils.cache_utils import (
+    lap_telemetry,
+    sector_stats,
+    session_laps,
+    session_results,
+    telemetry_index,
+    track_segments,
+)
+from utils.layout_utils import dropdown_options
+from utils.plot_utils import (
+    TRACK_FASTEST,
+    TRACK_GEAR,
+    TRACK_SPEED,
+    diff_figure,
+    track_map_figure,
+    track_map_marker,
+)
+from utils.schedule_utils import season_schedule
+from utils.season_utils import current_season, season_options
+from utils.telemetry_utils import BEST_ON_COMPOUND, FASTEST_LAP, SPECIFIC_LAP
+from utils.track_utils import MINI_SECTOR, lap_values_at, segment_leaders
 
-# -------------------------------------------------------
-# Cache Setup
-# -------------------------------------------------------
-cache_path = os.path.join(os.path.dirname(__file__), "..", "cache")
-cache_path = os.path.abspath(cache_path)
-os.makedirs(cache_path, exist_ok=True)
-fastf1.Cache.enable_cache(cache_path)
+register_page(__name__, path="/comparisons", name="Comparisons")
 
 
 # -------------------------------------------------------
@@ -31,6 +42,87 @@ def make_dark(fig):
     return fig
 
 
+# -------------------------------------------------------
+# Chart Definitions
+# -------------------------------------------------------
+# graph id, title, y-axis title, telemetry channel (None = lap times), name suffix
+CHART_SPECS = [
+    ("cmp-lap", "Lap Time Comparison", "Lap Time (sec)", None, ""),
+    ("cmp-speed", "Speed Trace ({lap})", "Speed (km/h)", "Speed", " Speed"),
+    ("cmp-throttle", "Throttle Comparison", "Throttle (%)", "Throttle", ""),
+    ("cmp-brake", "Brake Comparison", "Brake (boolean)", "Brake", ""),
+    ("cmp-gear", "Gear Comparison", "Gear", "nGear", ""),
+]
+
+# Horizontal legend used by the telemetry charts
+TELEMETRY_LEGEND = dict(
+    orientation="h",   # horizontal legend
+    yanchor="bottom",
+    y=1.05,
+    xanchor="center",
+    x=0.5,
+    bgcolor="rgba(0,0,0,0)"  # keep transparent (matches your theme)
+)
+
+
+COMPOUNDS = ["SOFT", "MEDIUM", "HARD", "INTERMEDIATE", "WET"]
+
+LAP_OPTIONS = (
+    [{"label": "Fastest lap", "value": FASTEST_LAP}]
+    + [{"label": f"Best {c.title()} lap", "value": BEST_ON_COMPOUND + c} for c in COMPOUNDS]
+    + [{"label": "Specific lap", "value": SPECIFIC_LAP}]
+)
+
+
+TRACK_MAP_MODES = [
+    {"label": "Speed", "value": TRACK_SPEED},
+    {"label": "Gear", "value": TRACK_GEAR},
+    {"label": "Fastest per mini-sector", "value": TRACK_FASTEST},
+]
+
+
+def lap_label(choice, lap_number):
+    if choice == SPECIFIC_LAP:
+        return f"Lap {lap_number}"
+    if choice.startswith(BEST_ON_COMPOUND):
+        return f"Best {choice[len(BEST_ON_COMPOUND):].title()} Lap"
+    return "Fastest Lap"
+
+
+def comparison_trace(year, gp, session_type, driver, channel, suffix, choice, lap_number):
+    name, laps, lap_no, tel = lap_telemetry(
+        year, gp, session_type, driver, choice, lap_number
+    )
+
+    if channel is None:
+        return go.Scatter(
+            x=laps["LapNumber"],
+            y=laps["LapTime"].dt.total_seconds(),
+            mode="lines+markers",
+            name=f"{name} ({driver})"
+        )
+
+    if tel is None:
+        return go.Scatter(x=[], y=[], name=f"{name} ({driver}) — no lap")
+
+    return go.Scatter(
+        x=tel["Distance"], y=tel[channel],
+        name=f"{name} ({driver}) L{lap_no}{suffix}"
+    )
+
+
+def style_comparison(fig, title, y_title, channel):
+    fig.update_layout(
+        title={"text": title, "x": 0.5, "xanchor": "center"},
+        height=450,
+        xaxis_title="Lap Number" if channel is None else "Distance (m)",
+        yaxis_title=y_title,
+    )
+    if channel is not None:
+        fig.update_layout(legend=TELEMETRY_LEGEND)
+    return make_dark(fig)
+
+
 # -------------------------------------------------------
 # Page Layout (UPDATED)
 # -------------------------------------------------------
@@ -44,8 +136,8 @@ layout = html.Div(
                 dcc.Dropdown(
                     id="year-dropdown",
                     className="custom-dropdown",
-                    options=[{"label": "2025", "value": 2025}],
-                    value=2025,
+                    options=season_options(),
+                    value=current_season(),
                     clearable=False,
                 ),
 
@@ -59,7 +151,7 @@ layout = html.Div(
                 dcc.Dropdown(
                     id="session-dropdown",
                     className="custom-dropdown",
-                    placeholder="Select Session (FP1/FP2/FP3/Qualifying/Race)",
+                    placeholder="Select Session",
                     # style={"width": "260px"}, <-- REMOVED
                 ),
             ],
@@ -78,16 +170,30 @@ layout = html.Div(
         html.Div(
             [
                 dcc.Dropdown(
-                    id="driver1-dropdown",
+                    id="driver-preset",
                     className="custom-dropdown",
-                    placeholder="Select Driver 1",
-                    # style={"width": "260px"}, <-- REMOVED
+                    placeholder="Preset (team / top 5 qualifiers)",
                 ),
                 dcc.Dropdown(
-                    id="driver2-dropdown",
+                    id="drivers-dropdown",
                     className="custom-dropdown",
-                    placeholder="Select Driver 2",
-                    # style={"width": "260px"}, <-- REMOVED
+                    placeholder="Select drivers",
+                    multi=True,
+                ),
+                dcc.Dropdown(
+                    id="lap-select",
+                    className="custom-dropdown",
+                    options=LAP_OPTIONS,
+                    value=FASTEST_LAP,
+                    clearable=False,
+                ),
+                dcc.Input(
+                    id="lap-number",
+                    type="number",
+                    min=1,
+                    placeholder="Lap",
+                    debounce=True,
+                    style={"width": "90px"},
                 ),
             ],
             style={
@@ -96,12 +202,43 @@ layout = html.Div(
                 "justifyContent": "center",
                 "marginTop": "30px",
                 "flexWrap": "wrap", # <-- ADDED FOR RESPONSIVENESS
-                "maxWidth": "600px", # <-- ADDED FOR CENTERING
+                "maxWidth": "900px", # <-- ADDED FOR CENTERING
                 "margin": "30px auto 0 auto", # <-- ADDED FOR CENTERING
             },
         ),
 
-        html.Div(id="comparison-output", style={"marginTop": "40px"}),
+        html.Div(
+            [
+                html.Div(id="comparison-message"),
+                html.Div(
+                    [
+                        dcc.Graph(id=graph_id, className="comparison-chart")
+                        for graph_id, *_ in CHART_SPECS
+                    ] + [
+                        dcc.RadioItems(
+                            id="track-map-mode",
+                            options=TRACK_MAP_MODES,
+                            value=TRACK_SPEED,
+                            inline=True,
+                            style={"textAlign": "center", "color": "white"},
+                            inputStyle={"marginLeft": "16px", "marginRight": "6px"},
+                        ),
+                        dcc.Graph(id="cmp-track", className="comparison-chart"),
+                    ],
+                    id="comparison-graphs",
+                    className="comparison-container",
+                    style={"display": "none"},
+                ),
+            ],
+            id="comparison-output",
+            style={"marginTop": "40px"},
+        ),
+
+        # Trace keys currently rendered in each chart (for partial updates)
+        dcc.Store(id="comparison-keys"),
+
+        # Session and colouring mode the track map was built for
+        dcc.Store(id="track-map-key"),
     ],
     className="comparison-page-container",
 )
@@ -116,12 +253,8 @@ def load_events(year):
         return []
 
     try:
-        events = fastf1.get_event_schedule(year)
-        return [
-            {"label": events.loc[i, "EventName"], "value": events.loc[i, "EventName"]}
-            for i in events.index
-        ]
-    except:
+        return season_schedule(year).name_options
+    except Exception:
         return []
 
 
@@ -137,16 +270,23 @@ def load_sessions(year, gp):
     if not (year and gp):
         return []
 
-    sessions = ["FP1", "FP2", "FP3", "Qualifying", "Race"]
+    # Only sessions held at this event (sprint weekends have no FP2/FP3)
+    try:
+        sessions = season_schedule(year).sessions(gp)
+    except Exception:
+        return []
     return [{"label": s, "value": s} for s in sessions]
 
 
 # -------------------------------------------------------
 # Load Drivers for Session
 # -------------------------------------------------------
+TOP_QUALIFIERS = "top5-quali"
+
+
 @callback(
-    Output("driver1-dropdown", "options"),
-    Output("driver2-dropdown", "options"),
+    Output("drivers-dropdown", "options"),
+    Output("driver-preset", "options"),
     Input("year-dropdown", "value"),
     Input("event-dropdown", "value"),
     Input("session-dropdown", "value"),
@@ -156,212 +296,190 @@ def load_drivers(year, gp, session_type):
         return [], []
 
     try:
-        event = fastf1.get_event(year, gp)
-        session = event.get_session(session_type)
-        session.load()
-
-        results = session.results
-
-        driver_opts = [
-            {
-                "label": f"{row['LastName']} ({row['DriverNumber']})",
-                "value": row["DriverNumber"],
-            }
-            for _, row in results.iterrows()
+        results = session_results(year, gp, session_type)
+
+        driver_opts = dropdown_options(
+            results,
+            results["LastName"] + " (" + results["DriverNumber"] + ")",
+            "DriverNumber",
+        )
+
+        preset_opts = [{"label": "Top 5 qualifiers", "value": TOP_QUALIFIERS}] + [
+            {"label": team, "value": team}
+            for team in results["TeamName"].dropna().unique()
         ]
 
-        return driver_opts, driver_opts
+        return driver_opts, preset_opts
 
     except Exception as e:
         print("Driver load error:", e)
         return [], []
 
 
+@callback(
+    Output("drivers-dropdown", "value"),
+    Input("driver-preset", "value"),
+    State("year-dropdown", "value"),
+    State("event-dropdown", "value"),
+    State("session-dropdown", "value"),
+    prevent_initial_call=True,
+)
+def apply_driver_preset(preset, year, gp, session_type):
+    if not (preset and year and gp and session_type):
+        raise PreventUpdate
+
+    try:
+        if preset == TOP_QUALIFIERS:
+            quali = session_results(year, gp, "Qualifying")
+            return quali.sort_values("Position")["DriverNumber"].head(5).tolist()
+
+        results = session_results(year, gp, session_type)
+        return results.loc[results["TeamName"] == preset, "DriverNumber"].tolist()
+
+    except Exception as e:
+        print("Driver preset error:", e)
+        raise PreventUpdate
+
+
 # -------------------------------------------------------
 # MAIN COMPARISON PLOTS
 # -------------------------------------------------------
 @callback(
-    Output("comparison-output", "children"),
+    *[Output(graph_id, "figure") for graph_id, *_ in CHART_SPECS],
+    Output("comparison-message", "children"),
+    Output("comparison-graphs", "style"),
+    Output("comparison-keys", "data"),
     Input("year-dropdown", "value"),
     Input("event-dropdown", "value"),
     Input("session-dropdown", "value"),
-    Input("driver1-dropdown", "value"),
-    Input("driver2-dropdown", "value"),
+    Input("drivers-dropdown", "value"),
+    Input("lap-select", "value"),
+    Input("lap-number", "value"),
+    State("comparison-keys", "data"),
 )
-def update_comparisons(year, gp, session_type, d1, d2):
-    if not (year and gp and session_type and d1 and d2):
+def update_comparisons(year, gp, session_type, drivers, choice, lap_number, rendered):
+    if not (year and gp and session_type and drivers):
+        raise PreventUpdate
+    if choice == SPECIFIC_LAP and not lap_number:
         raise PreventUpdate
 
-    try:
-        event = fastf1.get_event(year, gp)
-        ses = event.get_session(session_type)
-        ses.load(telemetry=True, laps=True, weather=False)
+    unchanged = [no_update] * len(CHART_SPECS)
 
-        laps = ses.laps
+    try:
+        # The session and its per-lap telemetry index are built once; any
+        # lap of any driver afterwards is a slice of the memory-mapped arrays
+        telemetry_index(year, gp, session_type)
+        laps = session_laps(year, gp, session_type)
+
+        if any(laps.pick_drivers(d).empty for d in drivers):
+            return (
+                *unchanged,
+                html.P("⚠️ No usable lap data available for one or more drivers."),
+                {"display": "none"},
+                None,
+            )
 
-        laps1 = laps.pick_driver(d1)
-        laps2 = laps.pick_driver(d2)
+    except Exception as e:
+        return (
+            *unchanged,
+            html.P(f"⚠️ Not enough data for this session. Error: {str(e)}"),
+            {"display": "none"},
+            None,
+        )
 
-        if laps1.empty or laps2.empty:
-            return html.P("⚠️ No usable lap data available for one or both drivers.")
+    # ----------------------------------------------------
+    # ONE FIGURE PER CHANNEL, ONLY CHANGED TRACES ARE SENT
+    # ----------------------------------------------------
+    rendered = rendered or {}
+    figures, keys = [], {}
+    selection = f"{choice}|{lap_number if choice == SPECIFIC_LAP else ''}"
+
+    for graph_id, title, y_title, channel, suffix in CHART_SPECS:
+        title = title.format(lap=lap_label(choice, lap_number))
+        keys[graph_id] = [
+            f"{year}|{gp}|{session_type}|{d}" + ("" if channel is None else f"|{selection}")
+            for d in drivers
+        ]
 
-        # Get telemetry for fastest laps
-        tel1 = laps1.pick_fastest().get_telemetry()
-        tel2 = laps2.pick_fastest().get_telemetry()
+        figures.append(diff_figure(
+            rendered.get(graph_id),
+            keys[graph_id],
+            lambda i, ch=channel, sfx=suffix: comparison_trace(
+                year, gp, session_type, drivers[i], ch, sfx, choice, lap_number
+            ),
+            lambda fig, t=title, y=y_title, ch=channel: style_comparison(fig, t, y, ch),
+            title=title,
+        ))
 
-        # Names for legend
-        name1 = laps1.pick_fastest()["Driver"]
-        name2 = laps2.pick_fastest()["Driver"]
+    return (*figures, None, {"display": "block"}, keys)
 
-    except Exception as e:
-        return html.P(f"⚠️ Not enough data for this session. Error: {str(e)}")
 
-    # ----------------------------------------------------
-    # LAP TIME COMPARISON
-    # ----------------------------------------------------
-    fig_lap = go.Figure()
-    fig_lap.add_trace(go.Scatter(
-        x=laps1["LapNumber"],
-        y=laps1["LapTime"].dt.total_seconds(),
-        mode="lines+markers",
-        name=f"{name1} ({d1})"
-    ))
-    fig_lap.add_trace(go.Scatter(
-        x=laps2["LapNumber"],
-        y=laps2["LapTime"].dt.total_seconds(),
-        mode="lines+markers",
-        name=f"{name2} ({d2})"
-    ))
-    fig_lap.update_layout(
-        title={"text":"Lap Time Comparison", "x": 0.5, "xanchor": "center"},
-        height=450,
-        xaxis_title="Lap Number",
-        yaxis_title="Lap Time (sec)"
-    )
-    fig_lap = make_dark(fig_lap)
+# -------------------------------------------------------
+# TRACK MAP
+# -------------------------------------------------------
+@callback(
+    Output("cmp-track", "figure"),
+    Output("track-map-key", "data"),
+    Input("year-dropdown", "value"),
+    Input("event-dropdown", "value"),
+    Input("session-dropdown", "value"),
+    Input("drivers-dropdown", "value"),
+    Input("lap-select", "value"),
+    Input("lap-number", "value"),
+    Input("track-map-mode", "value"),
+    State("track-map-key", "data"),
+)
+def update_track_map(year, gp, session_type, drivers, choice, lap_number, mode, rendered):
+    if not (year and gp and session_type and drivers):
+        raise PreventUpdate
+    if choice == SPECIFIC_LAP and not lap_number:
+        raise PreventUpdate
 
-    # ----------------------------------------------------
-    # SPEED TRACE
-    # ----------------------------------------------------
-    fig_speed = go.Figure()
-    fig_speed.add_trace(go.Scatter(
-        x=tel1["Distance"], y=tel1["Speed"],
-        name=f"{name1} ({d1}) Speed"
-    ))
-    fig_speed.add_trace(go.Scatter(
-        x=tel2["Distance"], y=tel2["Speed"],
-        name=f"{name2} ({d2}) Speed"
-    ))
-    fig_speed.update_layout(
-        title={"text":"Speed Trace (Fastest Lap)", "x": 0.5, "xanchor": "center"},
-        height=450,
-        xaxis_title="Distance (m)",
-        yaxis_title="Speed (km/h)",
-        legend=dict(
-            orientation="h",   # horizontal legend
-            yanchor="bottom",
-            y=1.05,
-            xanchor="center",
-            x=0.5,
-            bgcolor="rgba(0,0,0,0)"  # keep transparent (matches your theme)
-        ),
-    )
-    fig_speed = make_dark(fig_speed)
+    try:
+        segments = track_segments(year, gp, session_type)
+        if segments.outline is None:
+            raise PreventUpdate
 
-    # ----------------------------------------------------
-    # THROTTLE
-    # ----------------------------------------------------
-    fig_throttle = go.Figure()
-    fig_throttle.add_trace(go.Scatter(
-        x=tel1["Distance"], y=tel1["Throttle"],
-        name=f"{name1} ({d1})"
-    ))
-    fig_throttle.add_trace(go.Scatter(
-        x=tel2["Distance"], y=tel2["Throttle"],
-        name=f"{name2} ({d2})"
-    ))
-    fig_throttle.update_layout(
-        title={"text":"Throttle Comparison", "x": 0.5, "xanchor": "center"},
-        height=450,
-        xaxis_title="Distance (m)",
-        yaxis_title="Throttle (%)",
-        legend=dict(
-            orientation="h",   # horizontal legend
-            yanchor="bottom",
-            y=1.05,
-            xanchor="center",
-            x=0.5,
-            bgcolor="rgba(0,0,0,0)"  # keep transparent (matches your theme)
-        ),
-    )
-    fig_throttle = make_dark(fig_throttle)
+        selected = [
+            (driver, *lap_telemetry(year, gp, session_type, driver, choice, lap_number))
+            for driver in drivers
+        ]
+        selected = [(d, name, lap_no, tel) for d, name, _, lap_no, tel in selected if tel is not None]
+        if not selected:
+            raise PreventUpdate
+
+        names = [f"{name} L{lap_no}" for _, name, lap_no, _ in selected]
+
+        if mode == TRACK_FASTEST:
+            leaders = segment_leaders(
+                sector_stats(year, gp, session_type, MINI_SECTOR),
+                [(d, lap_no) for d, _, lap_no, _ in selected],
+                len(segments.edges[MINI_SECTOR]),
+            )
+            values = leaders[segments.assign(segments.outline["Distance"], MINI_SECTOR)]
+            title = "Fastest Driver per Mini-Sector"
+        else:
+            gear = mode == TRACK_GEAR
+            _, _, _, tel = selected[0]
+            values = lap_values_at(segments, tel, "nGear" if gear else "Speed", nearest=gear)
+            title = f"{'Gear' if gear else 'Speed'} – {names[0]}"
+
+    except PreventUpdate:
+        raise
+    except Exception as e:
+        print("Track map error:", e)
+        raise PreventUpdate
 
-    # ----------------------------------------------------
-    # BRAKE
-    # ----------------------------------------------------
-    fig_brake = go.Figure()
-    fig_brake.add_trace(go.Scatter(
-        x=tel1["Distance"], y=tel1["Brake"],
-        name=f"{name1} ({d1})"
-    ))
-    fig_brake.add_trace(go.Scatter(
-        x=tel2["Distance"], y=tel2["Brake"],
-        name=f"{name2} ({d2})"
-    ))
-    fig_brake.update_layout(
-        title={"text":"Brake Comparison", "x": 0.5, "xanchor": "center"},
-        height=450,
-        xaxis_title="Distance (m)",
-        yaxis_title="Brake (boolean)",
-        legend=dict(
-            orientation="h",   # horizontal legend
-            yanchor="bottom",
-            y=1.05,
-            xanchor="center",
-            x=0.5,
-            bgcolor="rgba(0,0,0,0)"  # keep transparent (matches your theme)
-        ),
-    )
-    fig_brake = make_dark(fig_brake)
+    marker = track_map_marker(mode, values, names)
+    key = f"{year}|{gp}|{session_type}|{mode}"
 
-    # ----------------------------------------------------
-    # GEAR
-    # ----------------------------------------------------
-    fig_gear = go.Figure()
-    fig_gear.add_trace(go.Scatter(
-        x=tel1["Distance"], y=tel1["nGear"],
-        name=f"{name1} ({d1})"
-    ))
-    fig_gear.add_trace(go.Scatter(
-        x=tel2["Distance"], y=tel2["nGear"],
-        name=f"{name2} ({d2})"
-    ))
-    fig_gear.update_layout(
-        title={"text":"Gear Comparison", "x": 0.5, "xanchor": "center"},
-        height=450,
-        xaxis_title="Distance (m)",
-        yaxis_title="Gear",
-        legend=dict(
-            orientation="h",   # horizontal legend
-            yanchor="bottom",
-            y=1.05,
-            xanchor="center",
-            x=0.5,
-            bgcolor="rgba(0,0,0,0)"  # keep transparent (matches your theme)
-        ),
-    )
-    fig_gear = make_dark(fig_gear)
+    # Same circuit and mode: only the marker colours are sent
+    if rendered == key:
+        patch = Patch()
+        for prop, value in marker.items():
+            patch["data"][0]["marker"][prop] = value
+        patch["layout"]["title"]["text"] = title
+        return patch, key
 
-    # ----------------------------------------------------
-    # RETURN ALL GRAPHS
-    # ----------------------------------------------------
-    return html.Div(
-        [
-            dcc.Graph(figure=fig_lap, className="comparison-chart"),
-            dcc.Graph(figure=fig_speed, className="comparison-chart"),
-            dcc.Graph(figure=fig_throttle, className="comparison-chart"),
-            dcc.Graph(figure=fig_brake, className="comparison-chart"),
-            dcc.Graph(figure=fig_gear, className="comparison-chart"),
-        ],
-        className="comparison-container",
-    )
\ No newline at end of file
+    fig = track_map_figure(segments.outline, marker, mode, title)
+    return make_dark(fig), key
@@ -1,11 +1,14 @@
 # driver_stats.py
 
-from dash import html, dcc, register_page, callback, Output, Input
+from dash import html, dcc, register_page, callback, Output, Input, State
 import plotly.graph_objects as go
 import pandas as pd
-import fastf1 as ff1
-import os
-from collections import Counter
+
+from utils.cache_utils import driver_insights
+from utils.layout_utils import clientside, driver_options
+from utils.plot_utils import diff_figure
+from utils.schedule_utils import season_schedule
+from utils.season_utils import current_season, season_options, season_standings
 
 # =====================================================
 # Page registration
@@ -13,62 +16,21 @@ from collections import Counter
 register_page(__name__, path="/driver", name="Driver")
 
 # =====================================================
-# FastF1 cache
+# Helpers
 # =====================================================
-CACHE_DIR = "ff1cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-ff1.Cache.enable_cache(CACHE_DIR)
+def empty_figure():
+    return go.Figure().update_layout(
+        template="plotly_dark",
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)"
+    )
 
-# =====================================================
-# Data helpers
-# =====================================================
-def load_season_results(year: int):
-    results = {}
-    try:
-        schedule = ff1.get_event_schedule(year)
-    except Exception:
-        return results
-
-    for _, row in schedule.iterrows():
-        gp = row["EventName"]
-        try:
-            session = ff1.get_session(year, gp, "R")
-            session.load(telemetry=False, weather=False)
-            df = session.results
-            df["GrandPrix"] = gp
-            results[gp] = df.reset_index(drop=True)
-        except Exception:
-            continue
-
-    return results
-
-
-def extract_drivers(results):
-    drivers = {}
-    for df in results.values():
-        for _, r in df.iterrows():
-            drivers[r["Abbreviation"]] = r["FullName"]
-    return [{"label": f"{v} ({k})", "value": k} for k, v in sorted(drivers.items())]
-
-
-def finish_distribution(results, driver):
-    counter = Counter()
-    for df in results.values():
-        row = df[df["Abbreviation"] == driver]
-        if not row.empty:
-            counter[int(row.iloc[0]["Position"])] += 1
-    return counter
-
-
-def cumulative_points(results, driver):
-    races, cumulative, total = [], [], 0
-    for gp, df in results.items():
-        races.append(gp)
-        row = df[df["Abbreviation"] == driver]
-        pts = float(row.iloc[0]["Points"]) if not row.empty else 0
-        total += pts
-        cumulative.append(total)
-    return races, cumulative
+
+def kpi(title, value):
+    return [
+        html.Div(title, className="result-card-title"),
+        html.Div(value, className="result-card-value")
+    ]
 
 
 # =====================================================
@@ -96,8 +58,8 @@ layout = html.Div(
             children=[
                 dcc.Dropdown(
                     id="season-dropdown",
-                    options=[{"label": "2025", "value": 2025}],
-                    value=2025,
+                    options=season_options(),
+                    value=current_season(),
                     clearable=False,
                     className="custom-dropdown"
                 ),
@@ -147,113 +109,237 @@ layout = html.Div(
                     dcc.Graph(id="finish-graph"),
                     className="dash-graph-full"
                 ),
+
+                # ---------- DRIVER INSIGHTS ----------
+                html.H2("Driver Insights", className="driver-name"),
+
+                html.Div(
+                    className="driver-filters",
+                    children=[
+                        dcc.Dropdown(
+                            id="insights-event",
+                            placeholder="Grand Prix",
+                            className="custom-dropdown"
+                        ),
+
+                        dcc.Dropdown(
+                            id="insights-session",
+                            placeholder="Session",
+                            className="custom-dropdown"
+                        ),
+                    ]
+                ),
+
+                html.Div(
+                    className="feature-grid results-summary",
+                    children=[
+                        html.Div(id="kpi-consistency", className="result-card"),
+                        html.Div(id="kpi-throttle", className="result-card"),
+                        html.Div(id="kpi-braking", className="result-card"),
+                    ]
+                ),
+
+                html.Div(
+                    dcc.Graph(id="braking-graph"),
+                    className="dash-graph-full"
+                ),
             ]
         ),
 
-        dcc.Store(id="season-data")
+        # Trace keys currently rendered in each graph (for partial updates)
+        dcc.Store(id="driver-figure-keys")
     ]
 )
 
 # =====================================================
 # Callbacks
 # =====================================================
-@callback(
-    Output("season-data", "data"),
-    Output("driver-dropdown", "options"),
-    Input("season-dropdown", "value"),
-)
+# Drivers come from the cached season standings, like the KPIs
+@callback(Output("driver-dropdown", "options"), Input("season-dropdown", "value"))
 def load_season(season):
     if not season:
-        return {}, []
+        return []
+    return driver_options(season_standings(season).driver_names)
 
-    results = load_season_results(season)
-    drivers = extract_drivers(results)
 
-    return (
-        {gp: df.to_dict("records") for gp, df in results.items()},
-        drivers
-    )
+# Content is shown client-side once a season and a driver are set
+clientside(
+    "show_when_set",
+    Output("driver-content", "style"),
+    Input("season-dropdown", "value"),
+    Input("driver-dropdown", "value"),
+)
 
 
 @callback(
     Output("driver-name", "children"),
-    Output("driver-content", "style"),
     Output("kpi-wins", "children"),
     Output("kpi-podiums", "children"),
     Output("kpi-points", "children"),
     Output("points-graph", "figure"),
     Output("finish-graph", "figure"),
-    Input("season-data", "data"),
+    Output("driver-figure-keys", "data"),
+    Input("season-dropdown", "value"),
     Input("driver-dropdown", "value"),
+    State("driver-figure-keys", "data"),
 )
-def update_dashboard(data, driver):
+def update_dashboard(season, driver, rendered):
 
-    empty_fig = go.Figure().update_layout(
-        template="plotly_dark",
-        paper_bgcolor="rgba(0,0,0,0)",
-        plot_bgcolor="rgba(0,0,0,0)"
-    )
-
-    if not data or not driver:
-        return "Select a driver", {"display": "none"}, "", "", "", empty_fig, empty_fig
+    empty_fig = empty_figure()
 
-    results = {gp: pd.DataFrame(rows) for gp, rows in data.items()}
+    if not season or not driver:
+        return "Select a driver", "", "", "", empty_fig, empty_fig, None
 
-    # KPIs
-    dist = finish_distribution(results, driver)
+    # KPIs, points and gap to leader all come from the cached season standings
+    standings = season_standings(season)
+    dist = standings.finish_distribution(driver)
     wins = dist.get(1, 0)
     podiums = sum(dist.get(p, 0) for p in (1, 2, 3))
-    points_total = sum(
-        float(df[df["Abbreviation"] == driver]["Points"].iloc[0])
-        for df in results.values()
-        if not df[df["Abbreviation"] == driver].empty
-    )
 
-    def kpi(title, value):
-        return [
-            html.Div(title, className="result-card-title"),
-            html.Div(value, className="result-card-value")
-        ]
+    cum_pts, gaps = standings.progression(driver)
+    races = standings.race_names
+    points_total = float(cum_pts[-1]) if len(cum_pts) else 0
 
     # ---------- CUMULATIVE POINTS ----------
-    races, cum_pts = cumulative_points(results, driver)
-    fig_points = go.Figure(
-        go.Scatter(
+    rendered = rendered or {}
+    keys = [f"{season}|{standings.state}|{driver}"]
+
+    fig_points = diff_figure(
+        rendered.get("points-graph"),
+        keys,
+        lambda _: go.Scatter(
             x=races,
             y=cum_pts,
+            customdata=gaps,
             mode="lines+markers",
             line=dict(width=3),
-            marker=dict(size=7)
-        )
-    ).update_layout(
-        title="Cumulative Season Points",
-        template="plotly_dark",
-        height=520,
-        margin=dict(l=70, r=40, t=70, b=140),
-        xaxis_tickangle=-30
+            marker=dict(size=7),
+            hovertemplate="%{x}<br>%{y:g} pts (-%{customdata:g} to leader)<extra></extra>"
+        ),
+        lambda fig: fig.update_layout(
+            title="Cumulative Season Points",
+            template="plotly_dark",
+            height=520,
+            margin=dict(l=70, r=40, t=70, b=140),
+            xaxis_tickangle=-30
+        ),
     )
 
     # ---------- FINISH DISTRIBUTION ----------
-    fig_finish = go.Figure(
-        go.Bar(
+    fig_finish = diff_figure(
+        rendered.get("finish-graph"),
+        keys,
+        lambda _: go.Bar(
             x=list(dist.values()),
             y=[f"P{p}" for p in dist.keys()],
             orientation="h"
-        )
-    ).update_layout(
-        title="Finish Position Distribution",
-        template="plotly_dark",
-        height=520,
-        margin=dict(l=90, r=40, t=70, b=60),
-        yaxis=dict(categoryorder="category ascending")
+        ),
+        lambda fig: fig.update_layout(
+            title="Finish Position Distribution",
+            template="plotly_dark",
+            height=520,
+            margin=dict(l=90, r=40, t=70, b=60),
+            yaxis=dict(categoryorder="category ascending")
+        ),
     )
 
     return (
         driver,
-        {"display": "block"},
         kpi("Wins", wins),
         kpi("Podiums", podiums),
         kpi("Points", int(points_total)),
         fig_points,
-        fig_finish
+        fig_finish,
+        {"points-graph": keys, "finish-graph": keys}
+    )
+
+
+# =====================================================
+# Driver insights
+# =====================================================
+@callback(Output("insights-event", "options"), Input("season-dropdown", "value"))
+def load_insight_events(season):
+    if not season:
+        return []
+
+    try:
+        return season_schedule(season).name_options
+    except Exception:
+        return []
+
+
+@callback(
+    Output("insights-session", "options"),
+    Input("season-dropdown", "value"),
+    Input("insights-event", "value"),
+)
+def load_insight_sessions(season, gp):
+    if not (season and gp):
+        return []
+
+    try:
+        sessions = season_schedule(season).sessions(gp)
+    except Exception:
+        return []
+    return [{"label": s, "value": s} for s in sessions]
+
+
+@callback(
+    Output("kpi-consistency", "children"),
+    Output("kpi-throttle", "children"),
+    Output("kpi-braking", "children"),
+    Output("braking-graph", "figure"),
+    Input("insights-event", "value"),
+    Input("insights-session", "value"),
+    Input("driver-dropdown", "value"),
+    State("season-dropdown", "value"),
+)
+def update_insights(gp, session_type, driver, season):
+    blank = (
+        kpi("Consistency", "–"),
+        kpi("Full throttle", "–"),
+        kpi("Braking spread", "–"),
+        empty_figure(),
+    )
+    if not (season and gp and session_type and driver):
+        return blank
+
+    # Computed once per session for every driver, then served from cache
+    try:
+        drivers, corners = driver_insights(season, gp, session_type)
+    except Exception as e:
+        print(f"Insights failed for {season} {gp} {session_type}:", e)
+        return blank
+
+    row = drivers[drivers["Driver"] == driver]
+    if row.empty:
+        return blank
+    row = row.iloc[0]
+
+    def fmt(value, spec):
+        return "–" if pd.isna(value) else format(value, spec)
+
+    mine = corners[corners["Driver"] == driver]
+    fig = go.Figure(go.Bar(
+        x=[f"T{c}" for c in mine["Corner"]],
+        y=mine["BrakeSpread"],
+        customdata=mine[["BrakePoint", "Laps"]].to_numpy(),
+        hovertemplate=(
+            "%{x}: ±%{y:.0f} m<br>brakes %{customdata[0]:.0f} m before apex"
+            "<br>%{customdata[1]} laps<extra></extra>"
+        ),
+    )).update_layout(
+        title=f"Braking Point Spread per Corner – {gp} {session_type}",
+        template="plotly_dark",
+        height=420,
+        margin=dict(l=70, r=40, t=70, b=60),
+        yaxis_title="Spread (m)"
+    )
+
+    return (
+        kpi(f"Consistency ({int(row['CleanLaps'])} clean laps)",
+            f"{fmt(row['LapTimeCV'], '.2f')}% / ±{fmt(row['LapTimeStd'], '.3f')}s"),
+        kpi("Full throttle", f"{fmt(row['FullThrottlePct'], '.1f')}%"),
+        kpi("Braking spread", f"±{fmt(row['BrakeSpread'], '.0f')} m"),
+        fig,
     )
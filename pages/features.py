@@ -1,6 +1,6 @@
 from dash import html, register_page, dcc
 
-register_page(__name__, path="/features", name="Features")
+register_page(__name__, path="/features", name="Features", cache_layout=True)
 
 
 # ----------------------- Feature Definitions -----------------------
@@ -1,6 +1,6 @@
 from dash import html, register_page
 
-register_page(__name__, path="/", name="Home")
+register_page(__name__, path="/", name="Home", cache_layout=True)
 
 layout = html.Div(
     [
@@ -1,6 +1,9 @@
-import fastf1 as ff1
+import time
+import uuid
+
+import dash_bootstrap_components as dbc
 import pandas as pd
-import plotly.express as px
+import plotly.graph_objects as go
 
 from dash import (
     html,
@@ -8,10 +11,41 @@ from dash import (
     callback,
     Input,
     Output,
+    State,
+    Patch,
+    no_update,
     register_page
 )
 from dash.exceptions import PreventUpdate
 
+from utils.cache_utils import (
+    get_race_session,
+    race_gaps,
+    race_positions,
+    race_replay,
+    race_stints,
+    session_laps,
+    track_segments,
+)
+from utils.layout_utils import clientside
+from utils.live_utils import LIVE_SESSIONS, live_session
+from utils.math_utils import position_changes
+from utils.plot_utils import (
+    BOX_STAT_KEYS,
+    gap_traces,
+    position_trace,
+    position_traces,
+    replay_figure,
+    stint_figure,
+    summary_box_figure,
+    summary_box_trace,
+    summary_violin_figure,
+    violin_traces,
+)
+from utils.replay_utils import CHUNK_FRAMES, REPLAY_HZ
+from utils.schedule_utils import season_schedule
+from utils.season_utils import season_options
+
 # -------------------------------------------------
 # DASH PAGE REGISTRATION
 # -------------------------------------------------
@@ -21,12 +55,34 @@ register_page(
     name="Race"
 )
 
+NAVBAR_COLOR = "#00e6c3"
+
+# Live (replay) mode polling interval
+LIVE_POLL_MS = 2000
+
+# Race replay playback speeds (frames advanced per clock tick)
+REPLAY_SPEEDS = [1, 4, 16]
+
 # -------------------------------------------------
-# FASTF1 CACHE
+# HELPERS
 # -------------------------------------------------
-ff1.Cache.enable_cache("./fastf1_cache")
+def style_race_figure(fig, title, xaxis_title, yaxis_title):
+    fig.update_layout(
+        title={
+            "text": title,
+            "x": 0.5,
+            "xanchor": "center",
+            "font": {"size": 18, "color": NAVBAR_COLOR},
+        },
+        xaxis_title=xaxis_title,
+        yaxis_title=yaxis_title,
+        showlegend=False,
+        margin=dict(t=70),
+        plot_bgcolor="rgb(0,0,0)",
+        paper_bgcolor="rgb(0,0,0)",
+    )
+    return fig
 
-NAVBAR_COLOR = "#00e6c3"
 
 # -------------------------------------------------
 # LAYOUT
@@ -49,7 +105,7 @@ layout = html.Div(
             [
                 dcc.Dropdown(
                     id="rs-season",
-                    options=[{"label": "2025", "value": 2025}],
+                    options=season_options(),
                     value=None,
                     placeholder="Select season",
                     clearable=True,
@@ -66,6 +122,13 @@ layout = html.Div(
                     className="custom-dropdown",
                     style={"flex": "1 1 48%", "minWidth": "360px"},
                 ),
+
+                dcc.Checklist(
+                    id="rs-live-mode",
+                    options=[{"label": " Live", "value": "live"}],
+                    value=[],
+                    style={"alignSelf": "center", "whiteSpace": "nowrap"},
+                ),
             ],
             className="race-controls",
             style={
@@ -96,6 +159,69 @@ layout = html.Div(
             dcc.Graph(id="rs-team-pace", className="dash-graph-full"),
             style={"marginTop": "26px"}
         ),
+
+        # -------------------------------
+        # ROW 3
+        # -------------------------------
+        html.Div(
+            dcc.Graph(id="rs-gaps", className="dash-graph-full"),
+            style={"marginTop": "26px"}
+        ),
+
+        # -------------------------------
+        # ROW 4
+        # -------------------------------
+        html.Div(
+            dcc.Graph(id="rs-stints", className="dash-graph-full"),
+            style={"marginTop": "26px"}
+        ),
+
+        # -------------------------------
+        # ROW 5: RACE REPLAY
+        # -------------------------------
+        html.Div(
+            html.Div(
+                [
+                    html.Div(
+                        [
+                            dbc.Button("Load replay", id="rs-replay-load", color="secondary"),
+                            dbc.Button("Play", id="rs-replay-play", color="secondary", disabled=True),
+                            dcc.RadioItems(
+                                id="rs-replay-speed",
+                                options=[{"label": f" {s}x", "value": s} for s in REPLAY_SPEEDS],
+                                value=REPLAY_SPEEDS[1],
+                                inline=True,
+                                inputStyle={"marginLeft": "12px"},
+                            ),
+                            html.Span(id="rs-replay-time"),
+                        ],
+                        style={"display": "flex", "gap": "16px", "alignItems": "center"},
+                    ),
+                    dcc.Slider(
+                        id="rs-replay-seek",
+                        min=0,
+                        max=0,
+                        step=1,
+                        value=0,
+                        marks=None,
+                        updatemode="mouseup",
+                    ),
+                    dcc.Graph(id="rs-replay", className="dash-graph-full"),
+                ],
+                style={"maxWidth": "1200px", "margin": "26px auto 0 auto"},
+            ),
+            id="rs-replay-section",
+        ),
+        dcc.Interval(id="rs-replay-clock", interval=1000 // REPLAY_HZ, disabled=True),
+        dcc.Store(id="rs-replay-meta"),
+        dcc.Store(id="rs-replay-request"),
+        dcc.Store(id="rs-replay-chunk"),
+
+        # -------------------------------
+        # LIVE MODE
+        # -------------------------------
+        dcc.Interval(id="rs-live-interval", interval=LIVE_POLL_MS, disabled=True),
+        dcc.Store(id="rs-live-state"),
     ],
     className="race-page",
 )
@@ -112,15 +238,10 @@ def update_gp_dropdown(season):
     if not season:
         return [], None
 
-    schedule = ff1.get_event_schedule(season, include_testing=False)
-    schedule = schedule.sort_values("RoundNumber")
-
-    options = [
-        {"label": row["OfficialEventName"], "value": int(row["RoundNumber"])}
-        for _, row in schedule.iterrows()
-    ]
-
-    return options, None
+    try:
+        return season_schedule(season).official_options, None
+    except Exception:
+        return [], None
 
 
 # -------------------------------------------------
@@ -130,23 +251,25 @@ def update_gp_dropdown(season):
     Output("rs-laptime-dist", "figure"),
     Output("rs-position-changes", "figure"),
     Output("rs-team-pace", "figure"),
+    Output("rs-gaps", "figure"),
+    Output("rs-stints", "figure"),
     Input("rs-season", "value"),
     Input("rs-gp", "value"),
+    Input("rs-live-mode", "value"),
 )
-def update_race_plots(season, round_no):
+def update_race_plots(season, round_no, live_mode):
 
-    if not season or not round_no:
+    if not season or not round_no or live_mode:
         raise PreventUpdate
 
-    session = ff1.get_session(season, round_no, "R")
-    session.load(laps=True, telemetry=False, weather=False)
+    session = get_race_session(season, round_no)
 
     laps = session.laps
 
     # =================================================
     # LAP TIME DISTRIBUTION (TOP 10 DRIVERS)
     # =================================================
-    quicklaps = laps.pick_quicklaps().dropna(subset=["LapTime"])
+    quicklaps = laps.pick_quicklaps().dropna(subset=["LapTime"]).copy()
     quicklaps["LapTime_s"] = quicklaps["LapTime"].dt.total_seconds()
 
     top_drivers = (
@@ -158,61 +281,29 @@ def update_race_plots(season, round_no):
         .tolist()
     )
 
-    dist_df = quicklaps[quicklaps["Driver"].isin(top_drivers)]
-
-    fig_dist = px.violin(
-        dist_df,
-        x="Driver",
-        y="LapTime_s",
-        box=True,
-        points=False,
+    # Quartiles and KDEs are computed server-side and shipped as
+    # precomputed traces instead of raw lap samples
+    by_driver = quicklaps.groupby("Driver")["LapTime_s"]
+    fig_dist = summary_violin_figure(
+        {drv: by_driver.get_group(drv).to_numpy() for drv in top_drivers},
         height=420,
     )
 
-    fig_dist.update_layout(
-        title={
-            "text": "Lap Time Distribution (Top 10 Drivers)",
-            "x": 0.5,
-            "xanchor": "center",
-            "font": {"size": 18, "color": NAVBAR_COLOR},
-        },
-        xaxis_title="Driver",
-        yaxis_title="Lap Time (s)",
-        showlegend=False,
-        margin=dict(t=70),
-        plot_bgcolor="rgb(0,0,0)",
-        paper_bgcolor="rgb(0,0,0)",
-    )
+    style_race_figure(fig_dist, "Lap Time Distribution (Top 10 Drivers)", "Driver", "Lap Time (s)")
 
     # =================================================
     # POSITION CHANGES
     # =================================================
-    pos_df = laps.dropna(subset=["Position"])
+    pm = race_positions(season, round_no)
 
-    fig_pos = px.line(
-        pos_df,
-        x="LapNumber",
-        y="Position",
-        color="Driver",
-        height=420,
+    fig_pos = go.Figure(
+        position_traces(pm, position_changes(pm["positions"]))
     )
+    fig_pos.update_layout(height=420)
 
     fig_pos.update_yaxes(autorange="reversed")
 
-    fig_pos.update_layout(
-        title={
-            "text": "Position Changes Over Race",
-            "x": 0.5,
-            "xanchor": "center",
-            "font": {"size": 18, "color": NAVBAR_COLOR},
-        },
-        xaxis_title="Lap",
-        yaxis_title="Position",
-        showlegend=False,
-        margin=dict(t=70),
-        plot_bgcolor="rgb(0,0,0)",
-        paper_bgcolor="rgb(0,0,0)",
-    )
+    style_race_figure(fig_pos, "Position Changes Over Race", "Lap", "Position")
 
     # =================================================
     # TEAM PACE
@@ -225,53 +316,267 @@ def update_race_plots(season, round_no):
         .tolist()
     )
 
-    fig_team = px.box(
-        quicklaps,
-        x="Team",
-        y="LapTime_s",
+    by_team = quicklaps.groupby("Team")["LapTime_s"]
+    fig_team = summary_box_figure(
+        {team: by_team.get_group(team).to_numpy() for team in team_order},
         height=420,
     )
 
     fig_team.update_xaxes(categoryorder="array", categoryarray=team_order)
 
-    fig_team.update_layout(
-        title={
-            "text": "Team Pace (Median Lap Time)",
-            "x": 0.5,
-            "xanchor": "center",
-            "font": {"size": 18, "color": NAVBAR_COLOR},
-        },
-        xaxis_title="Team",
-        yaxis_title="Lap Time (s)",
-        showlegend=False,
-        margin=dict(t=70),
-        plot_bgcolor="rgb(0,0,0)",
-        paper_bgcolor="rgb(0,0,0)",
+    style_race_figure(fig_team, "Team Pace (Median Lap Time)", "Team", "Lap Time (s)")
+
+    # =================================================
+    # GAPS TO LEADER
+    # =================================================
+    fig_gaps = go.Figure(gap_traces(race_gaps(season, round_no), pm["drivers"]))
+    fig_gaps.update_layout(height=420)
+    style_race_figure(fig_gaps, "Gap to Leader Over Race", "Lap", "Gap (s)")
+
+    # =================================================
+    # TYRE STINTS
+    # =================================================
+    fig_stint = stint_figure(race_stints(season, round_no), pm["drivers"])
+    style_race_figure(fig_stint, "Tyre Stints & Degradation", "Lap", "Driver")
+    fig_stint.update_layout(showlegend=True)
+
+    return fig_dist, fig_pos, fig_team, fig_gaps, fig_stint
+
+
+# -------------------------------------------------
+# LIVE MODE: START / STOP
+# -------------------------------------------------
+@callback(
+    Output("rs-laptime-dist", "figure", allow_duplicate=True),
+    Output("rs-position-changes", "figure", allow_duplicate=True),
+    Output("rs-team-pace", "figure", allow_duplicate=True),
+    Output("rs-live-state", "data"),
+    Output("rs-live-interval", "disabled"),
+    Input("rs-live-mode", "value"),
+    Input("rs-season", "value"),
+    Input("rs-gp", "value"),
+    State("rs-live-state", "data"),
+    prevent_initial_call=True,
+)
+def start_live_session(live_mode, season, round_no, state):
+    if state:
+        LIVE_SESSIONS.pop(state["id"], None)
+
+    if not (live_mode and season and round_no):
+        return no_update, no_update, no_update, None, True
+
+    # A recorded race replayed over time stands in for the live timing feed
+    live_id = uuid.uuid4().hex
+
+    fig_dist = style_race_figure(
+        go.Figure().update_layout(height=420),
+        "Lap Time Distribution (Live)", "Driver", "Lap Time (s)",
+    )
+    fig_pos = style_race_figure(
+        go.Figure().update_layout(height=420),
+        "Position Changes Over Race (Live)", "Lap", "Position",
+    )
+    fig_pos.update_yaxes(autorange="reversed")
+    fig_team = style_race_figure(
+        go.Figure(summary_box_trace([], [])).update_layout(height=420),
+        "Team Pace (Live)", "Team", "Lap Time (s)",
     )
 
-    return fig_dist, fig_pos, fig_team
+    # Everything a worker needs to rebuild the session lives in the Store
+    state = {
+        "id": live_id, "season": season, "round": round_no,
+        "started": time.time(), "cursor": 0,
+        "positions": [], "drivers": [], "teams": [],
+    }
+    return fig_dist, fig_pos, fig_team, state, False
 
 
 # -------------------------------------------------
-# 🔹 ONLY ADDITION: HIDE GRAPHS UNTIL RACE IS SELECTED
+# LIVE MODE: INCREMENTAL UPDATES
 # -------------------------------------------------
 @callback(
+    Output("rs-laptime-dist", "figure", allow_duplicate=True),
+    Output("rs-position-changes", "figure", allow_duplicate=True),
+    Output("rs-team-pace", "figure", allow_duplicate=True),
+    Output("rs-live-state", "data", allow_duplicate=True),
+    Output("rs-live-interval", "disabled", allow_duplicate=True),
+    Input("rs-live-interval", "n_intervals"),
+    State("rs-live-state", "data"),
+    prevent_initial_call=True,
+)
+def poll_live_session(_, state):
+    if not state or "cursor" not in state:
+        return no_update, no_update, no_update, no_update, True
+
+    live = live_session(
+        state["id"],
+        lambda: get_race_session(state["season"], state["round"]).laps,
+        state["started"],
+        state["cursor"],
+    )
+    race = live.race
+    sent = {drv: len(series) for drv, series in race.positions.items()}
+
+    new_laps = live.feed.poll()
+    if new_laps.empty:
+        if live.feed.finished:
+            return no_update, no_update, no_update, no_update, True
+        raise PreventUpdate
+
+    state["cursor"] = live.feed.cursor
+    changed_drivers, changed_teams = race.append(new_laps)
+
+    # Positions: extend each driver's line with the new laps only
+    fig_pos = Patch()
+    for drv, series in race.positions.items():
+        if drv in state["positions"]:
+            idx = state["positions"].index(drv)
+            fig_pos["data"][idx]["y"].extend(series[sent.get(drv, 0):])
+        else:
+            fig_pos["data"].append(position_trace(drv, series))
+            state["positions"].append(drv)
+
+    # Lap time distribution: replace only the traces of drivers with new laps
+    fig_dist = Patch()
+    for drv in sorted(changed_drivers):
+        if drv in state["drivers"]:
+            i = state["drivers"].index(drv)
+            # Every sample of this driver may have fallen outside the 107% cut
+            outline, box = (
+                violin_traces(i, drv, race.driver_times[drv])
+                if race.driver_times[drv] else (go.Scatter(name=drv), go.Box(name=drv))
+            )
+            fig_dist["data"][2 * i] = outline
+            fig_dist["data"][2 * i + 1] = box
+        else:
+            state["drivers"].append(drv)
+            i = len(state["drivers"]) - 1
+            fig_dist["data"].extend(violin_traces(i, drv, race.driver_times[drv]))
+    if changed_drivers:
+        fig_dist["layout"]["xaxis"]["tickvals"] = list(range(len(state["drivers"])))
+        fig_dist["layout"]["xaxis"]["ticktext"] = state["drivers"]
+
+    # Team pace: update the changed teams' entries of the single box trace
+    fig_team = Patch()
+    box = fig_team["data"][0]
+    for team in sorted(changed_teams):
+        stats = race.team_stats(team) or dict.fromkeys(BOX_STAT_KEYS)
+        if team in state["teams"]:
+            k = state["teams"].index(team)
+            for key in BOX_STAT_KEYS:
+                box[key][k] = stats[key]
+        else:
+            state["teams"].append(team)
+            box["x"].append(team)
+            for key in BOX_STAT_KEYS:
+                box[key].append(stats[key])
+
+    return fig_dist, fig_pos, fig_team, state, False
+
+
+# -------------------------------------------------
+# 🔹 ONLY ADDITION: HIDE GRAPHS UNTIL RACE IS SELECTED
+# -------------------------------------------------
+# Pure show/hide, so it runs in the browser (see layout_utils.CLIENTSIDE_FUNCTIONS)
+clientside(
+    "show_when_set",
     Output("rs-laptime-dist", "style"),
     Output("rs-position-changes", "style"),
     Output("rs-team-pace", "style"),
+    Output("rs-gaps", "style"),
+    Output("rs-stints", "style"),
+    Output("rs-replay-section", "style"),
     Input("rs-season", "value"),
     Input("rs-gp", "value"),
 )
-def toggle_graph_visibility(season, gp):
-    if not season or not gp:
-        return (
-            {"display": "none"},
-            {"display": "none"},
-            {"display": "none"},
-        )
-
-    return (
-        {"display": "block"},
-        {"display": "block"},
-        {"display": "block"},
+
+
+# -------------------------------------------------
+# RACE REPLAY
+# -------------------------------------------------
+@callback(
+    Output("rs-replay", "figure"),
+    Output("rs-replay-meta", "data"),
+    Output("rs-replay-seek", "max"),
+    Output("rs-replay-seek", "value"),
+    Output("rs-replay-play", "disabled"),
+    Input("rs-replay-load", "n_clicks"),
+    State("rs-season", "value"),
+    State("rs-gp", "value"),
+    prevent_initial_call=True,
+)
+def load_replay(_, season, round_no):
+    if not (season and round_no):
+        raise PreventUpdate
+
+    try:
+        gp = season_schedule(season).event(round_no)["name"]
+        replay = race_replay(season, gp)
+        laps = session_laps(season, gp, "Race")
+    except Exception as e:
+        print("Replay load error:", e)
+        raise PreventUpdate
+    if not replay.n_frames:
+        raise PreventUpdate
+
+    try:
+        outline = track_segments(season, gp, "Race").outline
+    except Exception:
+        outline = None
+
+    codes = dict(zip(laps["DriverNumber"].astype(str), laps["Driver"]))
+    names = [codes.get(d, d) for d in replay.drivers]
+
+    fig = style_race_figure(
+        replay_figure(outline, replay.frame(0), names, replay.bounds()),
+        f"Race Replay – {gp}", "", "",
     )
+
+    seconds = int(replay.n_frames / replay.hz)
+    meta = {
+        "key": f"{season}|{gp}",
+        "season": season,
+        "gp": gp,
+        "hz": replay.hz,
+        "frames": replay.n_frames,
+        "chunk": CHUNK_FRAMES,
+        "chunks": replay.n_chunks,
+        "drivers": names,
+        "trace": 0 if outline is None else 1,
+        "duration": f"{seconds // 60}:{seconds % 60:02d}",
+    }
+    return fig, meta, replay.n_frames - 1, 0, False
+
+
+@callback(
+    Output("rs-replay-chunk", "data"),
+    Input("rs-replay-request", "data"),
+    State("rs-replay-meta", "data"),
+    prevent_initial_call=True,
+)
+def send_replay_chunk(request, meta):
+    if not (request and meta) or request["key"] != meta["key"]:
+        raise PreventUpdate
+
+    replay = race_replay(meta["season"], meta["gp"])
+    return {**replay.chunk(request["chunk"]), "key": meta["key"]}
+
+
+# Playback runs in the browser; the server only hands out position chunks
+clientside(
+    "toggle_play",
+    Output("rs-replay-clock", "disabled"),
+    Output("rs-replay-play", "children"),
+    Input("rs-replay-play", "n_clicks"),
+)
+
+clientside(
+    "replay_tick",
+    Output("rs-replay-request", "data"),
+    Output("rs-replay-time", "children"),
+    Input("rs-replay-clock", "n_intervals"),
+    Input("rs-replay-chunk", "data"),
+    Input("rs-replay-seek", "value"),
+    Input("rs-replay-meta", "data"),
+    State("rs-replay-speed", "value"),
+)
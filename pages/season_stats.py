@@ -1,23 +1,38 @@
-from dash import html, register_page
+import time
+
+from dash import dcc, html, register_page
+
+from utils.season_utils import (
+    RETRY_SECONDS,
+    cached_season_state,
+    current_season,
+    pit_dnf_summary,
+    pit_dnf_table,
+    season_options,
+    season_standings,
+)
 
 # use /season so it appears as "Season" in your navigation
-register_page(__name__, path="/season", name="Season")
+register_page(__name__, path="/season", name="Season", cache_layout=True)
 
 
 # ---------------------------------------------------------
-# STATIC DATA
+# CONSTANTS
 # ---------------------------------------------------------
-DRIVERS = [
-    {"pos": 1, "name": "Lando Norris", "team": "McLaren", "points": 408, "logo": "/assets/mclaren.png"},
-    {"pos": 2, "name": "Max Verstappen", "team": "Red Bull", "points": 396, "logo": "/assets/redbull.png"},
-    {"pos": 3, "name": "Oscar Piastri", "team": "McLaren", "points": 392, "logo": "/assets/mclaren.png"},
-]
-
-CONSTRUCTORS = [
-    {"pos": 1, "team": "McLaren", "points": 800, "logo": "/assets/mclaren.png"},
-    {"pos": 2, "team": "Red Bull Racing", "points": 620, "logo": "/assets/redbull.png"},
-    {"pos": 3, "team": "Mercedes", "points": 459, "logo": "/assets/mercedes.png"},
-]
+TEAM_LOGOS = {
+    "McLaren": "/assets/mclaren.png",
+    "Red Bull": "/assets/redbull.png",
+    "Mercedes": "/assets/mercedes.png",
+    "Ferrari": "/assets/ferrari.png",
+}
+
+
+def team_logo(team):
+    return next((logo for key, logo in TEAM_LOGOS.items() if key in team), None)
+
+
+def format_points(points):
+    return int(points) if float(points).is_integer() else points
 
 # ---------------------------------------------------------
 # COMPONENTS
@@ -26,7 +41,8 @@ def standings_row(pos, name, points, logo):
     return html.Div(
         [
             html.Span(str(pos), style={"width": "30px", "color": "#aaa"}),
-            html.Img(src=logo, style={"height": "26px", "marginRight": "10px"}),
+            html.Img(src=logo, style={"height": "26px", "marginRight": "10px"})
+            if logo else html.Span(style={"width": "36px"}),
             html.Span(name, style={"flex": "1"}),
             html.Span(str(points), style={"color": "#00ff9c"}),
         ],
@@ -59,57 +75,141 @@ def column_card(title, rows):
 # ---------------------------------------------------------
 # LAYOUT
 # ---------------------------------------------------------
-layout = html.Div(
-    [
-        # ---------- HEADER (CENTERED, NO ICON) ----------
-        html.Div(
-            [
-                html.H1(
-                    "Season Analysis",
-                    style={
-                        "color": "white",
-                        "textAlign": "center",
-                        "fontSize": "48px",
-                        "marginBottom": "10px",
-                    },
-                ),
-                html.P(
-                    "Drivers vs Constructors performance overview",
-                    style={
-                        "color": "white",
-                        "textAlign": "center",
-                        "fontSize": "18px",
-                        "marginBottom": "60px",
-                    },
-                ),
-            ]
-        ),
-
-        # ---------- CARDS ----------
-        html.Div(
-            [
-                column_card(
-                    "Drivers Championship",
-                    [standings_row(d["pos"], d["name"], d["points"], d["logo"]) for d in DRIVERS],
-                ),
-                column_card(
-                    "Constructors Championship",
-                    [standings_row(c["pos"], c["team"], c["points"], c["logo"]) for c in CONSTRUCTORS],
-                ),
-            ],
-            style={
-                "display": "flex",
-                "justifyContent": "center",
-                "gap": "40px",
-            },
-        ),
-    ],
-    style={
-        "minHeight": "100vh",
-        "padding": "60px",
-        "backgroundImage": "url('/assets/background.jpg')",
-        "backgroundSize": "cover",
-        "backgroundPosition": "center",
-        "backgroundRepeat": "no-repeat",
-    },
-)
+def layout_version():
+    """
+    Changes when the cached standings or pit/DNF table change, and every
+    RETRY_SECONDS so that a rebuild gets to revalidate them. Reads cached
+    state only: checking for new rounds is left to the rebuild.
+    """
+    season = current_season()
+    return season, int(time.monotonic() // RETRY_SECONDS), cached_season_state(season)
+
+
+def season_links(selected):
+    """Links to the other seasons (/season?season=YYYY)."""
+    return html.Div(
+        [
+            dcc.Link(
+                o["label"],
+                href=f"/season?season={o['value']}",
+                style={
+                    "color": "#00ff9c" if o["value"] == selected else "#aaa",
+                    "fontWeight": "600" if o["value"] == selected else "400",
+                },
+            )
+            for o in season_options()
+        ],
+        style={
+            "display": "flex",
+            "justifyContent": "center",
+            "gap": "18px",
+            "marginBottom": "40px",
+        },
+    )
+
+
+def layout(season=None, **_):
+    # The plain /season page (current season) is served from the layout
+    # cache; other seasons are picked with ?season=YYYY
+    try:
+        season = int(season) if season else current_season()
+    except ValueError:
+        season = current_season()
+
+    # Standings come from the cached season aggregation, which is only
+    # rebuilt after a new round has finished (never for completed seasons)
+    standings = season_standings(season)
+    # Pit/DNF table is persisted per season and refreshed in the background
+    reliability = pit_dnf_summary(pit_dnf_table(season))
+
+    return html.Div(
+        [
+            # ---------- HEADER (CENTERED, NO ICON) ----------
+            html.Div(
+                [
+                    html.H1(
+                        "Season Analysis",
+                        style={
+                            "color": "white",
+                            "textAlign": "center",
+                            "fontSize": "48px",
+                            "marginBottom": "10px",
+                        },
+                    ),
+                    html.P(
+                        "Drivers vs Constructors performance overview",
+                        style={
+                            "color": "white",
+                            "textAlign": "center",
+                            "fontSize": "18px",
+                            "marginBottom": "60px",
+                        },
+                    ),
+                ]
+            ),
+            season_links(season),
+
+            # ---------- CARDS ----------
+            html.Div(
+                [
+                    column_card(
+                        "Drivers Championship",
+                        [
+                            standings_row(d["pos"], d["name"], format_points(d["points"]), team_logo(d["team"]))
+                            for d in standings.driver_table()
+                        ],
+                    ),
+                    column_card(
+                        "Constructors Championship",
+                        [
+                            standings_row(c["pos"], c["team"], format_points(c["points"]), team_logo(c["team"]))
+                            for c in standings.constructor_table()
+                        ],
+                    ),
+                ],
+                style={
+                    "display": "flex",
+                    "justifyContent": "center",
+                    "gap": "40px",
+                },
+            ),
+
+            # ---------- PIT STOPS / DNFS ----------
+            html.Div(
+                [
+                    column_card(
+                        "Pit Stops (Avg Pit Lane Time)",
+                        [
+                            standings_row(pos, r["team"], f"{r['avg_pit']:.1f}s", team_logo(r["team"]))
+                            for pos, r in enumerate(
+                                reliability.dropna(subset=["avg_pit"]).to_dict("records"), start=1
+                            )
+                        ] or [html.P("Processing race data…", style={"color": "#aaa"})],
+                    ),
+                    column_card(
+                        "DNFs",
+                        [
+                            standings_row(pos, r["team"], int(r["dnfs"]), team_logo(r["team"]))
+                            for pos, r in enumerate(
+                                reliability.sort_values("dnfs").to_dict("records"), start=1
+                            )
+                        ] or [html.P("Processing race data…", style={"color": "#aaa"})],
+                    ),
+                ],
+                style={
+                    "display": "flex",
+                    "justifyContent": "center",
+                    "gap": "40px",
+                    "marginTop": "40px",
+                },
+            ),
+        ],
+        style={
+            "minHeight": "100vh",
+            "padding": "60px",
+            "backgroundImage": "url('/assets/background.jpg')",
+            "backgroundSize": "cover",
+            "backgroundPosition": "center",
+            "backgroundRepeat": "no-repeat",
+        },
+    )
@@ -1,7 +1,21 @@
-from dash import html, dcc, register_page, callback, Input, Output, State, dash_table
+from dash import html, dcc, register_page, callback, callback_context, Input, Output, State, dash_table
 import dash_bootstrap_components as dbc
+import numpy as np
+import pandas as pd
 import requests
 
+from utils.cache_utils import race_gaps, season_cached
+from utils.layout_utils import table_rows
+from utils.math_utils import final_intervals, parse_lap_times
+from utils.season_utils import (
+    ERGAST_BASE,
+    JOLPICA_BASE,
+    RETRY_SECONDS,
+    current_season,
+    season_options,
+    season_standings,
+)
+
 # ---------------------------------------------------------
 # PAGE REGISTRATION
 # ---------------------------------------------------------
@@ -10,12 +24,13 @@ register_page(__name__, path="/standings", name="Standings")
 # ---------------------------------------------------------
 # CONSTANTS
 # ---------------------------------------------------------
-SEASONS = ["2025"]
+# Race results kept per season
+RESULTS_CACHE_SIZE = 32
 
-JOLPICA_SEASON_URL = "https://api.jolpi.ca/ergast/f1/{season}.json"
-ERGAST_SEASON_URL = "http://ergast.com/api/f1/{season}.json"
-JOLPICA_RACE_RESULT = "https://api.jolpi.ca/ergast/f1/{season}/{round}/results.json"
-ERGAST_RACE_RESULT = "http://ergast.com/api/f1/{season}/{round}/results.json"
+JOLPICA_SEASON_URL = JOLPICA_BASE + "/{season}.json"
+ERGAST_SEASON_URL = ERGAST_BASE + "/{season}.json"
+JOLPICA_RACE_RESULT = JOLPICA_BASE + "/{season}/{round}/results.json"
+ERGAST_RACE_RESULT = ERGAST_BASE + "/{season}/{round}/results.json"
 
 # ---------------------------------------------------------
 # HELPERS
@@ -29,6 +44,7 @@ def try_get_json(url, timeout=8):
         return None
 
 
+@season_cached(1, current_ttl=RETRY_SECONDS)
 def fetch_season_races(season):
     for url in (
         JOLPICA_SEASON_URL.format(season=season),
@@ -43,6 +59,7 @@ def fetch_season_races(season):
     return []
 
 
+@season_cached(RESULTS_CACHE_SIZE, current_ttl=RETRY_SECONDS)
 def fetch_race_results(season, round_):
     for url in (
         JOLPICA_RACE_RESULT.format(season=season, round=round_),
@@ -54,6 +71,13 @@ def fetch_race_results(season, round_):
     return None
 
 
+RESULT_FIELDS = [
+    "position", "number", "points", "laps", "status",
+    "Driver.givenName", "Driver.familyName", "Constructor.name",
+    "Time.time", "FastestLap.lap", "FastestLap.Time.time",
+]
+
+
 def parse_race_summary(j):
     races = j["MRData"]["RaceTable"]["Races"]
     if not races:
@@ -61,43 +85,38 @@ def parse_race_summary(j):
 
     race = races[0]
     results = race.get("Results", [])
-    winner = results[0] if results else None
+    if not results:
+        return {"winner": "—", "fastest": None, "circuit": race["Circuit"]["circuitName"], "rows": []}
+
+    # One flat frame per race instead of a Python loop over result dicts
+    df = pd.json_normalize(results).reindex(columns=RESULT_FIELDS)
+    text = df.drop(columns="position").fillna("")
+    driver = text["Driver.givenName"] + " " + text["Driver.familyName"]
 
     fastest = None
-    best = None
-    for r in results:
-        fl = r.get("FastestLap")
-        if fl:
-            t = fl.get("Time", {}).get("time")
-            if t:
-                secs = (
-                    int(t.split(":")[0]) * 60 + float(t.split(":")[1])
-                    if ":" in t else float(t)
-                )
-                if best is None or secs < best:
-                    best = secs
-                    fastest = {
-                        "driver": f"{r['Driver']['givenName']} {r['Driver']['familyName']}",
-                        "time": t,
-                        "lap": fl.get("lap"),
-                    }
-
-    rows = []
-    for r in results:
-        rows.append({
-            "pos": int(r.get("position", 0)),
-            "number": r.get("number", ""),
-            "driver": f"{r['Driver']['givenName']} {r['Driver']['familyName']}",
-            "team": r["Constructor"]["name"],
-            "time": r.get("Time", {}).get("time", ""),
-            "gap": r.get("status", ""),
-            "interval": "",
-            "points": r.get("points", ""),
-            "laps": r.get("laps", ""),
-        })
+    fastest_secs = parse_lap_times(df["FastestLap.Time.time"])
+    if not np.isnan(fastest_secs).all():
+        i = int(np.nanargmin(fastest_secs))
+        fastest = {
+            "driver": driver.iloc[i],
+            "time": text["FastestLap.Time.time"].iloc[i],
+            "lap": df["FastestLap.lap"].iloc[i],
+        }
+
+    rows = table_rows(text, {
+        "pos": pd.to_numeric(df["position"]).fillna(0).astype(int),
+        "number": "number",
+        "driver": driver,
+        "team": "Constructor.name",
+        "time": "Time.time",
+        "gap": "status",
+        "interval": pd.Series("", index=df.index),
+        "points": "points",
+        "laps": "laps",
+    })
 
     return {
-        "winner": f"{winner['Driver']['givenName']} {winner['Driver']['familyName']}" if winner else "—",
+        "winner": driver.iloc[0],
         "fastest": fastest,
         "circuit": race["Circuit"]["circuitName"],
         "rows": rows,
@@ -115,6 +134,36 @@ def stat_card(title, value):
         className="result-card",
     )
 
+def fill_intervals(rows, season, round_):
+    """Fill the INTERVAL column from the cached lap-by-lap gap engine."""
+    try:
+        intervals = final_intervals(race_gaps(int(season), int(round_)))
+    except Exception:
+        return rows
+    for row in rows:
+        row["interval"] = intervals.get(str(row["number"]), "")
+    return rows
+
+
+def championship_rows(season, round_):
+    """Drivers' championship after `round_`, read from the season matrix."""
+    standings = season_standings(int(season))
+    table = standings.standings_after(round_)
+    if not table:
+        return []
+
+    leader = table[0][1]
+    return [
+        {
+            "pos": pos,
+            "driver": standings.driver_names.get(code, code),
+            "team": standings.driver_teams.get(code, ""),
+            "points": int(points) if points.is_integer() else points,
+            "gap": "" if pos == 1 else f"-{leader - points:g}",
+        }
+        for pos, (code, points) in enumerate(table, start=1)
+    ]
+
 # ---------------------------------------------------------
 # CONTROLS
 # ---------------------------------------------------------
@@ -123,8 +172,8 @@ controls = dbc.Row(
         dbc.Col(
             dcc.Dropdown(
                 id="season-select",
-                options=[{"label": s, "value": s} for s in SEASONS],
-                value=SEASONS[0],
+                options=season_options(),
+                value=current_season(),
                 clearable=False,
                 className="custom-dropdown",
             ),
@@ -186,6 +235,36 @@ layout = html.Div(
                 "fontFamily": "monospace",
             },
         ),
+        html.H3(
+            id="championship-title",
+            className="hero-title",
+            style={"fontSize": "24px", "marginTop": "40px"},
+        ),
+        dash_table.DataTable(
+            id="championship-table",
+            columns=[
+                {"name": "POS.", "id": "pos"},
+                {"name": "DRIVER", "id": "driver"},
+                {"name": "TEAM", "id": "team"},
+                {"name": "POINTS", "id": "points"},
+                {"name": "GAP TO LEADER", "id": "gap"},
+            ],
+            data=[],
+            page_size=25,
+            style_table={"overflowX": "auto"},
+            style_header={
+                "backgroundColor": "#12161d",
+                "color": "#00e6c3",
+                "fontWeight": "600",
+                "borderBottom": "1px solid #00e6c3",
+            },
+            style_cell={
+                "backgroundColor": "#0b0f14",
+                "color": "#e6e6e6",
+                "padding": "10px",
+                "fontFamily": "monospace",
+            },
+        ),
     ],
     className="features-container",
 )
@@ -200,6 +279,11 @@ layout = html.Div(
     Input("refresh-button", "n_clicks"),
 )
 def update_races(season, _):
+    # Refresh refetches the season; otherwise completed seasons are cached
+    # for good and the current one for RETRY_SECONDS
+    if callback_context.triggered_id == "refresh-button":
+        fetch_season_races.invalidate(season)
+        fetch_race_results.invalidate(season)
     races = fetch_season_races(season)
 
     options = [
@@ -214,12 +298,14 @@ def update_races(season, _):
 @callback(
     Output("summary-cards", "children"),
     Output("results-table", "data"),
+    Output("championship-title", "children"),
+    Output("championship-table", "data"),
     Input("race-select", "value"),
     State("season-select", "value"),
 )
 def load_results(round_, season):
     if not round_:
-        return None, []
+        return None, [], "", []
 
     j = fetch_race_results(season, round_)
     summary = parse_race_summary(j)
@@ -242,4 +328,9 @@ def load_results(round_, season):
         className="results-summary",
     )
 
-    return cards, summary["rows"]
+    return (
+        cards,
+        fill_intervals(summary["rows"], season, round_),
+        f"Drivers' Championship after Round {round_}",
+        championship_rows(season, round_),
+    )
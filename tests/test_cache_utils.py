@@ -0,0 +1,199 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import cache_utils
+from utils.cache_utils import negative_cached, season_cached
+from utils.telemetry_utils import CURRENT_FILE, TelemetryIndex
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_utils.time, "monotonic", lambda: now[0])
+    return now
+
+
+def failing(exc):
+    calls = []
+
+    @negative_cached(ttl=10)
+    def load(key):
+        calls.append(key)
+        raise exc
+
+    return load, calls
+
+
+def test_failures_are_remembered_until_the_ttl(clock):
+    load, calls = failing(ValueError("no data"))
+    for _ in range(3):
+        with pytest.raises(ValueError, match="no data"):
+            load("a")
+    assert calls == ["a"]
+
+    clock[0] += 10
+    with pytest.raises(ValueError):
+        load("a")
+    assert calls == ["a", "a"]
+
+
+def test_cached_failures_do_not_grow_a_traceback(clock):
+    load, _ = failing(ValueError("no data"))
+    depths = []
+    for _ in range(4):
+        try:
+            load("a")
+        except ValueError as e:
+            tb, depth = e.__traceback__, 0
+            while tb:
+                tb, depth = tb.tb_next, depth + 1
+            depths.append(depth)
+    assert len(set(depths[1:])) == 1
+    assert isinstance(load.failures[("a",)][1], type)
+
+
+def test_transient_errors_are_not_remembered(clock):
+    load, calls = failing(TimeoutError("slow"))
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            load("a")
+    assert calls == ["a", "a"]
+    assert load.failures == {}
+
+
+def test_expired_failures_are_evicted(clock):
+    load, _ = failing(ValueError("no data"))
+    with pytest.raises(ValueError):
+        load("a")
+    clock[0] += 10
+    with pytest.raises(ValueError):
+        load("b")
+    assert list(load.failures) == [("b",)]
+
+
+def store_with(budget, *keys):
+    store = cache_utils.SessionStore(budget, max_sessions=len(keys))
+    for key in keys:
+        store.entries[key] = {
+            "session": SimpleNamespace(_car_data={}, _pos_data={}),
+            "telemetry": True,
+            "index": None,
+            "laps_bytes": 10,
+            "telemetry_bytes": 100,
+            "index_bytes": 0,
+        }
+    return store
+
+
+def test_session_store_drops_telemetry_until_under_budget(monkeypatch):
+    monkeypatch.setattr(cache_utils, "is_completed", lambda season: season < 2025)
+    a, b, c = (2025, "A", "R"), (2025, "B", "R"), (2025, "C", "R")
+    store = store_with(150, a, b, c)
+
+    store._enforce(keep=c)
+
+    usage = store.usage()
+    assert usage["sessions"] == {a: 10, b: 10, c: 110}
+    assert usage["total_bytes"] == 130 and usage["budget_bytes"] == 150
+
+
+def test_session_store_evicts_past_seasons_first(monkeypatch):
+    monkeypatch.setattr(cache_utils, "is_completed", lambda season: season < 2025)
+    current, past, used = (2025, "A", "R"), (2019, "B", "R"), (2025, "C", "R")
+    store = store_with(125, current, past, used)
+
+    store._enforce(keep=used)
+
+    # All telemetry goes first, then whole sessions, past seasons before current
+    usage = store.usage()
+    assert usage["sessions"] == {current: 10, used: 110}
+    assert usage["total_bytes"] == 120
+
+
+def test_broken_export_is_rebuilt(tmp_path, monkeypatch):
+    path = tmp_path / "session"
+    path.mkdir()
+    (path / CURRENT_FILE).write_text("index-missing")
+    monkeypatch.setattr(cache_utils, "telemetry_path", lambda *key: str(path))
+
+    store = cache_utils.SessionStore(2**30)
+    monkeypatch.setattr(store, "session", lambda key, telemetry=True: None)
+    built = TelemetryIndex(["1"], {"SessionTime": np.arange(3.0)}, {("1", 1): (0, 3)})
+    monkeypatch.setattr(TelemetryIndex, "from_session", classmethod(lambda cls, session: built))
+
+    index = store.index((2025, "A", "R"))
+
+    assert index.mapped
+    assert index.laps("1") == [1]
+
+
+def test_track_segments_are_kept_per_season(tmp_path, monkeypatch):
+    apexes = {2022: [300.0], 2023: [300.0, 700.0]}
+    distance = np.linspace(0.0, 1000.0, 11)
+    lap = {"Distance": distance, "Speed": np.full(11, 200.0), "X": distance, "Y": distance}
+
+    def session(key, telemetry=True):
+        info = SimpleNamespace(corners=pd.DataFrame({"Distance": apexes[key[0]]}))
+        return SimpleNamespace(
+            event={"Location": "Barcelona"},
+            laps=pd.DataFrame({"DriverNumber": ["1"], "LapNumber": [1], "LapTime": [pd.Timedelta(80, "s")]}),
+            get_circuit_info=lambda: info,
+        )
+
+    monkeypatch.setattr("utils.track_utils.SEGMENT_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(cache_utils, "_SEGMENTS", {})
+    monkeypatch.setattr(cache_utils.SESSION_STORE, "session", session)
+    monkeypatch.setattr(cache_utils, "telemetry_index", lambda *key: SimpleNamespace(lap=lambda *k: lap))
+
+    for year in (2022, 2023):
+        segments = cache_utils.track_segments(year, "Spanish Grand Prix", "Race")
+        assert segments.apexes.tolist() == apexes[year]
+    assert sorted(p.parent.name for p in tmp_path.glob("*/*.json")) == ["2022", "2023"]
+
+
+def counted(maxsize, current_ttl=None):
+    calls = []
+
+    @season_cached(maxsize, current_ttl=current_ttl)
+    def load(season, key):
+        calls.append((season, key))
+        return [season, key]
+
+    return load, calls
+
+
+def test_season_partitions_evict_independently(monkeypatch):
+    monkeypatch.setattr(cache_utils, "is_completed", lambda season: season < 2025)
+    monkeypatch.setattr(cache_utils, "PAST_SEASONS_CACHED", 2)
+    load, calls = counted(2)
+
+    load(2025, "a")
+    for season in (2018, 2019, 2020):
+        for key in "abc":
+            load(season, key)
+
+    # Browsing history neither evicts current-season entries nor keeps
+    # more than PAST_SEASONS_CACHED completed seasons of maxsize entries
+    assert list(load.partitions) == [2025, 2019, 2020]
+    assert list(load.partitions[2020]) == [(("b",), ()), (("c",), ())]
+    load(2025, "a")
+    assert calls.count((2025, "a")) == 1
+
+    load.invalidate(2025)
+    load(2025, "a")
+    assert calls.count((2025, "a")) == 2
+
+
+def test_only_current_season_entries_expire(monkeypatch, clock):
+    monkeypatch.setattr(cache_utils, "is_completed", lambda season: season < 2025)
+    load, calls = counted(4, current_ttl=60)
+
+    load(2025, "a")
+    load(2019, "a")
+    clock[0] += 60
+    load(2025, "a")
+    load(2019, "a")
+    assert calls == [(2025, "a"), (2019, "a"), (2025, "a")]
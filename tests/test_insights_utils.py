@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+from utils.insights_utils import MIN_BRAKE_LAPS, session_insights
+from utils.telemetry_utils import TelemetryIndex
+
+SAMPLES = 100
+
+
+def synthetic_session(brake_at):
+    """One driver, laps 2.. with a 1 km lap, braking at `brake_at[i]` m on lap i + 2."""
+    n = len(brake_at)
+    t = np.arange(n * SAMPLES, dtype=float)
+    dist = np.tile(np.arange(SAMPLES) * 10.0, n) + np.repeat(np.arange(n) * 1000.0, SAMPLES)
+    lap_dist = dist % 1000.0
+    brake = np.concatenate([(np.arange(SAMPLES) * 10.0 >= b) & (np.arange(SAMPLES) * 10.0 < b + 50) for b in brake_at])
+    index = TelemetryIndex(
+        ["1"],
+        {
+            "SessionTime": t,
+            "CumDistance": dist,
+            "Speed": np.full(t.size, 300.0, dtype=np.float32),
+            "Throttle": np.where(lap_dist < 500, 100.0, 50.0).astype(np.float32),
+            "Brake": brake,
+        },
+        {("1", lap): (i * SAMPLES, (i + 1) * SAMPLES) for i, lap in enumerate(range(2, n + 2))},
+    )
+    laps = pd.DataFrame({
+        "Driver": "VER",
+        "Team": "Red Bull",
+        "DriverNumber": "1",
+        "LapNumber": np.arange(2, n + 2),
+        "LapTime": pd.to_timedelta(np.full(n, 90.0), unit="s"),
+        "PitInTime": pd.NaT,
+        "PitOutTime": pd.NaT,
+        "TrackStatus": "1",
+    })
+    return index, laps
+
+
+def test_braking_point_spread_per_corner():
+    index, laps = synthetic_session([500.0, 510.0, 520.0])
+    drivers, corners = session_insights(index, laps, apexes=[600.0])
+
+    row = drivers.iloc[0]
+    assert row["CleanLaps"] == 3
+    assert abs(row["FullThrottlePct"] - 50.0) < 2.0
+    assert abs(row["BrakeSpread"] - 10.0) < 1e-9
+
+    corner = corners.iloc[0]
+    assert corner["Laps"] == 3
+    assert abs(corner["BrakePoint"] - 90.0) < 1e-9
+
+
+def test_brake_spread_needs_enough_laps():
+    index, laps = synthetic_session([500.0] * (MIN_BRAKE_LAPS - 1))
+    drivers, corners = session_insights(index, laps, apexes=[600.0])
+    assert np.isnan(drivers.iloc[0]["BrakeSpread"])
+    assert np.isnan(corners.iloc[0]["BrakeSpread"])
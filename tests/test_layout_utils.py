@@ -0,0 +1,10 @@
+from utils.layout_utils import driver_options
+
+
+def test_driver_options_are_sorted_by_code():
+    names = {"VER": "Max Verstappen", "ALO": "Fernando Alonso"}
+    assert driver_options(names) == [
+        {"label": "Fernando Alonso (ALO)", "value": "ALO"},
+        {"label": "Max Verstappen (VER)", "value": "VER"},
+    ]
+    assert driver_options({}) == []
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+from utils.live_utils import LIVE_SESSIONS, LiveRace, ReplayFeed, live_session
+
+
+def make_laps(times, driver="VER", team="Red Bull"):
+    n = len(times)
+    return pd.DataFrame({
+        "Driver": driver,
+        "Team": team,
+        "LapNumber": np.arange(2, n + 2),
+        "Position": 1.0,
+        "LapTime": pd.to_timedelta(times, unit="s"),
+        "Time": pd.to_timedelta(np.cumsum(times), unit="s"),
+        "PitInTime": pd.NaT,
+        "PitOutTime": pd.NaT,
+    })
+
+
+def test_new_best_lap_prunes_earlier_samples():
+    race = LiveRace()
+    race.append(make_laps([100.0, 106.0]))
+    assert race.driver_times["VER"] == [100.0, 106.0]
+
+    drivers, teams = race.append(make_laps([90.0], driver="HAM", team="Mercedes"))
+
+    # 106 > 90 * 1.07 and 100 > 96.3 are now outside the cut
+    assert race.driver_times["VER"] == []
+    assert race.driver_times["HAM"] == [90.0]
+    assert drivers == {"VER", "HAM"}
+    assert teams == {"Red Bull", "Mercedes"}
+
+
+def test_batch_and_incremental_appends_agree():
+    laps = pd.concat([make_laps([100.0, 95.0, 101.0]), make_laps([92.0, 99.0], "HAM", "Mercedes")])
+    one = LiveRace()
+    one.append(laps)
+    many = LiveRace()
+    for _, row in laps.iterrows():
+        many.append(row.to_frame().T.astype(laps.dtypes.to_dict()))
+    assert one.driver_times == many.driver_times
+    assert one.team_times == many.team_times
+
+
+def test_live_session_rebuilds_from_client_state():
+    laps = make_laps([90.0, 91.0, 92.0])
+    LIVE_SESSIONS.clear()
+
+    live = live_session("a", lambda: laps, started=0.0, cursor=2)
+    assert live.feed.cursor == 2
+    assert live.race.driver_times["VER"] == [90.0, 91.0]
+
+    # A worker whose copy is behind catches up instead of replaying twice
+    LIVE_SESSIONS["a"].feed.cursor = 1
+    LIVE_SESSIONS["a"].race = LiveRace()
+    LIVE_SESSIONS["a"].race.append(laps.iloc[:1])
+    live = live_session("a", lambda: laps, started=0.0, cursor=3)
+    assert live.race.driver_times["VER"] == [90.0, 91.0, 92.0]
+
+
+def test_replay_feed_resumes_from_shared_start_time():
+    laps = make_laps([90.0, 90.0, 90.0])
+    feed = ReplayFeed(laps, speed=1.0, clock=lambda: 1000.0 + 90.0, started=1000.0)
+    assert len(feed.poll()) == 2
+    assert len(feed.poll()) == 0
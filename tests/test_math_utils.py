@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from utils.math_utils import final_intervals, gap_matrices, parse_lap_times, position_changes
+
+
+def race_laps(lap_times, start=100.0):
+    """Laps table for {driver: [lap seconds]} with FastF1-style timing stamps."""
+    frames = []
+    for number, (driver, times) in enumerate(lap_times.items(), start=1):
+        times = np.asarray(times, dtype=float)
+        ends = start + np.cumsum(times)
+        frames.append(pd.DataFrame({
+            "Driver": driver,
+            "DriverNumber": str(number),
+            "LapNumber": np.arange(1, len(times) + 1, dtype=float),
+            "LapTime": pd.to_timedelta(times, unit="s"),
+            "LapStartTime": pd.to_timedelta(ends - times, unit="s"),
+            "Time": pd.to_timedelta(ends, unit="s"),
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_elapsed_is_measured_from_the_race_start():
+    gaps = gap_matrices(race_laps({"VER": [90.0, 90.5, 91.0], "HAM": [91.0, 90.0, 90.0]}))
+    assert gaps["drivers"] == ["HAM", "VER"]
+    np.testing.assert_allclose(gaps["elapsed"][:, 1], [90.0, 180.5, 271.5])
+    np.testing.assert_allclose(gaps["gap"][2], [-0.0, 0.5])
+    np.testing.assert_allclose(gaps["interval"][2], [0.0, 0.5])
+
+
+def test_missing_lap_does_not_shift_later_laps():
+    laps = race_laps({"VER": [90.0, 90.5, 91.0, 90.0], "HAM": [91.0, 90.0, 90.0, 91.0]})
+    gone = (laps["Driver"] == "VER") & (laps["LapNumber"] == 2)
+    laps.loc[gone, ["LapTime", "Time"]] = pd.NaT
+
+    gaps = gap_matrices(laps)
+    ver = gaps["elapsed"][:, gaps["drivers"].index("VER")]
+    assert np.isnan(ver[1])
+    np.testing.assert_allclose(ver[[0, 2, 3]], [90.0, 271.5, 361.5])
+
+
+def test_final_intervals_use_the_last_timed_lap():
+    laps = race_laps({
+        "VER": [90.0, 90.0, 90.0],
+        "HAM": [90.5, 90.5, 90.5],
+        "SAR": [95.0, 95.0],
+    })
+    gone = (laps["Driver"] == "HAM") & (laps["LapNumber"] == 2)
+    laps.loc[gone, ["LapTime", "Time"]] = pd.NaT
+
+    intervals = final_intervals(gap_matrices(laps))
+    assert intervals == {"1": "", "2": "+1.500s", "3": "+1 Lap"}
+
+
+def test_final_intervals_empty():
+    empty = race_laps({"VER": []})
+    assert final_intervals(gap_matrices(empty)) == {}
+
+
+def test_parse_lap_times():
+    parsed = parse_lap_times(["1:31.456", "59.9", "2:00.000", "7"])
+    np.testing.assert_allclose(parsed, [91.456, 59.9, 120.0, 7.0])
+    np.testing.assert_allclose(parse_lap_times(pd.Series([" 1:02.5 ", "5."])), [62.5, 5.0])
+
+
+def test_parse_lap_times_rejects_malformed_input():
+    parsed = parse_lap_times([
+        None, "", ":5.0", "1:2:3.0", "1:3é.0", "١:٣٠.٠", "abc", float("nan"),
+        ".5", "1:2.3.4", "1e3", "inf", "+5", "1:-5",
+    ])
+    assert np.isnan(parsed).all()
+    assert parse_lap_times([]).shape == (0,)
+
+
+def test_position_changes():
+    # Lap x driver: B passes A on lap 2, pits on lap 3 and drops behind C
+    matrix = np.array([[1, 2, 3], [2, 1, 3], [1, 3, 2], [1, 3, 0]], dtype=np.int8)
+    changes = position_changes(matrix)
+    assert changes["net"].tolist() == [0, -1, 1]
+    assert changes["gained"].tolist() == [1, 1, 1]
+    assert changes["lost"].tolist() == [1, 2, 0]
+    assert changes["laps_gained"].tolist() == [1, 1, 1]
@@ -0,0 +1,71 @@
+import numpy as np
+import plotly.graph_objects as go
+from dash import no_update
+from dash._utils import to_json
+
+from utils.plot_utils import diff_figure, gap_traces, position_traces
+
+
+def test_gap_traces_send_float_arrays():
+    gaps = {
+        "drivers": ["VER", "HAM"],
+        "laps": np.arange(1, 5),
+        "gap": np.array([[0.0, 1.0], [0.0, np.nan], [0.0, 2.5], [np.nan, np.nan]]),
+    }
+    traces = gap_traces(gaps, ["HAM", "VER", "ALO"])
+
+    assert [t.name for t in traces] == ["HAM", "VER"]
+    y = traces[0].y
+    assert isinstance(y, np.ndarray) and y.dtype == float
+    assert '"y":[1.0,null,2.5]' in to_json(traces[0].to_plotly_json())
+    assert traces[1].x0 == 1 and len(traces[1].y) == 3
+
+
+def test_position_traces_mark_missing_laps_as_null():
+    pm = {
+        "drivers": ["VER"],
+        "laps": np.arange(1, 5),
+        "positions": np.array([[0], [2], [0], [1]], dtype=np.int8),
+    }
+    (trace,) = position_traces(pm)
+    assert trace.x0 == 2
+    assert '"y":[2.0,null,1.0]' in to_json(trace.to_plotly_json())
+
+
+def diff(prev_keys, keys, title=None):
+    built = []
+
+    def build_trace(i):
+        built.append(i)
+        return {"name": keys[i]}
+
+    out = diff_figure(prev_keys, keys, build_trace, lambda fig: fig, title)
+    ops = None
+    if not isinstance(out, go.Figure) and out is not no_update:
+        ops = [(o["operation"], o["location"]) for o in out.to_plotly_json()["operations"]]
+    return out, ops, built
+
+
+def test_diff_figure_sends_nothing_when_unchanged():
+    out, _, built = diff(["a", "b"], ["a", "b"])
+    assert out is no_update and built == []
+
+
+def test_diff_figure_replaces_only_changed_traces():
+    _, ops, built = diff(["a", "b", "c"], ["a", "x", "c"], title="New")
+    assert ops == [("Assign", ["data", 1]), ("Assign", ["layout", "title", "text"])]
+    assert built == [1]
+
+
+def test_diff_figure_appends_and_deletes():
+    _, ops, built = diff(["a"], ["a", "b", "c"])
+    assert ops == [("Append", ["data"]), ("Append", ["data"])] and built == [1, 2]
+
+    _, ops, built = diff(["a", "b", "c", "d"], ["a", "c"])
+    assert ops == [("Delete", ["data", 3]), ("Delete", ["data", 1])] and built == []
+
+
+def test_diff_figure_rebuilds_when_reordered_or_empty():
+    for prev in (None, ["c", "a"]):
+        out, _, built = diff(prev, ["a", "b", "c"])
+        assert isinstance(out, go.Figure) and built == [0, 1, 2]
@@ -0,0 +1,232 @@
+import threading
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from utils import season_utils
+from utils.season_utils import SeasonStandings, is_retirement
+
+
+def results_table(rows):
+    return pd.DataFrame(rows, columns=[
+        "round", "race", "kind", "code", "driver", "team",
+        "position", "points", "status",
+    ])
+
+
+def sample_results():
+    return results_table([
+        (1, "Bahrain GP", "race", "VER", "Max Verstappen", "Red Bull", 1, 25.0, "Finished"),
+        (1, "Bahrain GP", "race", "HAM", "Lewis Hamilton", "Mercedes", 2, 18.0, "Finished"),
+        (2, "Saudi GP", "sprint", "HAM", "Lewis Hamilton", "Mercedes", 1, 8.0, "Finished"),
+        (2, "Saudi GP", "race", "HAM", "Lewis Hamilton", "Mercedes", 1, 25.0, "Finished"),
+        (2, "Saudi GP", "race", "VER", "Max Verstappen", "Red Bull", 18, 0.0, "Engine"),
+        (3, "Australian GP", "race", "VER", "Max Verstappen", "Red Bull", 1, 25.0, "Finished"),
+    ])
+
+
+def test_finish_distribution_counts_races_only():
+    standings = SeasonStandings(2024, sample_results())
+    assert standings.finish_distribution("HAM") == {1: 1, 2: 1}
+    assert standings.finish_distribution("VER") == {1: 2, 18: 1}
+    assert standings.finish_distribution("ALO") == {}
+
+
+def test_standings_after_round_include_sprints():
+    standings = SeasonStandings(2024, sample_results())
+    assert standings.standings_after(2) == [("HAM", 51.0), ("VER", 25.0)]
+    cum, gap = standings.progression("VER")
+    assert cum.tolist() == [25.0, 25.0, 50.0]
+    assert gap.tolist() == [0.0, 26.0, 1.0]
+
+
+def test_empty_season():
+    standings = SeasonStandings(2024, results_table([]))
+    assert standings.completed == 0
+    assert standings.standings_after() == []
+    assert standings.finish_distribution("VER") == {}
+
+
+def test_dnf_counts_retirements_only():
+    status = pd.Series([
+        "Finished", "+1 Lap", "Lapped", "Engine", "Collision", "Retired",
+        "Did not start", "Disqualified", "Withdrew", None,
+    ])
+    assert is_retirement(status).tolist() == [
+        False, False, False, True, True, True, False, False, False, False,
+    ]
+
+
+def test_failed_race_date_fetch_is_retried_after_the_ttl(monkeypatch):
+    calls = []
+    clock = [1000.0]
+
+    def fetch(season):
+        calls.append(season)
+        return {}
+
+    monkeypatch.setattr(season_utils, "fetch_race_dates", fetch)
+    monkeypatch.setattr(season_utils.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(season_utils, "_DATES", {})
+
+    assert season_utils.finished_round_numbers(2099) == []
+    assert season_utils.finished_round_numbers(2099) == []
+    assert calls == [2099]
+
+    clock[0] += season_utils.RETRY_SECONDS
+    season_utils.finished_round_numbers(2099)
+    assert calls == [2099, 2099]
+
+
+def test_cached_season_state_reads_memory_only(monkeypatch):
+    monkeypatch.setattr(season_utils, "_CACHE", {})
+    monkeypatch.setattr(season_utils, "_PIT_DNF", {})
+    monkeypatch.setattr(season_utils, "get_ergast", lambda *a, **k: pytest.fail("fetched"))
+
+    assert season_utils.cached_season_state(2024) == (None, None)
+
+    season_utils._CACHE[2024] = {
+        "standings": SeasonStandings(2024, sample_results()), "complete": True, "built": 0.0,
+    }
+    season_utils._PIT_DNF[2024] = pd.DataFrame({"round": [1, 1]})
+    assert season_utils.cached_season_state(2024) == ((3, 3), 2)
+
+
+def test_ergast_races_report_a_missing_page(monkeypatch):
+    pages = {0: {"total": "3", "RaceTable": {"Races": [{"round": "1"}, {"round": "2"}]}}}
+    monkeypatch.setattr(season_utils, "PAGE_SIZE", 2)
+    monkeypatch.setattr(season_utils, "get_ergast", lambda path, params: pages.get(params["offset"]))
+
+    races, complete = season_utils.get_ergast_races("2020/results.json")
+    assert [r["round"] for r in races] == ["1", "2"] and not complete
+
+    pages[2] = {"total": "3", "RaceTable": {"Races": [{"round": "3"}]}}
+    races, complete = season_utils.get_ergast_races("2020/results.json")
+    assert len(races) == 3 and complete
+
+
+def test_incomplete_completed_season_is_not_persisted(monkeypatch, tmp_path):
+    calls = []
+    clock = [1000.0]
+
+    def fetch(season):
+        calls.append(season)
+        return sample_results(), len(calls) > 1
+
+    monkeypatch.setattr(season_utils, "SEASON_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(season_utils, "fetch_season_results", fetch)
+    monkeypatch.setattr(season_utils.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(season_utils, "_CACHE", {})
+
+    assert season_utils.season_standings(2020).completed == 3
+    assert not (tmp_path / "2020_results.parquet").exists()
+    season_utils.season_standings(2020)
+    assert calls == [2020]
+
+    clock[0] += season_utils.RETRY_SECONDS
+    season_utils.season_standings(2020)
+    assert calls == [2020, 2020]
+    assert (tmp_path / "2020_results.parquet").exists()
+
+    clock[0] += season_utils.RETRY_SECONDS
+    season_utils.season_standings(2020)
+    assert calls == [2020, 2020]
+
+
+def test_a_slow_season_fetch_blocks_neither_other_seasons_nor_duplicates(monkeypatch, tmp_path):
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch(season):
+        calls.append(season)
+        if season == 2019:
+            started.set()
+            release.wait(5)
+        return sample_results(), True
+
+    monkeypatch.setattr(season_utils, "SEASON_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(season_utils, "fetch_season_results", fetch)
+    monkeypatch.setattr(season_utils, "finished_round_numbers", lambda season: [1, 2, 3])
+    monkeypatch.setattr(season_utils, "is_completed", lambda season: season < 2025)
+    monkeypatch.setattr(season_utils, "_CACHE", {})
+    monkeypatch.setattr(season_utils, "_BUILDING", {})
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(season_utils.season_standings(2019)))
+        for _ in range(3)
+    ]
+    for t in threads:
+        t.start()
+    assert started.wait(5)
+
+    # 2019 is still being fetched while the current season is served
+    assert season_utils.season_standings(2025).completed == 3
+    assert calls.count(2019) == 1 and not results
+
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert len(results) == 3 and len({id(r) for r in results}) == 1
+    assert calls.count(2019) == 1
+
+
+def test_a_sprint_alone_does_not_make_the_round_fresh(monkeypatch):
+    clock_at = [1000.0]
+    sprint_only = sample_results().iloc[:3]
+    fetched = [sprint_only, sample_results().iloc[:4]]
+
+    monkeypatch.setattr(season_utils, "fetch_season_results", lambda season: (fetched.pop(0), True))
+    monkeypatch.setattr(season_utils, "finished_round_numbers", lambda season: [1, 2])
+    monkeypatch.setattr(season_utils, "is_completed", lambda season: False)
+    monkeypatch.setattr(season_utils.time, "monotonic", lambda: clock_at[0])
+    monkeypatch.setattr(season_utils, "_CACHE", {})
+
+    # Round 2 has its sprint but not yet its race
+    standings = season_utils.season_standings(2025)
+    assert standings.completed == 2 and standings.race_rounds.tolist() == [1]
+
+    clock_at[0] += season_utils.RETRY_SECONDS
+    standings = season_utils.season_standings(2025)
+    assert standings.race_rounds.tolist() == [1, 2] and standings.state == (2, 2)
+
+    clock_at[0] += season_utils.RETRY_SECONDS
+    assert season_utils.season_standings(2025) is standings
+
+
+def test_failed_pit_dnf_rounds_are_retried_after_the_ttl(monkeypatch, tmp_path):
+    from utils import cache_utils
+
+    clock = [1000.0]
+    loads = []
+
+    def load(season, round_no):
+        loads.append(round_no)
+        if round_no == 2:
+            raise ValueError("no laps")
+        return SimpleNamespace(
+            laps=pd.DataFrame({
+                "Driver": ["VER"], "Team": ["Red Bull"], "LapNumber": [1],
+                "PitInTime": pd.to_timedelta([None]), "PitOutTime": pd.to_timedelta([None]),
+            }),
+            results=pd.DataFrame({"Abbreviation": ["VER"], "TeamName": ["Red Bull"], "Status": ["Finished"]}),
+        )
+
+    monkeypatch.setattr(season_utils, "SEASON_DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(season_utils, "finished_round_numbers", lambda season: [1, 2])
+    monkeypatch.setattr(season_utils.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(season_utils, "_PIT_DNF", {})
+    monkeypatch.setattr(season_utils, "_PIT_DNF_FAILED", {})
+    monkeypatch.setattr(season_utils.threading, "Thread", lambda **kw: pytest.fail("thread started"))
+    monkeypatch.setattr(cache_utils, "get_race_session", load)
+
+    table = season_utils.update_pit_dnf_table(2025)
+    assert table["round"].tolist() == [1] and loads == [1, 2]
+    assert [p.name for p in tmp_path.iterdir()] == ["2025_pit_dnf.parquet"]
+
+    # The failed round doesn't start another update until the TTL is up
+    assert season_utils.pit_dnf_table(2025) is table
+    clock[0] += season_utils.RETRY_SECONDS
+    season_utils.update_pit_dnf_table(2025)
+    assert loads == [1, 2, 2]
@@ -0,0 +1,36 @@
+import gzip
+import logging
+
+from flask import Flask
+
+from utils import server_utils
+from utils.server_utils import CALLBACK_PATH, compression_stats, install_compression
+
+
+def callback_server(body):
+    server = Flask(__name__)
+    server.add_url_rule(CALLBACK_PATH, "callback", lambda: body, methods=["POST"])
+    return install_compression(server, min_bytes=100)
+
+
+def test_compression_totals_are_recorded_and_logged(monkeypatch, caplog):
+    monkeypatch.setattr(server_utils, "COMPRESSION_STATS", {})
+    monkeypatch.setattr(server_utils, "brotli", None)
+    body = '{"response": "' + "x" * 1000 + '"}'
+    client = callback_server(body).test_client()
+
+    with caplog.at_level(logging.INFO, logger="f1dash.server"):
+        for _ in range(2):
+            response = client.post(
+                CALLBACK_PATH, json={"output": "graph.figure"},
+                headers={"Accept-Encoding": "gzip"},
+            )
+            assert gzip.decompress(response.data).decode() == body
+
+    stats = compression_stats()["graph.figure"]
+    assert stats["responses"] == 2
+    assert stats["raw_bytes"] == 2 * len(body)
+    assert stats["sent_bytes"] == 2 * len(response.data) < stats["raw_bytes"]
+    assert caplog.messages[-1].endswith(
+        f"2 responses, {stats['raw_bytes']} -> {stats['sent_bytes']} bytes in total"
+    )
@@ -0,0 +1,60 @@
+import os
+
+import numpy as np
+
+from utils.telemetry_utils import KEEP_VERSIONS, VERSION_PREFIX, TelemetryIndex
+
+
+def make_index(scale=1.0):
+    t = np.arange(10, dtype=float)
+    return TelemetryIndex(
+        ["1", "44"],
+        {
+            "SessionTime": t,
+            "Speed": np.full(10, 100.0 * scale, dtype=np.float32),
+            "CumDistance": np.cumsum(np.full(10, 10.0 * scale)),
+        },
+        {("1", 1): (0, 5), ("44", 1): (5, 10)},
+    )
+
+
+def test_export_round_trip(tmp_path):
+    path = str(tmp_path / "session")
+    assert not TelemetryIndex.exported(path)
+
+    make_index().save(path)
+    index = TelemetryIndex.load(path)
+
+    assert TelemetryIndex.exported(path)
+    assert index.mapped
+    assert index.laps("44") == [1]
+    np.testing.assert_allclose(index.lap("44", 1)["Distance"], [0, 10, 20, 30, 40])
+
+
+def test_reexport_swaps_versions_and_keeps_other_files(tmp_path):
+    path = str(tmp_path / "session")
+    os.makedirs(path)
+    with open(os.path.join(path, "replay.json"), "w") as f:
+        f.write("{}")
+
+    make_index().save(path)
+    first = TelemetryIndex.load(path)
+    for scale in (2.0, 3.0, 4.0):
+        make_index(scale).save(path)
+
+    # The latest export is current, older ones are pruned, neighbours survive
+    assert TelemetryIndex.load(path).channels["Speed"][0] == 400.0
+    versions = [v for v in os.listdir(path) if v.startswith(VERSION_PREFIX)]
+    assert len(versions) == KEEP_VERSIONS
+    assert os.path.exists(os.path.join(path, "replay.json"))
+
+    # Arrays mapped before the swap stay readable
+    assert first.channels["Speed"][0] == 100.0
+
+
+def test_samples_address_several_laps():
+    lap_id, sample, first, lengths = make_index().samples([("44", 1), ("1", 1)])
+    assert lengths.tolist() == [5, 5]
+    assert first.tolist() == [0, 5]
+    assert lap_id.tolist() == [0] * 5 + [1] * 5
+    assert sample.tolist() == [5, 6, 7, 8, 9, 0, 1, 2, 3, 4]
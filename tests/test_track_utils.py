@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+from utils.telemetry_utils import TelemetryIndex
+from utils.track_utils import CORNER, MINI_SECTOR, TrackSegments, segment_stats
+
+HZ = 4.0
+SPEED = 50.0  # m/s
+
+
+def constant_speed_lap(start=10.1, length=1000.0):
+    """One lap sampled at HZ whose stamps fall between samples."""
+    end = start + length / SPEED
+    t = np.arange(np.ceil(start * HZ), np.floor(end * HZ) + 1) / HZ
+    index = TelemetryIndex(
+        ["1"],
+        {
+            "SessionTime": t,
+            "CumDistance": (t - start) * SPEED,
+            "Speed": np.full(t.size, SPEED * 3.6, dtype=np.float32),
+            "Throttle": np.full(t.size, 100.0, dtype=np.float32),
+        },
+        {("1", 5): (0, t.size)},
+    )
+    laps = pd.DataFrame({
+        "DriverNumber": ["1"],
+        "LapNumber": [5],
+        "LapStartTime": pd.to_timedelta([start], unit="s"),
+        "Time": pd.to_timedelta([end], unit="s"),
+    })
+    return index, laps, end - start
+
+
+def test_segment_times_add_up_to_the_lap_time():
+    index, laps, lap_time = constant_speed_lap()
+    segments = TrackSegments("Test", [250.0, 750.0], 1000.0)
+
+    stats = segment_stats(index, segments, MINI_SECTOR, laps=laps)
+
+    assert stats["Segment"].tolist() == [1, 2, 3, 4, 5]
+    assert abs(stats["Time"].sum() - lap_time) < 1e-9
+    # Every 200 m mini-sector takes 4 s at 50 m/s, the first and last included
+    np.testing.assert_allclose(stats["Time"], 4.0, atol=0.26)
+
+
+def test_without_lap_stamps_the_outer_samples_are_used():
+    index, _, lap_time = constant_speed_lap()
+    segments = TrackSegments("Test", [250.0, 750.0], 1000.0)
+
+    stats = segment_stats(index, segments, CORNER)
+
+    assert stats["Segment"].tolist() == [1, 2]
+    assert stats["Time"].sum() < lap_time
+
+
+def test_corner_edges_and_assignment():
+    segments = TrackSegments("Test", [100.0, 300.0, 700.0], 1000.0)
+    np.testing.assert_allclose(segments.edges[CORNER], [0.0, 200.0, 500.0])
+    assert segments.assign(np.array([0.0, 199.0, 200.0, 999.0]), CORNER).tolist() == [0, 0, 1, 2]
+    assert segments.labels(CORNER) == ["T1", "T2", "T3"]
@@ -0,0 +1,366 @@
+"""
+Race-weekend load test against the real Dash callback endpoint.
+
+Starts a stub Ergast server and (unless --url is given) the app itself with
+FastF1 in offline mode, served like production by a gunicorn worker pool
+(--workers, default 4; --workers 0 uses the single-process dev server),
+then runs virtual users through scripted journeys:
+
+    race        pick a GP on Race Stats
+    compare     compare two drivers on Comparisons
+    standings   browse a race on Standings
+
+and reports p50/p95/p99 latency, throughput and error rate per callback.
+
+    python -m tools.loadtest --users 20 --duration 60 --workers 4
+    python -m tools.loadtest --url http://127.0.0.1:8050 --journeys race,standings
+
+The FastF1 cache must already hold the sessions used (--season, --round,
+--gp, --session); offline mode never downloads.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+CALLBACK_PATH = "/_dash-update-component"
+STARTUP_TIMEOUT = 180
+DEFAULT_WORKERS = 4
+
+N_DRIVERS = 20
+POINTS = [25, 18, 15, 12, 10, 8, 6, 4, 2, 1]
+
+# ---------------------------------------------------------
+# STUB ERGAST API
+# ---------------------------------------------------------
+class StubErgast:
+    """Deterministic Ergast-compatible season served from memory."""
+
+    def __init__(self, season, rounds, seed=0):
+        rng = random.Random(seed)
+        self.season = str(season)
+        self.races = []
+        for rnd in range(1, rounds + 1):
+            order = rng.sample(range(N_DRIVERS), N_DRIVERS)
+            self.races.append({
+                "season": self.season,
+                "round": str(rnd),
+                "raceName": f"Grand Prix {rnd}",
+                "date": f"{season - 1}-{(rnd - 1) % 12 + 1:02d}-{(rnd - 1) // 12 * 14 + 1:02d}",
+                "time": "14:00:00Z",
+                "Circuit": {"circuitName": f"Circuit {rnd}"},
+                "Results": [self._result(pos, j, rng) for pos, j in enumerate(order, start=1)],
+            })
+
+    @staticmethod
+    def _result(pos, j, rng):
+        return {
+            "number": str(j + 1),
+            "position": str(pos),
+            "points": str(POINTS[pos - 1] if pos <= len(POINTS) else 0),
+            "laps": "57" if pos < 19 else "30",
+            "status": "Finished" if pos < 19 else "Retired",
+            "Driver": {"code": f"D{j:02d}", "givenName": "Driver", "familyName": f"No{j:02d}"},
+            "Constructor": {"name": f"Team {j // 2}"},
+            "Time": {"time": f"+{pos * 1.7:.3f}"},
+            "FastestLap": {"lap": str(40 + pos % 10), "Time": {"time": f"1:3{pos % 10}.{pos * 37 % 1000:03d}"}},
+        }
+
+    def payload(self, path, params):
+        parts = path.strip("/").removesuffix(".json").split("/")
+        limit = int(params.get("limit", [30])[0])
+        offset = int(params.get("offset", [0])[0])
+
+        if parts == [self.season]:
+            races = [{k: v for k, v in r.items() if k != "Results"} for r in self.races]
+        elif parts == [self.season, "results"]:
+            rows = [(r, res) for r in self.races for res in r["Results"]]
+            page = rows[offset:offset + limit]
+            races = {}
+            for race, res in page:
+                races.setdefault(race["round"], {**race, "Results": []})["Results"].append(res)
+            return self._mrdata(list(races.values()), len(rows), limit, offset)
+        elif parts == [self.season, "sprint"]:
+            races = []
+        elif len(parts) == 3 and parts[0] == self.season and parts[2] == "results":
+            races = [r for r in self.races if r["round"] == parts[1]]
+        else:
+            return None
+        return self._mrdata(races, len(races), limit, offset)
+
+    @staticmethod
+    def _mrdata(races, total, limit, offset):
+        return {"MRData": {
+            "total": str(total), "limit": str(limit), "offset": str(offset),
+            "RaceTable": {"Races": races},
+        }}
+
+    def serve(self, port=0):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                body = stub.payload(url.path, parse_qs(url.query))
+                data = json.dumps(body).encode() if body is not None else b"{}"
+                self.send_response(200 if body is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ---------------------------------------------------------
+# APP UNDER TEST
+# ---------------------------------------------------------
+def app_command(port, workers):
+    """gunicorn worker pool serving app:server, or the dev server for workers=0."""
+    if workers == 0:
+        return [sys.executable, "-c",
+                f"from app import app; app.run(port={port}, debug=False, threaded=True)"]
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        raise SystemExit("gunicorn is required for --workers > 0 (pip install gunicorn)")
+    return [sys.executable, "-m", "gunicorn", "app:server",
+            "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+            "--timeout", str(STARTUP_TIMEOUT)]
+
+
+def start_app(port, ergast_url, workers=DEFAULT_WORKERS):
+    env = {**os.environ, "F1_ERGAST_URL": ergast_url, "F1_FASTF1_OFFLINE": "1"}
+    proc = subprocess.Popen(app_command(port, workers), cwd=ROOT, env=env)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("app exited during startup")
+        try:
+            if requests.get(url, timeout=2).ok:
+                return proc, url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    proc.terminate()
+    raise RuntimeError("app did not start in time")
+
+
+# ---------------------------------------------------------
+# CALLBACK CLIENT
+# ---------------------------------------------------------
+def _props(output):
+    parts = output[2:-2].split("...") if output.startswith("..") else [output]
+    # Callbacks without outputs are keyed by a hash, not "id.prop"
+    return [p.rsplit(".", 1) for p in parts if "." in p]
+
+
+class DashClient:
+    """Builds /_dash-update-component requests from the app's dependency graph."""
+
+    def __init__(self, url, stats):
+        self.url = url
+        self.stats = stats
+        self.http = requests.Session()
+        self.http.headers["Accept-Encoding"] = "gzip, br"
+        deps = self.http.get(f"{url}/_dash-dependencies", timeout=30).json()
+        self.deps = {
+            f"{cid}.{prop}": dep
+            for dep in deps
+            for cid, prop in _props(dep["output"])
+        }
+
+    def call(self, target, values):
+        """
+        Fire the callback producing `target` ("id.prop"); returns its response
+        dict. Any failure is counted against `target`, never raised.
+        """
+        start = time.perf_counter()
+        try:
+            dep = self.deps[target]
+            outputs = [{"id": cid, "property": prop} for cid, prop in _props(dep["output"])]
+            fill = lambda items: [
+                {**i, "value": values.get(f"{i['id']}.{i['property']}")} for i in items
+            ]
+            body = {
+                "output": dep["output"],
+                "outputs": outputs if dep["output"].startswith("..") else outputs[0],
+                "inputs": fill(dep["inputs"]),
+                "state": fill(dep.get("state", [])),
+                "changedPropIds": [f"{i['id']}.{i['property']}" for i in dep["inputs"][:1]],
+            }
+            r = self.http.post(self.url + CALLBACK_PATH, json=body, timeout=120)
+            error = None if r.status_code in (200, 204) else f"HTTP {r.status_code}"
+            data = r.json().get("response", {}) if r.status_code == 200 else {}
+        except Exception as e:
+            error, data = type(e).__name__, {}
+        self.stats.record(target, time.perf_counter() - start, error)
+        return data
+
+    @staticmethod
+    def value(data, target):
+        cid, prop = target.rsplit(".", 1)
+        return data.get(cid, {}).get(prop)
+
+
+# ---------------------------------------------------------
+# JOURNEYS
+# ---------------------------------------------------------
+def journey_race(client, args):
+    data = client.call("rs-gp.options", {"rs-season.value": args.season})
+    options = client.value(data, "rs-gp.options") or [{"value": args.round}]
+    client.call("rs-laptime-dist.figure", {
+        "rs-season.value": args.season,
+        "rs-gp.value": random.choice(options)["value"] if args.random_round else args.round,
+        "rs-live-mode.value": [],
+    })
+
+
+def journey_compare(client, args):
+    values = {"year-dropdown.value": args.season}
+    client.call("event-dropdown.options", values)
+    values["event-dropdown.value"] = args.gp
+    client.call("session-dropdown.options", values)
+    values["session-dropdown.value"] = args.session
+    data = client.call("drivers-dropdown.options", values)
+    drivers = [o["value"] for o in client.value(data, "drivers-dropdown.options") or []]
+    values.update({
+        "drivers-dropdown.value": random.sample(drivers, 2) if len(drivers) >= 2 else args.drivers,
+        "lap-select.value": "fastest",
+    })
+    client.call("cmp-lap.figure", values)
+
+
+def journey_standings(client, args):
+    data = client.call("race-select.options", {"season-select.value": str(args.season)})
+    options = client.value(data, "race-select.options") or [{"value": str(args.round)}]
+    client.call("summary-cards.children", {
+        "race-select.value": random.choice(options)["value"],
+        "season-select.value": str(args.season),
+    })
+
+
+JOURNEYS = {
+    "race": journey_race,
+    "compare": journey_compare,
+    "standings": journey_standings,
+}
+
+# ---------------------------------------------------------
+# STATS
+# ---------------------------------------------------------
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+        # (target, error kind) -> count, for the error breakdown
+        self.kinds = defaultdict(int)
+
+    def record(self, target, seconds, error=None):
+        with self.lock:
+            self.latency[target].append(seconds)
+            if error is not None:
+                self.errors[target] += 1
+                self.kinds[(target, error)] += 1
+
+    def report(self, elapsed):
+        print(f"\n{'callback':<28} {'calls':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>7} {'errors':>7}")
+        for target in sorted(self.latency):
+            lat = np.asarray(self.latency[target]) * 1e3
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            print(
+                f"{target:<28} {lat.size:>6} {p50:>9.1f} {p95:>9.1f} {p99:>9.1f} "
+                f"{lat.size / elapsed:>7.2f} {self.errors[target] / lat.size:>7.1%}"
+            )
+        total = sum(len(v) for v in self.latency.values())
+        errors = sum(self.errors.values())
+        print(f"\n{total} calls in {elapsed:.1f}s: {total / elapsed:.2f} req/s, "
+              f"error rate {errors / max(total, 1):.1%}")
+        for (target, kind), count in sorted(self.kinds.items()):
+            print(f"  {target}: {count} x {kind}")
+
+
+# ---------------------------------------------------------
+# RUN
+# ---------------------------------------------------------
+def virtual_user(url, args, stats, stop):
+    try:
+        client = DashClient(url, stats)
+    except Exception as e:
+        stats.record("user startup", 0.0, type(e).__name__)
+        return
+    while not stop.is_set():
+        name = random.choice(args.journeys)
+        start = time.perf_counter()
+        try:
+            JOURNEYS[name](client, args)
+        except Exception as e:
+            # A broken journey is counted; the user keeps going
+            stats.record(f"journey {name}", time.perf_counter() - start, type(e).__name__)
+        time.sleep(random.uniform(0, args.think))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="app to test; started locally when omitted")
+    parser.add_argument("--port", type=int, default=8051)
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help="gunicorn workers for the local app (0: dev server)")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--think", type=float, default=1.0, help="max pause between journeys (s)")
+    parser.add_argument("--journeys", type=lambda s: s.split(","), default=list(JOURNEYS))
+    parser.add_argument("--season", type=int, default=2025)
+    parser.add_argument("--round", type=int, default=1)
+    parser.add_argument("--random-round", action="store_true", help="pick any round on Race")
+    parser.add_argument("--gp", default="Australian Grand Prix")
+    parser.add_argument("--session", default="Race")
+    parser.add_argument("--drivers", type=lambda s: s.split(","), default=["1", "4"])
+    parser.add_argument("--stub-rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    stub, ergast_url = StubErgast(args.season, args.stub_rounds).serve()
+    print(f"stub Ergast API at {ergast_url}")
+
+    proc, url = (None, args.url) if args.url else start_app(args.port, ergast_url, args.workers)
+    stats, stop = Stats(), threading.Event()
+    try:
+        users = [
+            threading.Thread(target=virtual_user, args=(url, args, stats, stop), daemon=True)
+            for _ in range(args.users)
+        ]
+        start = time.perf_counter()
+        for user in users:
+            user.start()
+        time.sleep(args.duration)
+        stop.set()
+        for user in users:
+            user.join(timeout=120)
+        stats.report(time.perf_counter() - start)
+    finally:
+        stub.shutdown()
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main()
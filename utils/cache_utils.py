@@ -1 +1,510 @@
-# Caching mechanisms
\ No newline at end of file
+import gc
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import fastf1 as ff1
+import pandas as pd
+import requests
+from fastf1.req import RateLimitExceededError
+
+from utils.insights_utils import session_insights
+from utils.math_utils import gap_matrices, position_matrix, stint_table
+from utils.replay_utils import REPLAY_FILE, RaceReplay
+from utils.season_utils import is_completed
+from utils.telemetry_utils import (
+    FASTEST_LAP,
+    TelemetryIndex,
+    select_lap,
+    telemetry_path,
+)
+from utils.track_utils import MINI_SECTOR, TrackSegments, segment_stats, segments_path
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+RACE_CACHE_SIZE = 8
+SESSION_CACHE_SIZE = 4
+REPLAY_CACHE_SIZE = 2
+
+# Budget (MB) for the sessions' own data (laps, telemetry, in-memory
+# indexes) above which cached telemetry, then whole sessions, are evicted
+SESSION_BUDGET_MB = int(os.environ.get("F1_SESSION_BUDGET_MB", "2048"))
+
+# Per-session driver insights persisted next to the telemetry export
+INSIGHTS_FILES = ("insights_drivers.parquet", "insights_corners.parquet")
+
+# Seconds a failed load is remembered before it may be retried
+FAILED_LOAD_TTL = 300
+# Failures worth retrying straight away (network hiccups, rate limits)
+TRANSIENT_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    requests.exceptions.ConnectionError,
+    requests.exceptions.Timeout,
+    RateLimitExceededError,
+)
+
+# Completed seasons each season-cached function keeps entries for
+PAST_SEASONS_CACHED = 4
+
+# FastF1's request/parse cache, shared by every page and kept next to the
+# season, telemetry and segment exports
+FASTF1_CACHE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "cache"))
+os.makedirs(FASTF1_CACHE_DIR, exist_ok=True)
+ff1.Cache.enable_cache(FASTF1_CACHE_DIR)
+
+# Serve FastF1 data from the local cache only (load tests, no network)
+if os.environ.get("F1_FASTF1_OFFLINE"):
+    ff1.Cache.offline_mode(True)
+
+# ---------------------------------------------------------
+# NEGATIVE CACHE
+# ---------------------------------------------------------
+def _raise_cached(exc_type, args):
+    try:
+        exc = exc_type(*args)
+    except Exception:
+        exc = RuntimeError(*args)
+    raise exc from None
+
+
+def negative_cached(ttl=FAILED_LOAD_TTL):
+    """
+    Remember loads that raised for `ttl` seconds and raise the same kind
+    of error immediately instead of retrying the expensive load.
+
+    Only the exception type and args are kept (not the exception, whose
+    traceback would pin the failed call's locals), and transient network
+    errors are never remembered.
+    """
+    def decorator(fn):
+        failures = {}
+
+        @wraps(fn)
+        def wrapper(*args):
+            now = time.monotonic()
+            failed = failures.get(args)
+            if failed:
+                if failed[0] > now:
+                    _raise_cached(failed[1], failed[2])
+                failures.pop(args, None)
+            try:
+                return fn(*args)
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception as e:
+                for key in [k for k, f in failures.items() if f[0] <= now]:
+                    failures.pop(key, None)
+                failures[args] = (now + ttl, type(e), e.args)
+                raise
+
+        wrapper.failures = failures
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------
+# PER-SEASON CACHE
+# ---------------------------------------------------------
+def _is_empty(value):
+    return value is None or (isinstance(value, (list, dict)) and not value)
+
+
+def season_cached(maxsize, current_ttl=None):
+    """
+    LRU cache for functions whose first argument is a season, partitioned
+    by season: each season holds up to `maxsize` entries of its own, so
+    browsing history never evicts current-season data, and at most
+    PAST_SEASONS_CACHED completed seasons are kept.
+
+    Completed seasons are immutable and never revalidated; current-season
+    entries are recomputed after `current_ttl` seconds (None: never).
+    Empty results (None, [] or {}) are not cached.
+    """
+    def decorator(fn):
+        partitions = OrderedDict()
+        lock = threading.Lock()
+
+        @wraps(fn)
+        def wrapper(season, *args, **kwargs):
+            season = int(season)
+            key = (args, tuple(sorted(kwargs.items())))
+            with lock:
+                hit = partitions.get(season, {}).get(key)
+                if hit is not None and (
+                    current_ttl is None
+                    or is_completed(season)
+                    or time.monotonic() - hit[1] < current_ttl
+                ):
+                    partitions[season].move_to_end(key)
+                    partitions.move_to_end(season)
+                    return hit[0]
+
+            value = fn(season, *args, **kwargs)
+            if _is_empty(value):
+                return value
+
+            with lock:
+                partition = partitions.setdefault(season, OrderedDict())
+                partition[key] = (value, time.monotonic())
+                partition.move_to_end(key)
+                partitions.move_to_end(season)
+                while len(partition) > maxsize:
+                    partition.popitem(last=False)
+
+                past = [s for s in partitions if is_completed(s)]
+                for old in past[:-PAST_SEASONS_CACHED]:
+                    del partitions[old]
+            return value
+
+        wrapper.partitions = partitions
+        wrapper.cache_clear = partitions.clear
+        wrapper.invalidate = lambda season: partitions.pop(int(season), None)
+        return wrapper
+    return decorator
+
+
+# ---------------------------------------------------------
+# RACE SESSIONS
+# ---------------------------------------------------------
+@negative_cached()
+@season_cached(RACE_CACHE_SIZE)
+def get_race_session(season, round_no):
+    """Load a race session (laps only) once and keep it in memory."""
+    session = ff1.get_session(season, round_no, "R")
+    session.load(laps=True, telemetry=False, weather=False)
+    return session
+
+
+# ---------------------------------------------------------
+# SESSION STORE (WITH TELEMETRY)
+# ---------------------------------------------------------
+def _frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum()) if df is not None else 0
+
+
+def _telemetry_bytes(session):
+    return sum(
+        _frame_bytes(df)
+        for data in (session.car_data, session.pos_data)
+        for df in (data or {}).values()
+    )
+
+
+def _entry_bytes(entry):
+    telemetry = entry["telemetry_bytes"] if entry["telemetry"] else 0
+    return entry["laps_bytes"] + entry["index_bytes"] + telemetry
+
+
+class SessionStore:
+    """
+    LRU store of loaded sessions that tracks how much memory each one
+    holds (DataFrame memory_usage(deep=True) and index nbytes). While
+    that total is over the budget, the telemetry of the least recently
+    used sessions (raw car/position data and the per-lap index) is
+    dropped first; whole sessions go only after that.
+    Sessions of completed seasons are evicted before current-season ones.
+    Memory-mapped indexes live in the shared page cache and count as 0.
+    usage() reports the tracked bytes per session and in total.
+    """
+
+    def __init__(self, budget_bytes, max_sessions=SESSION_CACHE_SIZE):
+        self.budget_bytes = budget_bytes
+        self.max_sessions = max_sessions
+        self.entries = OrderedDict()
+        self.lock = threading.RLock()
+
+    def session(self, key, telemetry=True):
+        """
+        Loaded session; with `telemetry`, one whose raw car/position data is
+        in memory (reloaded if it was evicted).
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry["telemetry"] or not telemetry):
+                self.entries.move_to_end(key)
+                return entry["session"]
+
+        year, gp, session_type = key
+        session = ff1.get_event(year, gp).get_session(session_type)
+        session.load(telemetry=telemetry, laps=True, weather=False)
+
+        with self.lock:
+            previous = self.entries.get(key) or {}
+            self.entries[key] = {
+                "session": session,
+                "telemetry": telemetry,
+                "index": previous.get("index"),
+                "laps_bytes": _frame_bytes(session.laps) + _frame_bytes(session.results),
+                "telemetry_bytes": _telemetry_bytes(session) if telemetry else 0,
+                "index_bytes": previous.get("index_bytes", 0),
+            }
+            self.entries.move_to_end(key)
+            self._enforce(keep=key)
+        return session
+
+    def index(self, key):
+        """
+        Per-lap TelemetryIndex of a session. It is exported once to a
+        memory-mapped columnar store and read back from there, so the raw
+        telemetry is not needed (or kept) after the first build.
+        """
+        path = telemetry_path(*key)
+        exported = TelemetryIndex.exported(path)
+
+        self.session(key, telemetry=not exported)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry["index"] is not None:
+                return entry["index"]
+
+        index = None
+        if exported:
+            try:
+                index = TelemetryIndex.load(path)
+            except (OSError, ValueError, KeyError) as e:
+                print("Telemetry export read error, rebuilding:", e)
+
+        if index is None:
+            index = TelemetryIndex.from_session(self.session(key))
+            try:
+                index.save(path)
+                index = TelemetryIndex.load(path)
+            except OSError as e:
+                print("Telemetry export error:", e)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                if index.mapped and entry["telemetry"]:
+                    self._drop_telemetry(key)
+                entry["index"] = index
+                entry["index_bytes"] = 0 if index.mapped else index.nbytes
+                self._enforce(keep=key)
+        return index
+
+    def usage(self):
+        """Tracked bytes per session key, their total and the budget."""
+        with self.lock:
+            sessions = {key: _entry_bytes(e) for key, e in self.entries.items()}
+        return {
+            "sessions": sessions,
+            "total_bytes": sum(sessions.values()),
+            "budget_bytes": self.budget_bytes,
+        }
+
+    def _tracked_bytes(self):
+        return sum(_entry_bytes(e) for e in self.entries.values())
+
+    def _over_budget(self):
+        return self._tracked_bytes() > self.budget_bytes
+
+    def _drop_telemetry(self, key):
+        entry = self.entries[key]
+        session = entry["session"]
+        for attr in ("_car_data", "_pos_data"):
+            if hasattr(session, attr):
+                delattr(session, attr)
+        entry.update(telemetry=False, index=None, index_bytes=0)
+
+    def _eviction_order(self, keep):
+        # Least recently used first, completed seasons before the current one
+        others = [k for k in self.entries if k != keep]
+        return sorted(others, key=lambda k: not is_completed(k[0]))
+
+    def _enforce(self, keep):
+        # Caller holds the lock; the entry just used is never evicted
+        while len(self.entries) > self.max_sessions:
+            del self.entries[self._eviction_order(keep)[0]]
+
+        evicted = False
+        while self._over_budget():
+            others = self._eviction_order(keep)
+            with_telemetry = [k for k in others if self.entries[k]["telemetry"]]
+            if with_telemetry:
+                self._drop_telemetry(with_telemetry[0])
+            elif others:
+                del self.entries[others[0]]
+            else:
+                break
+            evicted = True
+        if evicted:
+            gc.collect()
+
+
+SESSION_STORE = SessionStore(SESSION_BUDGET_MB * 2**20)
+
+
+@negative_cached()
+def session_laps(year, gp, session_type):
+    """Laps of a session, without loading its raw telemetry."""
+    return SESSION_STORE.session((year, gp, session_type), telemetry=False).laps
+
+
+@negative_cached()
+@season_cached(SESSION_CACHE_SIZE)
+def session_results(year, gp, session_type):
+    """Classification of a session, without laps or telemetry."""
+    session = ff1.get_event(year, gp).get_session(session_type)
+    session.load(laps=False, telemetry=False, weather=False, messages=False)
+    return session.results
+
+
+@negative_cached()
+def telemetry_index(year, gp, session_type):
+    """Per-lap telemetry index of a session, built once (see telemetry_utils)."""
+    return SESSION_STORE.index((year, gp, session_type))
+
+
+def lap_telemetry(year, gp, session_type, driver, choice=FASTEST_LAP, lap_number=None):
+    """
+    (driver abbreviation, driver laps, selected lap number, lap telemetry)
+    for one driver; the telemetry is a slice of the session's index.
+    """
+    index = telemetry_index(year, gp, session_type)
+    laps = session_laps(year, gp, session_type).pick_drivers(driver)
+    if laps.empty:
+        return None, laps, None, None
+
+    lap_no = select_lap(laps, choice, lap_number)
+    tel = index.lap(driver, lap_no) if lap_no else None
+    return laps["Driver"].iloc[0], laps, lap_no, tel
+
+
+@negative_cached()
+@season_cached(SESSION_CACHE_SIZE)
+def driver_insights(year, gp, session_type):
+    """
+    (drivers, corners) insight tables of a session (see
+    insights_utils.session_insights), computed once and kept on disk.
+    """
+    path = telemetry_path(year, gp, session_type)
+    files = [os.path.join(path, name) for name in INSIGHTS_FILES]
+    if all(os.path.exists(f) for f in files):
+        return tuple(pd.read_parquet(f) for f in files)
+
+    index = telemetry_index(year, gp, session_type)
+    apexes = track_segments(year, gp, session_type).apexes
+    tables = session_insights(index, session_laps(year, gp, session_type), apexes)
+
+    os.makedirs(path, exist_ok=True)
+    for table, f in zip(tables, files):
+        table.to_parquet(f, index=False)
+    return tables
+
+
+# ---------------------------------------------------------
+# CIRCUIT SEGMENTATION
+# ---------------------------------------------------------
+# (season, circuit) -> TrackSegments, shared by every session held there
+# that season; a circuit's layout can change from one season to the next
+_SEGMENTS = {}
+
+
+def _circuit_apexes(session):
+    """Corner distances from FastF1's circuit info, when it can be loaded."""
+    try:
+        info = session.get_circuit_info()
+        return info.corners["Distance"].to_numpy(dtype=float) if info is not None else None
+    except Exception:
+        return None
+
+
+@negative_cached()
+def track_segments(year, gp, session_type):
+    """
+    Corner and mini-sector segmentation and outline of the session's
+    circuit. Derived once per circuit and season from the session's fastest
+    lap (corners from FastF1 circuit info if available) and kept on disk as
+    JSON.
+    """
+    session = SESSION_STORE.session((year, gp, session_type), telemetry=False)
+    circuit = str(session.event["Location"])
+    key = (int(year), circuit)
+    if key in _SEGMENTS:
+        return _SEGMENTS[key]
+
+    path = segments_path(year, circuit)
+    if os.path.exists(path):
+        segments = TrackSegments.load(path)
+    else:
+        index = telemetry_index(year, gp, session_type)
+        timed = session.laps.dropna(subset=["LapTime"])
+        if timed.empty:
+            raise ValueError(f"No timed laps for {circuit}")
+        fastest = timed.loc[timed["LapTime"].idxmin()]
+        tel = index.lap(fastest["DriverNumber"], fastest["LapNumber"])
+        if tel is None or not len(tel["Distance"]):
+            raise ValueError(f"No reference lap for {circuit}")
+        segments = TrackSegments.from_lap(
+            circuit, tel["Distance"], tel["Speed"], _circuit_apexes(session),
+            x=tel["X"], y=tel["Y"],
+        )
+        segments.save(path)
+
+    _SEGMENTS[key] = segments
+    return segments
+
+
+@negative_cached()
+@season_cached(SESSION_CACHE_SIZE * 2)
+def sector_stats(year, gp, session_type, kind=MINI_SECTOR):
+    """
+    Min speed, time and mean throttle per (driver, lap, segment) for every
+    lap of a session (see track_utils.segment_stats).
+    """
+    index = telemetry_index(year, gp, session_type)
+    laps = session_laps(year, gp, session_type)
+    stats = segment_stats(index, track_segments(year, gp, session_type), kind, laps=laps)
+
+    codes = dict(zip(laps["DriverNumber"].astype(str), laps["Driver"]))
+    stats.insert(0, "Driver", stats["DriverNumber"].map(codes))
+    return stats
+
+
+# ---------------------------------------------------------
+# RACE REPLAY
+# ---------------------------------------------------------
+@negative_cached()
+@season_cached(REPLAY_CACHE_SIZE)
+def race_replay(year, gp, session_type="Race"):
+    """
+    Time-indexed car positions of a session (see replay_utils.RaceReplay),
+    built once from its telemetry index and memory-mapped from disk.
+    """
+    index = telemetry_index(year, gp, session_type)
+    path = telemetry_path(year, gp, session_type)
+    if os.path.exists(os.path.join(path, REPLAY_FILE)):
+        return RaceReplay.load(path)
+
+    replay = RaceReplay.from_index(index)
+    try:
+        replay.save(path)
+        replay = RaceReplay.load(path)
+    except OSError as e:
+        print("Replay export error:", e)
+    return replay
+
+
+# ---------------------------------------------------------
+# PER-RACE DERIVED ARTIFACTS
+# ---------------------------------------------------------
+@season_cached(RACE_CACHE_SIZE)
+def race_positions(season, round_no):
+    """Lap x driver position matrix for a race (see math_utils.position_matrix)."""
+    return position_matrix(get_race_session(season, round_no).laps)
+
+
+@season_cached(RACE_CACHE_SIZE)
+def race_stints(season, round_no):
+    """Per-stint table for a race (see math_utils.stint_table)."""
+    return stint_table(get_race_session(season, round_no).laps)
+
+
+@season_cached(RACE_CACHE_SIZE)
+def race_gaps(season, round_no):
+    """Lap x driver gap-to-leader and interval matrices (see math_utils.gap_matrices)."""
+    return gap_matrices(get_race_session(season, round_no).laps)
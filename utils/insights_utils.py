@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+from utils.math_utils import QUICKLAP_THRESHOLD, clean_lap_mask
+from utils.track_utils import detect_corners
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+# Throttle (%) counted as flat out
+FULL_THROTTLE = 98.0
+# Brake applications up to this far (m) before a corner apex belong to it
+BRAKE_WINDOW_M = 400.0
+# Laps with a braking point needed before a corner's spread is reported
+MIN_BRAKE_LAPS = 3
+
+INSIGHT_COLUMNS = [
+    "Driver", "Team", "CleanLaps", "BestLap", "LapTimeStd", "LapTimeCV",
+    "FullThrottlePct", "BrakeSpread",
+]
+CORNER_COLUMNS = ["Driver", "Corner", "Apex", "BrakePoint", "BrakeSpread", "Laps"]
+
+# ---------------------------------------------------------
+# DRIVER INSIGHTS
+# ---------------------------------------------------------
+def session_insights(index, laps, apexes=None):
+    """
+    Consistency, throttle and braking style for every driver of a session,
+    computed in one vectorized pass over all clean laps' telemetry in a
+    TelemetryIndex.
+
+    Returns (drivers, corners):
+    - drivers: one row per driver (INSIGHT_COLUMNS). LapTimeStd / LapTimeCV
+      are the dispersion of clean quick laps, FullThrottlePct the share of
+      lap time at FULL_THROTTLE or above and BrakeSpread the median over
+      corners of the lap-to-lap spread (std, m) of the braking point.
+    - corners: one row per (driver, corner) with the mean braking point
+      (m before the apex) and its spread.
+
+    Corners are the circuit's `apexes` (m from the line) when given, else
+    detected on the session's fastest clean lap.
+    """
+    clean = laps[clean_lap_mask(laps)].copy()
+    clean["Seconds"] = clean["LapTime"].dt.total_seconds()
+    best = clean.groupby("Driver")["Seconds"].transform("min")
+    clean = clean[clean["Seconds"] <= best * QUICKLAP_THRESHOLD]
+
+    if clean.empty:
+        return pd.DataFrame(columns=INSIGHT_COLUMNS), pd.DataFrame(columns=CORNER_COLUMNS)
+
+    # ---------- CONSISTENCY ----------
+    by_driver = clean.groupby("Driver")
+    drivers = pd.DataFrame({
+        "Team": by_driver["Team"].first(),
+        "CleanLaps": by_driver.size(),
+        "BestLap": by_driver["Seconds"].min(),
+        "LapTimeStd": by_driver["Seconds"].std(),
+    })
+    drivers["LapTimeCV"] = drivers["LapTimeStd"] / by_driver["Seconds"].mean() * 100
+
+    # ---------- SAMPLES OF ALL CLEAN LAPS ----------
+    keys = list(zip(clean["DriverNumber"].astype(str), clean["LapNumber"].astype(int)))
+    has_tel = np.array([
+        k in index.index and index.index[k][1] > index.index[k][0] for k in keys
+    ], dtype=bool)
+    clean = clean[has_tel]
+    if clean.empty:
+        drivers["FullThrottlePct"] = np.nan
+        drivers["BrakeSpread"] = np.nan
+        return drivers.reset_index()[INSIGHT_COLUMNS], pd.DataFrame(columns=CORNER_COLUMNS)
+
+    lap_id, sample, first, lengths = index.samples([k for k, ok in zip(keys, has_tel) if ok])
+    n_laps = len(lengths)
+
+    codes, driver_of_lap = np.unique(clean["Driver"].to_numpy(), return_inverse=True)
+    driver_id = driver_of_lap[lap_id]
+    lap_start = np.zeros(len(sample), dtype=bool)
+    lap_start[first] = True
+
+    ch = index.channels
+    t = np.asarray(ch["SessionTime"])[sample]
+    dist = np.asarray(ch["CumDistance"])[sample]
+    dist = dist - np.repeat(dist[first], lengths)
+
+    # ---------- FULL THROTTLE ----------
+    dt = np.where(lap_start, 0.0, np.diff(t, prepend=t[:1]))
+    flat = np.asarray(ch["Throttle"])[sample] >= FULL_THROTTLE
+    total = np.bincount(driver_id, weights=dt, minlength=len(codes))
+    full = np.bincount(driver_id, weights=dt * flat, minlength=len(codes))
+    drivers["FullThrottlePct"] = pd.Series(full / np.where(total > 0, total, np.nan) * 100, index=codes)
+
+    # ---------- BRAKING POINTS ----------
+    if apexes is None:
+        ref = int(np.argmin(clean["Seconds"].to_numpy()))
+        in_ref = lap_id == ref
+        apexes = detect_corners(dist[in_ref], np.asarray(ch["Speed"])[sample][in_ref])
+    apexes = np.asarray(apexes, dtype=float)
+
+    brake = np.asarray(ch["Brake"])[sample].astype(bool)
+    onset = brake & ~np.r_[False, brake[:-1]]
+    onset[first] = False  # the previous sample belongs to another lap
+    d_on, lap_on = dist[onset], lap_id[onset]
+
+    corner = np.searchsorted(apexes, d_on)
+    ahead = np.where(corner < len(apexes), apexes[np.minimum(corner, len(apexes) - 1)] - d_on, np.inf)
+    keep = ahead <= BRAKE_WINDOW_M
+
+    # Earliest application per (lap, corner) = distance before the apex
+    point = np.full((n_laps, len(apexes)), np.nan)
+    np.fmax.at(point, (lap_on[keep], corner[keep]), ahead[keep])
+
+    valid = ~np.isnan(point)
+    x = np.where(valid, point, 0.0)
+    n = np.zeros((len(codes), len(apexes)))
+    s1, s2 = n.copy(), n.copy()
+    np.add.at(n, driver_of_lap, valid)
+    np.add.at(s1, driver_of_lap, x)
+    np.add.at(s2, driver_of_lap, x * x)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = s1 / n
+        spread = np.sqrt(np.maximum(s2 / n - mean ** 2, 0) * n / (n - 1))
+    spread[n < MIN_BRAKE_LAPS] = np.nan
+
+    corners = pd.DataFrame({
+        "Driver": np.repeat(codes, len(apexes)),
+        "Corner": np.tile(np.arange(1, len(apexes) + 1), len(codes)),
+        "Apex": np.tile(apexes, len(codes)),
+        "BrakePoint": mean.ravel(),
+        "BrakeSpread": spread.ravel(),
+        "Laps": n.ravel().astype(int),
+    })
+    drivers["BrakeSpread"] = pd.DataFrame(spread, index=codes).median(axis=1)
+
+    drivers.index.name = "Driver"
+    return drivers.reset_index()[INSIGHT_COLUMNS], corners
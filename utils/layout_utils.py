@@ -1 +1,165 @@
-# Shared layout wrappers
\ No newline at end of file
+# Shared layout wrappers
+import pandas as pd
+from dash import clientside_callback
+
+# ---------------------------------------------------------
+# OPTIONS AND TABLE ROWS
+# ---------------------------------------------------------
+def _column(frame, col):
+    """A column by name, or an already-computed Series/array as is."""
+    return frame[col] if isinstance(col, str) else col
+
+
+def dropdown_options(frame, label, value):
+    """
+    Dropdown options from two columns in one to_dict call. `label` and
+    `value` are column names or precomputed Series (e.g. string concatenations).
+    """
+    if len(frame) == 0:
+        return []
+    return pd.DataFrame({
+        "label": pd.Series(_column(frame, label)).to_numpy(),
+        "value": pd.Series(_column(frame, value)).to_numpy(),
+    }).to_dict("records")
+
+
+def driver_options(names):
+    """Driver dropdown options, "Full Name (CODE)" by code, from {code: full name}."""
+    if not names:
+        return []
+    names = pd.Series(names, dtype=object).sort_index()
+    return dropdown_options(names, names + " (" + names.index + ")", names.index)
+
+
+def table_rows(frame, columns):
+    """
+    Table rows from preselected columns; `columns` maps output key to a
+    column name or a precomputed Series.
+    """
+    if len(frame) == 0:
+        return []
+    return pd.DataFrame({
+        key: pd.Series(_column(frame, col)).to_numpy() for key, col in columns.items()
+    }).to_dict("records")
+
+
+# ---------------------------------------------------------
+# CLIENTSIDE CALLBACKS
+# ---------------------------------------------------------
+# UI-only callbacks run in the browser; each entry is the JS source of a
+# dash clientside function, registered with clientside(name, ...)
+CLIENTSIDE_FUNCTIONS = {
+    # {"display": "block"} for every output once all inputs are set
+    # (non-empty), {"display": "none"} otherwise
+    "show_when_set": """
+function() {
+    const isSet = v => v !== null && v !== undefined && v !== "" &&
+        !(Array.isArray(v) && v.length === 0) &&
+        !(typeof v === "object" && !Array.isArray(v) && Object.keys(v).length === 0);
+    const style = {display: Array.from(arguments).every(isSet) ? "block" : "none"};
+    const outputs = dash_clientside.callback_context.outputs_list;
+    return Array.isArray(outputs) ? outputs.map(() => style) : style;
+}
+""",
+    # Pan the Leaflet map inside the folium iframe to the selected round
+    # and recolour its markers, instead of rebuilding the map file
+    "recenter_map": """
+function(round, coords) {
+    const target = coords && coords[round];
+    const frame = document.getElementById("folium-map");
+    if (!target || !frame) { return; }
+
+    const apply = () => {
+        const win = frame.contentWindow;
+        if (!win || !win.L) { return false; }
+        const map = Object.values(win).find(v => v instanceof win.L.Map);
+        if (!map) { return false; }
+
+        map.setView(target, map.getZoom());
+        map.eachLayer(layer => {
+            if (!(layer instanceof win.L.Marker) || !win.L.AwesomeMarkers) { return; }
+            const ll = layer.getLatLng();
+            const selected = ll.lat === target[0] && ll.lng === target[1];
+            layer.setIcon(win.L.AwesomeMarkers.icon({
+                icon: "flag", prefix: "fa", markerColor: selected ? "green" : "red",
+            }));
+        });
+        return true;
+    };
+
+    if (!apply()) {
+        frame.addEventListener("load", apply, {once: true});
+    }
+}
+""",
+    # Play / pause: enable the replay clock and relabel the button
+    "toggle_play": """
+function(n) {
+    const playing = Boolean(n && n % 2);
+    return [!playing, playing ? "Pause" : "Play"];
+}
+""",
+    # Race replay animation. Position chunks (base64 float32, frame x
+    # driver x 2) are decoded into a small window around the playhead;
+    # each tick moves the car markers with Plotly.restyle and asks the
+    # server for the next chunk, so no figure is rebuilt per frame.
+    "replay_tick": """
+function(n, chunk, seek, meta, speed) {
+    const noUpdate = dash_clientside.no_update;
+    if (!meta) { return [noUpdate, ""]; }
+
+    let st = window.f1Replay;
+    if (!st || st.key !== meta.key) {
+        st = window.f1Replay = {key: meta.key, chunks: {}, frame: 0, requested: null};
+    }
+
+    if (chunk && chunk.key === meta.key && !(chunk.chunk in st.chunks)) {
+        const bytes = Uint8Array.from(atob(chunk.data), c => c.charCodeAt(0));
+        st.chunks[chunk.chunk] = new Float32Array(bytes.buffer);
+        if (st.requested === chunk.chunk) { st.requested = null; }
+    }
+
+    const triggered = dash_clientside.callback_context.triggered.map(t => t.prop_id);
+    if (triggered.includes("rs-replay-seek.value")) {
+        st.frame = seek || 0;
+        st.requested = null;
+    } else if (triggered.includes("rs-replay-clock.n_intervals")) {
+        st.frame = Math.min(st.frame + (speed || 1), meta.frames - 1);
+    }
+
+    const c = Math.floor(st.frame / meta.chunk);
+    Object.keys(st.chunks).forEach(k => {
+        if (k < c - 1 || k > c + 2) { delete st.chunks[k]; }
+    });
+
+    const data = st.chunks[c];
+    const graph = document.querySelector("#rs-replay .js-plotly-plot");
+    if (data && graph) {
+        const n = meta.drivers.length;
+        const base = (st.frame - c * meta.chunk) * n * 2;
+        const xs = [], ys = [];
+        for (let j = 0; j < n; j++) {
+            xs.push(data[base + 2 * j]);
+            ys.push(data[base + 2 * j + 1]);
+        }
+        Plotly.restyle(graph, {x: [xs], y: [ys]}, [meta.trace]);
+    }
+
+    let request = noUpdate;
+    const next = data ? c + 1 : c;
+    if (next < meta.chunks && !(next in st.chunks) && st.requested !== next) {
+        st.requested = next;
+        request = {key: meta.key, chunk: next};
+    }
+
+    const secs = Math.floor(st.frame / meta.hz);
+    const clock = Math.floor(secs / 60) + ":" + String(secs % 60).padStart(2, "0");
+    return [request, clock + " / " + meta.duration];
+}
+""",
+}
+
+
+def clientside(name, *dependencies, **kwargs):
+    """Register a clientside callback running CLIENTSIDE_FUNCTIONS[name]."""
+    clientside_callback(CLIENTSIDE_FUNCTIONS[name], *dependencies, **kwargs)
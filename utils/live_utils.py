@@ -0,0 +1,156 @@
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.math_utils import QUICKLAP_THRESHOLD, box_stats
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+REPLAY_SPEED = 20.0       # replayed session seconds per wall-clock second
+MAX_LIVE_SESSIONS = 16
+
+# ---------------------------------------------------------
+# FEEDS
+# ---------------------------------------------------------
+class ReplayFeed:
+    """
+    Local stand-in for a live timing feed: emits the laps of an
+    already recorded session as their session time is reached.
+    A real feed only needs to provide the same `poll()` method.
+
+    `started` is a wall-clock timestamp so that a feed rebuilt in
+    another worker process replays from the same point.
+    """
+
+    def __init__(self, laps, speed=REPLAY_SPEED, clock=time.time, started=None):
+        laps = laps.dropna(subset=["Time"]).sort_values("Time")
+        self._laps = laps.reset_index(drop=True)
+        self._times = self._laps["Time"].dt.total_seconds().to_numpy()
+        self._origin = self._times[0] if len(self._times) else 0.0
+        self._speed = speed
+        self._clock = clock
+        self.started = clock() if started is None else started
+        self.cursor = 0
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self._laps)
+
+    def advance(self, stop):
+        """Return the laps between the cursor and `stop`, moving the cursor."""
+        new = self._laps.iloc[self.cursor:stop]
+        self.cursor = max(self.cursor, stop)
+        return new
+
+    def poll(self):
+        """Return only the laps completed since the previous poll."""
+        now = self._origin + (self._clock() - self.started) * self._speed
+        return self.advance(int(np.searchsorted(self._times, now, side="right")))
+
+
+# ---------------------------------------------------------
+# INCREMENTAL RACE STATE
+# ---------------------------------------------------------
+class LiveRace:
+    """
+    Lap table that grows by appending new laps, with aggregates
+    (lap-time samples per driver/team for medians and quartiles,
+    position series) updated incrementally instead of recomputed from
+    the whole table.
+    """
+
+    def __init__(self):
+        self.laps = None
+        self.best = np.inf
+        self.driver_times = {}
+        self.team_times = {}
+        self.positions = {}
+
+    def append(self, new):
+        """
+        Add newly completed laps. Returns the sets of drivers and teams
+        whose lap-time samples changed.
+        """
+        self.laps = new.copy() if self.laps is None else pd.concat(
+            [self.laps, new], ignore_index=True
+        )
+
+        secs = new["LapTime"].dt.total_seconds().to_numpy()
+        pitted = new["PitInTime"].notna().to_numpy() | new["PitOutTime"].notna().to_numpy()
+        timed = ~np.isnan(secs) & ~pitted & (new["LapNumber"].to_numpy() > 1)
+        changed_drivers, changed_teams = set(), set()
+
+        # A new best lap tightens the 107% cut for laps already accepted
+        if timed.any() and secs[timed].min() < self.best:
+            self.best = secs[timed].min()
+            limit = self.best * QUICKLAP_THRESHOLD
+            changed_drivers |= self._prune(self.driver_times, limit)
+            changed_teams |= self._prune(self.team_times, limit)
+        limit = self.best * QUICKLAP_THRESHOLD
+
+        for drv, team, lap, pos, t, ok in zip(
+            new["Driver"], new["Team"], new["LapNumber"], new["Position"], secs, timed
+        ):
+            if not np.isnan(pos):
+                series = self.positions.setdefault(drv, [])
+                series.extend([None] * (int(lap) - 1 - len(series)))
+                series.append(int(pos))
+
+            if not ok or t > limit:
+                continue
+            self.driver_times.setdefault(drv, []).append(t)
+            self.team_times.setdefault(team, []).append(t)
+            changed_drivers.add(drv)
+            changed_teams.add(team)
+
+        return changed_drivers, changed_teams
+
+    @staticmethod
+    def _prune(samples, limit):
+        changed = set()
+        for key, times in samples.items():
+            kept = [t for t in times if t <= limit]
+            if len(kept) < len(times):
+                samples[key] = kept
+                changed.add(key)
+        return changed
+
+    def team_stats(self, team):
+        return box_stats(self.team_times.get(team, []))
+
+
+class LiveSession:
+    def __init__(self, feed):
+        self.feed = feed
+        self.race = LiveRace()
+
+    def catch_up(self, cursor):
+        """Feed the laps another worker already delivered up to `cursor`."""
+        if cursor > self.feed.cursor:
+            self.race.append(self.feed.advance(cursor))
+
+
+# ---------------------------------------------------------
+# PER-PROCESS SESSION COPIES
+# ---------------------------------------------------------
+# The authoritative live state (start time, laps delivered) is kept in
+# the page's dcc.Store. Each worker keeps a working copy here and
+# rebuilds or catches it up from that state, so polls can be served by
+# any worker.
+LIVE_SESSIONS = OrderedDict()
+
+
+def live_session(live_id, load_laps, started, cursor):
+    """Working copy of a live session, in sync with the client's `cursor`."""
+    live = LIVE_SESSIONS.get(live_id)
+    if live is None or live.feed.cursor > cursor:
+        live = LiveSession(ReplayFeed(load_laps(), started=started))
+        LIVE_SESSIONS[live_id] = live
+        while len(LIVE_SESSIONS) > MAX_LIVE_SESSIONS:
+            LIVE_SESSIONS.popitem(last=False)
+    LIVE_SESSIONS.move_to_end(live_id)
+    live.catch_up(cursor)
+    return live
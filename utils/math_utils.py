@@ -1 +1,289 @@
-# Mathematical models and smoothing functions
\ No newline at end of file
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# DISTRIBUTION SUMMARIES
+# ---------------------------------------------------------
+KDE_POINTS = 64
+
+
+def box_stats(values):
+    """
+    Quartiles and Tukey whiskers for one sample, matching the
+    statistics Plotly would compute client-side for a box trace.
+    """
+    v = np.sort(np.asarray(values, dtype=float))
+    v = v[~np.isnan(v)]
+    if v.size == 0:
+        return None
+
+    q1, median, q3 = np.percentile(v, [25, 50, 75])
+    iqr = q3 - q1
+
+    inside = v[(v >= q1 - 1.5 * iqr) & (v <= q3 + 1.5 * iqr)]
+
+    return {
+        "q1": float(q1),
+        "median": float(median),
+        "q3": float(q3),
+        "lowerfence": float(inside[0]),
+        "upperfence": float(inside[-1]),
+        "mean": float(v.mean()),
+        "count": int(v.size),
+    }
+
+
+def kde(values, n_points=KDE_POINTS):
+    """
+    Gaussian kernel density estimate on a fixed-size grid
+    (Scott's rule bandwidth). Returns (grid, density).
+    """
+    v = np.asarray(values, dtype=float)
+    v = v[~np.isnan(v)]
+    if v.size == 0:
+        return np.empty(0), np.empty(0)
+
+    std = v.std(ddof=1) if v.size > 1 else 0.0
+    bw = 1.06 * std * v.size ** (-1 / 5) if std > 0 else 0.05
+
+    grid = np.linspace(v.min() - 2 * bw, v.max() + 2 * bw, n_points)
+    z = (grid[:, None] - v[None, :]) / bw
+    density = np.exp(-0.5 * z ** 2).sum(axis=1) / (v.size * bw * np.sqrt(2 * np.pi))
+
+    return grid, density
+
+
+# ---------------------------------------------------------
+# LAP TIME STRINGS
+# ---------------------------------------------------------
+def lap_time_seconds(text):
+    """
+    Seconds of one "m:ss.sss" / "ss.sss" string; NaN when missing or
+    malformed (non-ASCII digits, empty minutes, more than one ':' or '.').
+    """
+    if not (isinstance(text, str) and text.isascii()):
+        return np.nan
+    minutes, colon, seconds = text.strip().rpartition(":")
+    if not (
+        seconds[:1].isdigit()
+        and seconds.replace(".", "", 1).isdigit()
+        and (minutes.isdigit() or not colon)
+    ):
+        return np.nan
+    return int(minutes or 0) * 60 + float(seconds)
+
+
+def parse_lap_times(times):
+    """Parse lap time strings to a float array of seconds (NaN where malformed)."""
+    return np.fromiter(map(lap_time_seconds, times), dtype=float, count=len(times))
+
+
+# ---------------------------------------------------------
+# POSITION MATRIX
+# ---------------------------------------------------------
+def position_matrix(laps):
+    """
+    Pivot a long-form laps table into a dense lap x driver int8 matrix.
+    Drivers are ordered by their last recorded position; 0 marks laps
+    a driver did not complete.
+    """
+    pos = laps.dropna(subset=["Position"])
+    if pos.empty:
+        return {"drivers": [], "laps": np.empty(0, dtype=int),
+                "positions": np.zeros((0, 0), dtype=np.int8)}
+
+    drivers = pos.groupby("Driver")["Position"].last().sort_values().index.tolist()
+    n_laps = int(pos["LapNumber"].max())
+
+    matrix = np.zeros((n_laps, len(drivers)), dtype=np.int8)
+    rows = pos["LapNumber"].to_numpy(dtype=int) - 1
+    cols = pd.Categorical(pos["Driver"], categories=drivers).codes
+    matrix[rows, cols] = pos["Position"].to_numpy(dtype=np.int8)
+
+    return {
+        "drivers": drivers,
+        "laps": np.arange(1, n_laps + 1),
+        "positions": matrix,
+    }
+
+
+def position_changes(matrix):
+    """
+    Per-driver places gained, places lost and laps on which the position
+    improved ("laps_gained") from a lap x driver position matrix. Lap-to-lap
+    changes include pit-cycle reshuffles and retirements ahead, so these
+    are not on-track overtakes.
+    """
+    m = matrix.astype(np.int16)
+    both = (m[1:] > 0) & (m[:-1] > 0)
+    delta = np.where(both, m[:-1] - m[1:], 0)
+
+    recorded = m > 0
+    first = m[recorded.argmax(axis=0), np.arange(m.shape[1])]
+    last = m[m.shape[0] - 1 - recorded[::-1].argmax(axis=0), np.arange(m.shape[1])]
+
+    return {
+        "net": first - last,
+        "gained": np.clip(delta, 0, None).sum(axis=0),
+        "lost": np.clip(-delta, 0, None).sum(axis=0),
+        "laps_gained": (delta > 0).sum(axis=0),
+    }
+
+
+# ---------------------------------------------------------
+# TYRE STINTS
+# ---------------------------------------------------------
+# Lap-time cost of carrying one lap's worth of fuel
+FUEL_CORRECTION_S_PER_LAP = 0.03
+MIN_FIT_LAPS = 3
+# Quick laps: within this factor of the best lap (the 107% rule)
+QUICKLAP_THRESHOLD = 1.07
+
+
+def clean_lap_mask(laps):
+    """Timed laps that are not the start lap or in/out laps, under green."""
+    return (
+        (laps["LapNumber"] > 1)
+        & laps["LapTime"].notna()
+        & laps["PitInTime"].isna()
+        & laps["PitOutTime"].isna()
+        & (laps["TrackStatus"].fillna("1") == "1")
+    )
+
+
+def stint_table(laps):
+    """
+    One row per (driver, stint): compound, lap range, tyre age and a
+    fuel-corrected degradation slope (s/lap of tyre life). Slopes are
+    least-squares fits computed for all stints at once from grouped sums.
+    """
+    df = laps.dropna(subset=["Stint"])
+    if df.empty:
+        return pd.DataFrame(columns=[
+            "Driver", "Team", "Stint", "Compound", "StartLap", "EndLap",
+            "Laps", "TyreLifeStart", "MedianLapTime", "DegSlope",
+        ])
+
+    keys = ["Driver", "Stint"]
+    stints = df.groupby(keys, sort=False).agg(
+        Team=("Team", "first"),
+        Compound=("Compound", "first"),
+        StartLap=("LapNumber", "min"),
+        EndLap=("LapNumber", "max"),
+        Laps=("LapNumber", "size"),
+        TyreLifeStart=("TyreLife", "min"),
+    )
+
+    clean = df[clean_lap_mask(df)]
+    total_laps = df["LapNumber"].max()
+    t = clean["LapTime"].dt.total_seconds()
+    y = t - FUEL_CORRECTION_S_PER_LAP * (total_laps - clean["LapNumber"])
+    x = clean["TyreLife"].astype(float)
+
+    sums = pd.DataFrame({
+        "n": 1.0, "sx": x, "sy": y, "sxx": x * x, "sxy": x * y,
+    }).groupby([clean["Driver"], clean["Stint"]]).sum()
+
+    denom = sums["n"] * sums["sxx"] - sums["sx"] ** 2
+    slope = (sums["n"] * sums["sxy"] - sums["sx"] * sums["sy"]) / denom.where(denom > 0)
+    slope = slope.where(sums["n"] >= MIN_FIT_LAPS)
+
+    stints["MedianLapTime"] = t.groupby([clean["Driver"], clean["Stint"]]).median()
+    stints["DegSlope"] = slope
+
+    return stints.reset_index()
+
+
+# ---------------------------------------------------------
+# GAPS AND INTERVALS
+# ---------------------------------------------------------
+def gap_matrices(laps):
+    """
+    Lap x driver race-time matrices built from the session-time stamp at
+    the end of every lap: `elapsed` (s since the start), `gap` to the
+    leader on that lap and `interval` to the car directly ahead. NaN marks
+    laps not completed or without timing; it never shifts later laps.
+    """
+    df = laps.dropna(subset=["LapNumber"]).sort_values(["Driver", "LapNumber"])
+    drivers = df["Driver"].unique().tolist()
+    numbers = df.drop_duplicates("Driver")["DriverNumber"].astype(str).tolist()
+    n_laps = int(df["LapNumber"].max()) if len(df) else 0
+
+    # Race start: when the first lap began (all cars share the start signal)
+    first = df[df["LapNumber"] == df["LapNumber"].min()]
+    start = first["LapStartTime"].min()
+    if pd.isna(start):
+        start = (first["Time"] - first["LapTime"]).min()
+    lap_end = df["Time"].fillna(df["LapStartTime"] + df["LapTime"])
+
+    elapsed = np.full((n_laps, len(drivers)), np.nan)
+    rows = df["LapNumber"].to_numpy(dtype=int) - 1
+    cols = pd.Categorical(df["Driver"], categories=drivers).codes
+    elapsed[rows, cols] = (lap_end - start).dt.total_seconds().to_numpy()
+
+    with np.errstate(all="ignore"):
+        gap = elapsed - np.nanmin(elapsed, axis=1, initial=np.inf, where=~np.isnan(elapsed), keepdims=True)
+
+    # Interval: sort each lap by race time, diff neighbours, scatter back
+    order = np.argsort(elapsed, axis=1)
+    ranked = np.take_along_axis(elapsed, order, axis=1)
+    ranked_interval = np.diff(ranked, axis=1, prepend=ranked[:, :1])
+    interval = np.empty_like(elapsed)
+    np.put_along_axis(interval, order, ranked_interval, axis=1)
+    interval[np.isnan(elapsed)] = np.nan
+
+    return {
+        "drivers": drivers,
+        "numbers": numbers,
+        "laps": np.arange(1, n_laps + 1),
+        "elapsed": elapsed,
+        "gap": gap,
+        "interval": interval,
+    }
+
+
+def final_intervals(gaps):
+    """
+    Classification-style interval to the car ahead at the flag, keyed by
+    driver number: "+1.234s" on the same lap, "+N Lap(s)" otherwise.
+    """
+    elapsed = gaps["elapsed"]
+    if elapsed.size == 0:
+        return {}
+
+    # Laps completed = last lap with a time stamp, even if earlier ones lack one
+    done = ~np.isnan(elapsed)
+    last = elapsed.shape[0] - 1 - done[::-1].argmax(axis=0)
+    laps_done = np.where(done.any(axis=0), last + 1, 0)
+    finish = elapsed[last, np.arange(elapsed.shape[1])]
+
+    order = np.lexsort((finish, -laps_done))
+    result = {}
+    for k, j in enumerate(order):
+        if k == 0 or laps_done[j] == 0:
+            result[gaps["numbers"][j]] = ""
+            continue
+        ahead = order[k - 1]
+        down = int(laps_done[ahead] - laps_done[j])
+        result[gaps["numbers"][j]] = (
+            f"+{finish[j] - finish[ahead]:.3f}s" if down == 0
+            else f"+{down} Lap{'s' if down > 1 else ''}"
+        )
+    return result
+
+
+# ---------------------------------------------------------
+# PIT STOPS
+# ---------------------------------------------------------
+def pit_durations(laps):
+    """
+    Pit-lane time of every stop: PitInTime on the in-lap paired with
+    PitOutTime on the driver's next lap.
+    """
+    df = laps.sort_values(["Driver", "LapNumber"])
+    next_out = df.groupby("Driver")["PitOutTime"].shift(-1)
+    duration = (next_out - df["PitInTime"]).dt.total_seconds()
+
+    stops = df.loc[duration.notna(), ["Driver", "Team", "LapNumber"]].copy()
+    stops["Duration"] = duration[duration.notna()]
+    return stops.reset_index(drop=True)
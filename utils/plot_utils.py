@@ -1 +1,383 @@
-# Reusable Plotly figure configurations
\ No newline at end of file
+import numpy as np
+import plotly.colors
+import plotly.graph_objects as go
+from dash import Patch, no_update
+
+from utils.math_utils import box_stats, kde
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+TRACE_COLOR = "#636efa"
+VIOLIN_HALF_WIDTH = 0.4
+BOX_STAT_KEYS = ("q1", "median", "q3", "lowerfence", "upperfence", "mean")
+
+COMPOUND_COLORS = {
+    "SOFT": "#da291c",
+    "MEDIUM": "#ffd12e",
+    "HARD": "#f0f0ec",
+    "INTERMEDIATE": "#43b02a",
+    "WET": "#0067ad",
+}
+
+# Same order as Plotly's default colorway, so a driver keeps the colour of
+# their line charts on the track map
+DRIVER_COLORS = plotly.colors.qualitative.Plotly
+NO_LEADER_COLOR = "#444444"
+
+# Track map colouring modes
+TRACK_SPEED = "speed"
+TRACK_GEAR = "gear"
+TRACK_FASTEST = "fastest"
+
+# ---------------------------------------------------------
+# PRECOMPUTED DISTRIBUTION FIGURES
+# ---------------------------------------------------------
+def summary_box_trace(names, stats):
+    """Single box trace carrying precomputed stats for every category."""
+    return go.Box(
+        x=list(names),
+        marker_color=TRACE_COLOR,
+        hoverinfo="y",
+        **{key: [s[key] for s in stats] for key in BOX_STAT_KEYS},
+    )
+
+
+def summary_box_figure(groups, height=420):
+    """
+    Box plot built from server-side quartiles: one trace whose
+    payload is five numbers per category instead of every sample.
+    `groups` maps category name -> array of values (in display order).
+    """
+    names, stats = [], []
+    for name, values in groups.items():
+        s = box_stats(values)
+        if s:
+            names.append(name)
+            stats.append(s)
+
+    fig = go.Figure(summary_box_trace(names, stats))
+    fig.update_layout(height=height)
+    return fig
+
+
+def violin_traces(i, name, values, stats=None):
+    """
+    Filled KDE outline plus a precomputed box for one category,
+    centred on numeric x position `i`.
+    """
+    s = stats or box_stats(values)
+    grid, density = kde(values)
+    half = density / density.max() * VIOLIN_HALF_WIDTH
+
+    outline = go.Scatter(
+        x=np.concatenate([i - half, (i + half)[::-1]]).round(4),
+        y=np.concatenate([grid, grid[::-1]]).round(3),
+        fill="toself",
+        mode="lines",
+        line=dict(color=TRACE_COLOR, width=1),
+        hoverinfo="skip",
+        name=name,
+    )
+    box = go.Box(
+        x=[i],
+        q1=[s["q1"]],
+        median=[s["median"]],
+        q3=[s["q3"]],
+        lowerfence=[s["lowerfence"]],
+        upperfence=[s["upperfence"]],
+        width=0.08,
+        marker_color="white",
+        fillcolor="rgba(255,255,255,0.25)",
+        hoverinfo="y",
+        name=name,
+    )
+    return outline, box
+
+
+def summary_violin_figure(groups, height=420):
+    """
+    Violin plot built from a fixed-resolution KDE computed with NumPy.
+    Each category is a filled outline plus a precomputed box, so the
+    payload is constant per category regardless of lap count.
+    """
+    fig = go.Figure()
+    names = []
+
+    for name, values in groups.items():
+        s = box_stats(values)
+        if not s:
+            continue
+        fig.add_traces(violin_traces(len(names), name, values, s))
+        names.append(name)
+
+    fig.update_xaxes(
+        tickmode="array",
+        tickvals=list(range(len(names))),
+        ticktext=names,
+    )
+    fig.update_layout(height=height)
+    return fig
+
+
+# ---------------------------------------------------------
+# POSITION CHANGES
+# ---------------------------------------------------------
+def position_trace(driver, y, x0=1, label=None):
+    """Compact position line: lap numbers are encoded with x0/dx."""
+    return go.Scatter(
+        x0=x0,
+        dx=1,
+        y=y,
+        mode="lines",
+        name=driver,
+        hovertemplate=f"{label or driver}<br>Lap %{{x}}: P%{{y}}<extra></extra>",
+    )
+
+
+def position_traces(pm, changes=None):
+    """One compact trace per driver from a lap x driver position matrix."""
+    traces = []
+    laps = pm["laps"]
+
+    for j, drv in enumerate(pm["drivers"]):
+        col = pm["positions"][:, j]
+        recorded = np.flatnonzero(col)
+        if recorded.size == 0:
+            continue
+        start, stop = recorded[0], recorded[-1] + 1
+        # Float array, laps not completed as NaN (serialized as null)
+        y = np.where(col[start:stop] > 0, col[start:stop], np.nan)
+
+        label = None
+        if changes is not None:
+            label = (
+                f"{drv} ({int(changes['net'][j]):+d}, "
+                f"gained on {int(changes['laps_gained'][j])} laps)"
+            )
+
+        traces.append(position_trace(drv, y, x0=int(laps[start]), label=label))
+
+    return traces
+
+
+# ---------------------------------------------------------
+# GAPS
+# ---------------------------------------------------------
+def gap_traces(gaps, driver_order):
+    """Gap-to-leader line per driver, laps encoded with x0/dx."""
+    traces = []
+    for drv in driver_order:
+        if drv not in gaps["drivers"]:
+            continue
+        col = gaps["gap"][:, gaps["drivers"].index(drv)]
+        done = np.flatnonzero(~np.isnan(col))
+        if done.size == 0:
+            continue
+        y = col[done[0]:done[-1] + 1].round(3)
+        traces.append(go.Scatter(
+            x0=int(gaps["laps"][done[0]]),
+            dx=1,
+            # Float array with NaN gaps: serialized natively (NaN -> null)
+            y=y,
+            mode="lines",
+            name=drv,
+            hovertemplate=f"{drv}<br>Lap %{{x}}: +%{{y:.3f}}s<extra></extra>",
+        ))
+    return traces
+
+
+# ---------------------------------------------------------
+# TYRE STINTS
+# ---------------------------------------------------------
+def stint_figure(stints, driver_order, height=560):
+    """Horizontal stint bars per driver, one trace per compound."""
+    fig = go.Figure()
+
+    for compound, group in stints.groupby("Compound", sort=False):
+        slope = group["DegSlope"].round(3)
+        fig.add_trace(go.Bar(
+            y=group["Driver"],
+            x=group["Laps"],
+            base=group["StartLap"] - 1,
+            orientation="h",
+            name=compound,
+            marker=dict(
+                color=COMPOUND_COLORS.get(str(compound).upper(), "#888888"),
+                line=dict(color="black", width=1),
+            ),
+            customdata=np.column_stack([group["StartLap"], group["EndLap"], slope]),
+            hovertemplate=(
+                f"%{{y}} {compound}<br>Laps %{{customdata[0]:.0f}}-%{{customdata[1]:.0f}}"
+                "<br>Degradation %{customdata[2]:+.3f} s/lap<extra></extra>"
+            ),
+        ))
+
+    fig.update_yaxes(categoryorder="array", categoryarray=driver_order[::-1])
+    fig.update_layout(barmode="overlay", height=height)
+    return fig
+
+
+# ---------------------------------------------------------
+# TRACK MAP
+# ---------------------------------------------------------
+def track_map_marker(mode, values, names=()):
+    """
+    Marker colouring of the track map. For TRACK_FASTEST, `values` are
+    positions in `names` (-1 = no time) mapped onto a discrete scale of
+    DRIVER_COLORS; otherwise they are speeds or gears on a continuous one.
+    """
+    if mode == TRACK_FASTEST:
+        n = len(names)
+        colors = [NO_LEADER_COLOR] + [DRIVER_COLORS[i % len(DRIVER_COLORS)] for i in range(n)]
+        scale = []
+        for i, color in enumerate(colors):
+            scale += [[i / len(colors), color], [(i + 1) / len(colors), color]]
+        return dict(
+            color=np.asarray(values, dtype=int),
+            colorscale=scale,
+            cmin=-1.5,
+            cmax=n - 0.5,
+            colorbar=dict(
+                title="Fastest",
+                tickvals=list(range(n)),
+                ticktext=list(names),
+            ),
+        )
+
+    gear = mode == TRACK_GEAR
+    return dict(
+        color=np.asarray(values).round(0 if gear else 1),
+        colorscale="Viridis" if gear else "Turbo",
+        cmin=1 if gear else None,
+        cmax=8 if gear else None,
+        colorbar=dict(title="Gear" if gear else "km/h", tickvals=None, ticktext=None),
+    )
+
+
+def track_map_figure(outline, marker, mode, title, height=560):
+    """
+    Racing line as one WebGL scatter trace; everything that depends on the
+    drivers lives in its marker, so later updates patch only that.
+    """
+    fig = go.Figure(go.Scattergl(
+        x=outline["X"],
+        y=outline["Y"],
+        mode="markers",
+        marker=dict(size=5, showscale=True, **marker),
+        hovertemplate=(
+            None if mode == TRACK_FASTEST
+            else "%{marker.color}" + (" km/h" if mode == TRACK_SPEED else "") + "<extra></extra>"
+        ),
+        hoverinfo="skip" if mode == TRACK_FASTEST else None,
+    ))
+    fig.update_xaxes(visible=False)
+    fig.update_yaxes(visible=False, scaleanchor="x", scaleratio=1)
+    fig.update_layout(title={"text": title, "x": 0.5, "xanchor": "center"}, height=height)
+    return fig
+
+
+# ---------------------------------------------------------
+# RACE REPLAY
+# ---------------------------------------------------------
+def replay_figure(outline, positions, names, bounds, height=620):
+    """
+    Track outline (if any) plus one marker trace holding every car. The
+    browser animates by restyling that last trace's x/y in place.
+    """
+    fig = go.Figure()
+    if outline is not None:
+        fig.add_trace(go.Scatter(
+            x=outline["X"],
+            y=outline["Y"],
+            mode="lines",
+            line=dict(color="#555555", width=6),
+            hoverinfo="skip",
+        ))
+
+    fig.add_trace(go.Scatter(
+        x=positions[:, 0],
+        y=positions[:, 1],
+        mode="markers+text",
+        text=list(names),
+        textposition="top center",
+        marker=dict(
+            size=12,
+            color=[DRIVER_COLORS[i % len(DRIVER_COLORS)] for i in range(len(names))],
+            line=dict(color="white", width=1),
+        ),
+        hovertemplate="%{text}<extra></extra>",
+    ))
+
+    (x0, x1), (y0, y1) = bounds
+    pad = 0.05 * max(x1 - x0, y1 - y0)
+    fig.update_xaxes(visible=False, range=[x0 - pad, x1 + pad])
+    fig.update_yaxes(visible=False, range=[y0 - pad, y1 + pad], scaleanchor="x", scaleratio=1)
+    fig.update_layout(height=height, showlegend=False)
+    return fig
+
+
+# ---------------------------------------------------------
+# FIGURE DIFF LAYER
+# ---------------------------------------------------------
+def diff_figure(prev_keys, keys, build_trace, build_layout, title=None):
+    """
+    Compare the trace keys the client currently shows (`prev_keys`) with
+    the desired ones (`keys`, one per trace slot) and return:
+
+    - no_update when nothing changed,
+    - a dash Patch replacing only the changed traces (and the title),
+    - a Patch appending or deleting traces when keys were only added at
+      the end or removed,
+    - a full figure when nothing is rendered yet or the traces were
+      reordered.
+
+    `build_trace(i)` builds the trace for slot i and is only called for
+    slots that are actually sent; `build_layout(fig)` styles a full figure.
+    """
+    if prev_keys == keys:
+        return no_update
+
+    if not prev_keys:
+        return _full_figure(keys, build_trace, build_layout)
+
+    patch = Patch()
+
+    if len(prev_keys) == len(keys):
+        for i, (old, new) in enumerate(zip(prev_keys, keys)):
+            if old != new:
+                patch["data"][i] = build_trace(i)
+
+    elif keys[:len(prev_keys)] == prev_keys:
+        for i in range(len(prev_keys), len(keys)):
+            patch["data"].append(build_trace(i))
+
+    elif _is_subsequence(keys, prev_keys):
+        kept = iter(keys)
+        current = next(kept, None)
+        removed = []
+        for i, old in enumerate(prev_keys):
+            if old == current:
+                current = next(kept, None)
+            else:
+                removed.append(i)
+        for i in reversed(removed):
+            del patch["data"][i]
+
+    else:
+        return _full_figure(keys, build_trace, build_layout)
+
+    if title is not None:
+        patch["layout"]["title"]["text"] = title
+    return patch
+
+
+def _full_figure(keys, build_trace, build_layout):
+    fig = go.Figure([build_trace(i) for i in range(len(keys))])
+    build_layout(fig)
+    return fig
+
+
+def _is_subsequence(short, long):
+    it = iter(long)
+    return all(k in it for k in short)
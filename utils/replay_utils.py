@@ -0,0 +1,120 @@
+import base64
+import json
+import os
+
+import numpy as np
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+# Snapshot rate of the replay (frames per second of session time)
+REPLAY_HZ = 4
+# Frames sent to the browser per request (one minute of race)
+CHUNK_FRAMES = 240
+
+# Replay files, written next to the session's telemetry export
+REPLAY_FILE = "replay.npy"
+REPLAY_META_FILE = "replay.json"
+
+# ---------------------------------------------------------
+# TIME-INDEXED POSITION SNAPSHOTS
+# ---------------------------------------------------------
+class RaceReplay:
+    """
+    Car positions of a session on a fixed REPLAY_HZ time grid, as one
+    (frame, driver, x/y) float32 array. Cars without data at a frame
+    (not started, retired) are NaN.
+    """
+
+    def __init__(self, t0, hz, drivers, frames, mapped=False):
+        self.t0 = float(t0)
+        self.hz = hz
+        self.drivers = drivers
+        self.frames = frames
+        self.mapped = mapped
+
+    @classmethod
+    def from_index(cls, index, hz=REPLAY_HZ):
+        """Resample every driver's X/Y in a TelemetryIndex onto one time grid."""
+        t = np.asarray(index.channels["SessionTime"])
+        x = np.asarray(index.channels["X"])
+        y = np.asarray(index.channels["Y"])
+
+        # Each driver's telemetry is one contiguous block of the index
+        spans = {}
+        for (drv, _), (start, stop) in index.index.items():
+            if stop > start:
+                lo, hi = spans.get(drv, (start, stop))
+                spans[drv] = (min(lo, start), max(hi, stop))
+        drivers = [d for d in index.drivers if d in spans]
+        if not drivers:
+            return cls(0.0, hz, [], np.empty((0, 0, 2), dtype=np.float32))
+
+        t0 = min(t[spans[d][0]] for d in drivers)
+        t1 = max(t[spans[d][1] - 1] for d in drivers)
+        grid = t0 + np.arange(int((t1 - t0) * hz) + 1) / hz
+
+        frames = np.full((len(grid), len(drivers), 2), np.nan, dtype=np.float32)
+        for j, drv in enumerate(drivers):
+            lo, hi = spans[drv]
+            ts = t[lo:hi]
+            inside = (grid >= ts[0]) & (grid <= ts[-1])
+            frames[inside, j, 0] = np.interp(grid[inside], ts, x[lo:hi])
+            frames[inside, j, 1] = np.interp(grid[inside], ts, y[lo:hi])
+
+        return cls(t0, hz, drivers, frames)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, f"{REPLAY_FILE}.tmp{os.getpid()}.npy")
+        np.save(tmp, self.frames)
+        os.replace(tmp, os.path.join(path, REPLAY_FILE))
+        with open(os.path.join(path, REPLAY_META_FILE), "w") as f:
+            json.dump({"t0": self.t0, "hz": self.hz, "drivers": self.drivers}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map a replay written by save()."""
+        with open(os.path.join(path, REPLAY_META_FILE)) as f:
+            meta = json.load(f)
+        frames = np.load(os.path.join(path, REPLAY_FILE), mmap_mode="r")
+        return cls(meta["t0"], meta["hz"], meta["drivers"], frames, mapped=True)
+
+    @property
+    def n_frames(self):
+        return len(self.frames)
+
+    @property
+    def n_chunks(self):
+        return -(-self.n_frames // CHUNK_FRAMES)
+
+    @property
+    def nbytes(self):
+        return self.frames.nbytes
+
+    def bounds(self):
+        """((xmin, xmax), (ymin, ymax)) over the whole replay, for fixed axes."""
+        if not self.frames.size or np.isnan(self.frames).all():
+            return (0.0, 1.0), (0.0, 1.0)
+        lo = np.nanmin(self.frames, axis=(0, 1))
+        hi = np.nanmax(self.frames, axis=(0, 1))
+        return (float(lo[0]), float(hi[0])), (float(lo[1]), float(hi[1]))
+
+    def frame(self, i):
+        """(driver, x/y) positions at frame i."""
+        return np.asarray(self.frames[min(max(int(i), 0), self.n_frames - 1)])
+
+    def chunk(self, i):
+        """
+        Frames [i * CHUNK_FRAMES, (i + 1) * CHUNK_FRAMES) for the browser:
+        the raw little-endian float32 bytes, base64 encoded, which the
+        client reads back with a Float32Array.
+        """
+        start = int(i) * CHUNK_FRAMES
+        block = np.ascontiguousarray(self.frames[start:start + CHUNK_FRAMES], dtype="<f4")
+        return {
+            "chunk": int(i),
+            "start": start,
+            "frames": len(block),
+            "data": base64.b64encode(block.tobytes()).decode("ascii"),
+        }
@@ -0,0 +1,124 @@
+import datetime
+
+import fastf1 as ff1
+import numpy as np
+import pandas as pd
+
+from utils.cache_utils import negative_cached, season_cached
+from utils.layout_utils import dropdown_options, table_rows
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+# Seconds before the current season's schedule is reloaded (completed
+# seasons never change)
+SCHEDULE_TTL = 6 * 3600
+SESSION_COLUMNS = [f"Session{i}" for i in range(1, 6)]
+
+# Circuit coordinates keyed by the schedule's Location column
+CIRCUIT_COORDS = {
+    "Sakhir": (26.0325, 50.5106),
+    "Jeddah": (21.6319, 39.1044),
+    "Melbourne": (-37.8497, 144.968),
+    "Suzuka": (34.8431, 136.5419),
+    "Shanghai": (31.3389, 121.22),
+    "Miami": (25.9581, -80.2389),
+    "Imola": (44.3439, 11.7167),
+    "Monaco": (43.7347, 7.4206),
+    "Montréal": (45.5, -73.5228),
+    "Montreal": (45.5, -73.5228),
+    "Barcelona": (41.57, 2.2611),
+    "Madrid": (40.4637, -3.6175),
+    "Spielberg": (47.2197, 14.7647),
+    "Silverstone": (52.0786, -1.0169),
+    "Budapest": (47.5789, 19.2486),
+    "Spa-Francorchamps": (50.4372, 5.9714),
+    "Zandvoort": (52.3888, 4.5409),
+    "Monza": (45.6156, 9.2811),
+    "Baku": (40.3725, 49.8533),
+    "Marina Bay": (1.2914, 103.8644),
+    "Singapore": (1.2914, 103.8644),
+    "Austin": (30.1328, -97.6411),
+    "Mexico City": (19.4042, -99.0907),
+    "São Paulo": (-23.7036, -46.6997),
+    "Sao Paulo": (-23.7036, -46.6997),
+    "Las Vegas": (36.1147, -115.1728),
+    "Lusail": (25.49, 51.4542),
+    "Yas Island": (24.4672, 54.6031),
+    "Yas Marina": (24.4672, 54.6031),
+}
+
+# ---------------------------------------------------------
+# SEASON SCHEDULE
+# ---------------------------------------------------------
+class Schedule:
+    """
+    One season's event schedule, loaded once and indexed by round, event
+    name and date, with the dropdown options every page needs prebuilt.
+    """
+
+    def __init__(self, year, frame):
+        self.year = year
+        frame = frame[frame["RoundNumber"] > 0].sort_values("RoundNumber")
+
+        coords = frame["Location"].map(CIRCUIT_COORDS)
+        dates = frame["EventDate"].to_numpy(dtype="datetime64[D]")
+        sessions = pd.Series([
+            [name for name in row if isinstance(name, str) and name and name != "None"]
+            for row in frame.reindex(columns=SESSION_COLUMNS).to_numpy(dtype=object)
+        ], index=frame.index, dtype=object)
+
+        self.events = table_rows(frame, {
+            "round": frame["RoundNumber"].astype(int),
+            "name": "EventName",
+            "official": "OfficialEventName",
+            "location": "Location",
+            "date": pd.Series(dates.astype(str), index=frame.index),
+            "lat": coords.str[0],
+            "lon": coords.str[1],
+            "sessions": sessions,
+        })
+        for e in self.events:
+            if pd.isna(e["lat"]):
+                e["lat"] = e["lon"] = None
+
+        self.by_round = {e["round"]: e for e in self.events}
+        self.by_name = {e["name"]: e for e in self.events}
+        self.dates = dates
+
+        # Dropdown options, built once per season
+        mapped = frame[coords.notna()]
+        self.name_options = dropdown_options(frame, "EventName", "EventName")
+        self.official_options = dropdown_options(
+            frame, "OfficialEventName", frame["RoundNumber"].astype(int)
+        )
+        self.map_options = dropdown_options(
+            mapped,
+            "R" + mapped["RoundNumber"].astype(str) + " – " + mapped["EventName"],
+            mapped["RoundNumber"].astype(int),
+        )
+
+    def event(self, round_no):
+        return self.by_round.get(int(round_no))
+
+    def sessions(self, gp):
+        event = self.by_name.get(gp)
+        return event["sessions"] if event else []
+
+    def next_event(self, today=None):
+        """First event on or after `today`, else the last event of the season."""
+        if not self.events:
+            return None
+        today = np.datetime64(today or datetime.date.today(), "D")
+        i = int(np.searchsorted(self.dates, today))
+        return self.events[min(i, len(self.events) - 1)]
+
+
+@negative_cached()
+@season_cached(1, current_ttl=SCHEDULE_TTL)
+def season_schedule(year):
+    """
+    Indexed schedule of a season. Completed seasons are loaded once; the
+    current season's is reloaded after SCHEDULE_TTL.
+    """
+    return Schedule(year, ff1.get_event_schedule(year, include_testing=False))
@@ -0,0 +1,550 @@
+import datetime
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import requests
+
+from utils.math_utils import pit_durations
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+# F1_ERGAST_URL points both at another Ergast-compatible server (e.g. a stub)
+JOLPICA_BASE = os.environ.get("F1_ERGAST_URL", "https://api.jolpi.ca/ergast/f1")
+ERGAST_BASE = os.environ.get("F1_ERGAST_URL", "http://ergast.com/api/f1")
+
+PAGE_SIZE = 100
+# Results are usually published a few hours after the flag
+RESULTS_DELAY = datetime.timedelta(hours=3)
+RETRY_SECONDS = 600
+
+# Seasons offered in the pickers: FastF1 has full timing and telemetry from 2018
+FIRST_SEASON = int(os.environ.get("F1_FIRST_SEASON", "2018"))
+# Before this month the previous season is still the current one
+SEASON_START_MONTH = 3
+
+SEASON_DATA_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "cache", "season")
+)
+# Classified finishers ("+N Laps" too); anything else except the
+# statuses below counts as a retirement (DNF)
+FINISHED_STATUSES = ("Finished", "Lapped")
+NOT_RETIRED_STATUSES = (
+    "Did not start", "DNS", "Disqualified", "DSQ", "Excluded", "Withdrew",
+    "Did not qualify", "Did not prequalify", "Not classified",
+)
+
+logger = logging.getLogger("f1dash.season")
+
+# ---------------------------------------------------------
+# SEASONS
+# ---------------------------------------------------------
+def current_season(today=None):
+    """The season in progress (or the last one, before the next has started)."""
+    today = today or datetime.date.today()
+    return today.year if today.month >= SEASON_START_MONTH else today.year - 1
+
+
+def is_completed(season):
+    """Completed seasons never change, so anything derived from them is cached for good."""
+    return int(season) < current_season()
+
+
+def season_options():
+    """Season dropdown options, newest first."""
+    return [
+        {"label": str(season), "value": season}
+        for season in range(current_season(), FIRST_SEASON - 1, -1)
+    ]
+
+
+# ---------------------------------------------------------
+# FETCHING
+# ---------------------------------------------------------
+def get_ergast(path, params=None, timeout=8):
+    for base in (JOLPICA_BASE, ERGAST_BASE):
+        try:
+            r = requests.get(f"{base}/{path}", params=params, timeout=timeout)
+            r.raise_for_status()
+            return r.json()["MRData"]
+        except Exception:
+            continue
+    return None
+
+
+def get_ergast_races(path):
+    """
+    All races for an Ergast endpoint, following the result pagination.
+    Returns (races, complete); complete is False when a page could not be
+    fetched and the races are only part of what the server holds.
+    """
+    races, offset, total = {}, 0, None
+    while total is None or offset < total:
+        data = get_ergast(path, {"limit": PAGE_SIZE, "offset": offset})
+        if not data:
+            return [races[k] for k in sorted(races)], False
+        total = int(data["total"])
+        # A race can be split across two pages
+        for race in data["RaceTable"]["Races"]:
+            key = int(race["round"])
+            if key in races:
+                for k in ("Results", "SprintResults"):
+                    races[key].setdefault(k, []).extend(race.get(k, []))
+            else:
+                races[key] = race
+        offset += PAGE_SIZE
+    return [races[k] for k in sorted(races)], True
+
+
+def fetch_season_results(season):
+    """
+    Long-form results table (one row per driver per race/sprint):
+    round, kind, code, driver, team, position, points, status.
+
+    Returns (results, complete); complete only when every page of both the
+    race and the sprint results was fetched.
+    """
+    rows, complete = [], True
+    for path, kind, key in (
+        (f"{season}/results.json", "race", "Results"),
+        (f"{season}/sprint.json", "sprint", "SprintResults"),
+    ):
+        races, fetched = get_ergast_races(path)
+        complete &= fetched
+        for race in races:
+            for r in race.get(key, []):
+                d = r["Driver"]
+                rows.append({
+                    "round": int(race["round"]),
+                    "race": race["raceName"],
+                    "kind": kind,
+                    "code": d.get("code") or d["familyName"][:3].upper(),
+                    "driver": f"{d['givenName']} {d['familyName']}",
+                    "team": r["Constructor"]["name"],
+                    "position": int(r.get("position", 0)),
+                    "points": float(r.get("points", 0)),
+                    "status": r.get("status", ""),
+                })
+
+    results = pd.DataFrame(rows, columns=[
+        "round", "race", "kind", "code", "driver", "team",
+        "position", "points", "status",
+    ])
+    return results, complete
+
+
+def fetch_race_dates(season):
+    """Round -> scheduled race start (UTC) for the season."""
+    data = get_ergast(f"{season}.json", {"limit": PAGE_SIZE})
+    if not data:
+        return {}
+    dates = {}
+    for race in data["RaceTable"]["Races"]:
+        start = pd.Timestamp(f"{race['date']} {race.get('time', '00:00:00Z')}")
+        if start.tzinfo is None:
+            start = start.tz_localize("UTC")
+        dates[int(race["round"])] = start
+    return dates
+
+
+# ---------------------------------------------------------
+# AGGREGATION
+# ---------------------------------------------------------
+class SeasonStandings:
+    """
+    Driver and constructor championship after every round, built in one
+    vectorized pass over the season's long-form results table.
+
+    `driver_points[r, j]` is driver j's cumulative total after the r-th
+    completed round and `driver_wins[r, j]` the cumulative win count (same
+    layout for constructors), so any "after round N" query is a row lookup.
+    """
+
+    def __init__(self, season, results):
+        self.season = season
+        self.results = results
+        self.rounds = np.sort(results["round"].unique()) if len(results) else np.empty(0, dtype=int)
+
+        races = results[results["kind"] == "race"]
+        # Rounds with race (not just sprint) results
+        self.race_rounds = np.sort(races["round"].unique()) if len(races) else np.empty(0, dtype=int)
+        self.race_names = (
+            races.drop_duplicates("round").set_index("round")["race"]
+            .reindex(self.rounds).fillna("").tolist()
+        )
+
+        self.drivers, self.driver_points, self.driver_wins = self._accumulate(results, "code")
+        self.constructors, self.constructor_points, self.constructor_wins = self._accumulate(results, "team")
+
+        # Driver x finishing position counts over the season's races
+        self.finishes = pd.crosstab(races["code"], races["position"])
+
+        latest = results.sort_values("round").drop_duplicates("code", keep="last")
+        self.driver_names = dict(zip(latest["code"], latest["driver"]))
+        self.driver_teams = dict(zip(latest["code"], latest["team"]))
+
+    def _accumulate(self, results, key):
+        if results.empty:
+            empty = np.zeros((0, 0), dtype=np.float32)
+            return [], empty, empty.astype(np.int16)
+
+        points = results.pivot_table(
+            index="round", columns=key, values="points", aggfunc="sum", fill_value=0.0
+        ).reindex(self.rounds, fill_value=0.0)
+
+        won = results[(results["kind"] == "race") & (results["position"] == 1)]
+        wins = (
+            won.groupby(["round", key]).size().unstack(fill_value=0)
+            .reindex(index=self.rounds, columns=points.columns, fill_value=0)
+        )
+
+        return (
+            points.columns.tolist(),
+            points.cumsum().to_numpy(dtype=np.float32),
+            wins.cumsum().to_numpy(dtype=np.int16),
+        )
+
+    @property
+    def completed(self):
+        return int(self.rounds.size)
+
+    @property
+    def state(self):
+        """(rounds, rounds with race results); changes with every sprint or race added."""
+        return self.completed, int(self.race_rounds.size)
+
+    # -----------------------------------------------------
+    # QUERIES
+    # -----------------------------------------------------
+    def round_index(self, round_no=None):
+        """Row of the matrices holding the standings after `round_no` (default: latest)."""
+        if round_no is None:
+            return self.completed - 1
+        return int(np.searchsorted(self.rounds, int(round_no), side="right")) - 1
+
+    def _matrices(self, kind):
+        if kind == "drivers":
+            return self.drivers, self.driver_points, self.driver_wins
+        return self.constructors, self.constructor_points, self.constructor_wins
+
+    def standings_after(self, round_no=None, kind="drivers"):
+        """[(name, points)] in championship order after a round."""
+        names, points, wins = self._matrices(kind)
+        r = self.round_index(round_no)
+        if r < 0:
+            return []
+        order = np.lexsort((-wins[r], -points[r]))
+        return [(names[j], float(points[r, j])) for j in order]
+
+    def gap_to_leader(self, kind="drivers"):
+        """Round x entrant matrix of points behind the championship leader."""
+        _, points, _ = self._matrices(kind)
+        if not points.size:
+            return points
+        return points.max(axis=1, keepdims=True) - points
+
+    def progression(self, name, kind="drivers"):
+        """(cumulative points, gap to leader) per round for one entrant."""
+        names, points, _ = self._matrices(kind)
+        if name not in names:
+            zeros = np.zeros(self.completed, dtype=np.float32)
+            return zeros, points.max(axis=1) if points.size else zeros
+        j = names.index(name)
+        return points[:, j], self.gap_to_leader(kind)[:, j]
+
+    def finish_distribution(self, code):
+        """{position: races} for one driver, in position order."""
+        if code not in self.finishes.index:
+            return {}
+        row = self.finishes.loc[code]
+        return {int(p): int(n) for p, n in row[row > 0].items()}
+
+    # -----------------------------------------------------
+    # FINAL TABLES
+    # -----------------------------------------------------
+    def driver_table(self, round_no=None):
+        return [
+            {
+                "pos": pos,
+                "code": code,
+                "name": self.driver_names[code],
+                "team": self.driver_teams[code],
+                "points": points,
+            }
+            for pos, (code, points) in enumerate(self.standings_after(round_no), start=1)
+        ]
+
+    def constructor_table(self, round_no=None):
+        return [
+            {"pos": pos, "team": team, "points": points}
+            for pos, (team, points) in enumerate(
+                self.standings_after(round_no, kind="constructors"), start=1
+            )
+        ]
+
+
+# ---------------------------------------------------------
+# CACHE
+# ---------------------------------------------------------
+_CACHE = {}
+_DATES = {}
+# season -> lock guarding that season's cache entries; never held across
+# network I/O, so a slow fetch for one season doesn't block another
+_LOCKS = {}
+# season -> Event set when the standings fetch in flight has finished
+_BUILDING = {}
+
+
+def _season_lock(season):
+    return _LOCKS.setdefault(season, threading.Lock())
+
+
+def finished_round_numbers(season, now=None):
+    """Rounds whose results should be available by now."""
+    entry = _DATES.get(season)
+    if entry is None or (
+        not entry["dates"] and time.monotonic() - entry["fetched"] >= RETRY_SECONDS
+    ):
+        entry = _DATES[season] = {"dates": fetch_race_dates(season), "fetched": time.monotonic()}
+    now = now or pd.Timestamp.now(tz="UTC")
+    return sorted(r for r, start in entry["dates"].items() if start + RESULTS_DELAY <= now)
+
+
+def _is_fresh(entry, expected):
+    """
+    Whether cached standings can be served: a complete fetch holding race
+    results for every `expected` round (None: for any round), or a recent
+    build while results are still missing.
+    """
+    if entry is None:
+        return False
+    if time.monotonic() - entry["built"] < RETRY_SECONDS:
+        return True
+    races = entry["standings"].race_rounds
+    have = races.size > 0 if expected is None else np.isin(expected, races).all()
+    return bool(entry["complete"] and have)
+
+
+def _write_parquet(frame, path):
+    """Write a table through a temp file, so readers never see it half written."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{os.getpid()}-{threading.get_ident()}"
+    frame.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def season_results_path(season):
+    return os.path.join(SEASON_DATA_DIR, f"{season}_results.parquet")
+
+
+def completed_season_results(season):
+    """
+    (results, complete) of a completed season. Only a complete fetch is
+    kept on disk, so a partial one is fetched again on the next retry.
+    """
+    path = season_results_path(season)
+    if os.path.exists(path):
+        return pd.read_parquet(path), True
+
+    results, complete = fetch_season_results(season)
+    if complete and len(results):
+        _write_parquet(results, path)
+    return results, complete
+
+
+def _build_standings(season, fetch, expected):
+    """
+    Fetch and cache a season's standings once however many callers ask at
+    the same time. The first one fetches outside the season's lock; the
+    others get the stale standings if there are any, else wait for it.
+    """
+    lock = _season_lock(season)
+    while True:
+        with lock:
+            entry = _CACHE.get(season)
+            if _is_fresh(entry, expected):
+                return entry["standings"]
+            done = _BUILDING.get(season)
+            if done is None:
+                done = _BUILDING[season] = threading.Event()
+                break
+        if entry is not None:
+            return entry["standings"]
+        done.wait()
+
+    try:
+        results, complete = fetch(season)
+        standings = SeasonStandings(season, results)
+        with lock:
+            _CACHE[season] = {"standings": standings, "complete": complete, "built": time.monotonic()}
+        return standings
+    finally:
+        with lock:
+            del _BUILDING[season]
+        done.set()
+
+
+def season_standings(season):
+    """
+    Cached SeasonStandings for a season. Completed seasons are built once
+    from their persisted results and never revalidated; an incomplete
+    fetch is kept in memory only and retried after RETRY_SECONDS. For the
+    current season the aggregation is only redone when a finished round
+    has no race results in the cached build (a sprint alone doesn't
+    count); while they are still missing, refetches are rate limited.
+    """
+    season = int(season)
+    if is_completed(season):
+        # Any persisted or complete fetch holds at least one race
+        return _build_standings(season, completed_season_results, None)
+    return _build_standings(season, fetch_season_results, finished_round_numbers(season))
+
+
+# ---------------------------------------------------------
+# PIT STOPS AND DNFS
+# ---------------------------------------------------------
+PIT_DNF_COLUMNS = ["round", "driver", "team", "stops", "pit_time", "dnf", "status"]
+
+_PIT_DNF = {}
+_PIT_DNF_UPDATING = set()
+# (season, round) -> monotonic time after which a failed load is retried
+_PIT_DNF_FAILED = {}
+
+
+def pit_dnf_path(season):
+    return os.path.join(SEASON_DATA_DIR, f"{season}_pit_dnf.parquet")
+
+
+def read_pit_dnf_table(season):
+    """Persisted pit/DNF table, with DNFs re-derived from the stored status."""
+    path = pit_dnf_path(season)
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=PIT_DNF_COLUMNS)
+    table = pd.read_parquet(path)
+    table["dnf"] = is_retirement(table["status"])
+    return table
+
+
+def is_retirement(status):
+    """True for retirements; finishers, non-starters and disqualifications are not DNFs."""
+    status = status.fillna("").astype(str)
+    return ~(
+        status.str.startswith(FINISHED_STATUSES)
+        | status.str.startswith("+")
+        | status.isin(NOT_RETIRED_STATUSES)
+        | (status == "")
+    )
+
+
+def race_pit_dnf_rows(round_no, laps, results):
+    """One row per driver for a race: pit stop count, total pit-lane time, DNF."""
+    stops = pit_durations(laps).groupby("Driver")["Duration"].agg(["size", "sum"])
+
+    status = results["Status"].fillna("").astype(str)
+
+    rows = pd.DataFrame({
+        "round": np.int16(round_no),
+        "driver": results["Abbreviation"].astype(str).to_numpy(),
+        "team": results["TeamName"].astype(str).to_numpy(),
+        "dnf": is_retirement(status).to_numpy(),
+        "status": status.to_numpy(),
+    })
+    rows["stops"] = rows["driver"].map(stops["size"]).fillna(0).astype(np.int8)
+    rows["pit_time"] = rows["driver"].map(stops["sum"]).fillna(0.0).astype(np.float32)
+    return rows[PIT_DNF_COLUMNS]
+
+
+def update_pit_dnf_table(season):
+    """
+    Bring the season's persisted pit/DNF table up to date, processing only
+    rounds that have finished since the last run.
+    """
+    # Imported here so that season standings don't pull in FastF1
+    from utils.cache_utils import get_race_session
+
+    table = read_pit_dnf_table(season)
+
+    new_rows = []
+    for round_no in _pending_rounds(season, table):
+        try:
+            session = get_race_session(season, round_no)
+            new_rows.append(race_pit_dnf_rows(round_no, session.laps, session.results))
+            _PIT_DNF_FAILED.pop((season, round_no), None)
+        except Exception as e:
+            _PIT_DNF_FAILED[(season, round_no)] = time.monotonic() + RETRY_SECONDS
+            logger.warning("Pit/DNF update failed for %s round %s: %s", season, round_no, e)
+
+    if new_rows:
+        table = pd.concat([table, *new_rows] if len(table) else new_rows, ignore_index=True)
+        _write_parquet(table, pit_dnf_path(season))
+
+    _PIT_DNF[season] = table
+    return table
+
+
+def _pending_rounds(season, table):
+    """Finished rounds missing from the table, except recent failed loads."""
+    done = set(table["round"].astype(int))
+    now = time.monotonic()
+    return [
+        r for r in finished_round_numbers(season)
+        if r not in done and _PIT_DNF_FAILED.get((season, r), 0.0) <= now
+    ]
+
+
+def _background_update(season):
+    try:
+        update_pit_dnf_table(season)
+    finally:
+        _PIT_DNF_UPDATING.discard(season)
+
+
+def pit_dnf_table(season):
+    """
+    Season pit/DNF table without blocking: returns what has been processed
+    so far and refreshes pending rounds on a background thread. A round
+    that failed to load is retried after RETRY_SECONDS.
+    """
+    table = _PIT_DNF.get(season)
+    if table is None:
+        table = _PIT_DNF.setdefault(season, read_pit_dnf_table(season))
+
+    if _pending_rounds(season, table):
+        with _season_lock(season):
+            start = season not in _PIT_DNF_UPDATING
+            _PIT_DNF_UPDATING.add(season)
+        if start:
+            threading.Thread(target=_background_update, args=(season,), daemon=True).start()
+
+    return table
+
+
+def cached_season_state(season):
+    """
+    (state of the cached standings, rows in the cached pit/DNF table) of a
+    season, read from memory only; None for whatever is not cached yet.
+    """
+    entry = _CACHE.get(season)
+    table = _PIT_DNF.get(season)
+    return (
+        entry["standings"].state if entry is not None else None,
+        len(table) if table is not None else None,
+    )
+
+
+def pit_dnf_summary(table, by="team"):
+    """Per team (or driver): stops, average pit-lane time per stop, DNFs."""
+    if table.empty:
+        return pd.DataFrame(columns=[by, "stops", "avg_pit", "dnfs"])
+
+    summary = table.groupby(by).agg(
+        stops=("stops", "sum"),
+        pit_time=("pit_time", "sum"),
+        dnfs=("dnf", "sum"),
+    )
+    summary["avg_pit"] = summary["pit_time"] / summary["stops"].where(summary["stops"] > 0)
+    return summary.drop(columns="pit_time").sort_values("avg_pit").reset_index()
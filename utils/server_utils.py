@@ -0,0 +1,169 @@
+import gzip
+import logging
+import sys
+import threading
+
+import dash
+from dash._utils import to_json
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used instead
+    brotli = None
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+CALLBACK_PATH = "/_dash-update-component"
+
+# Callback responses smaller than this are sent as is
+COMPRESS_MIN_BYTES = 16 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# Output of the dash pages router callback
+ROUTER_OUTPUT = ".._pages_content.children..._pages_store.data.."
+
+logger = logging.getLogger("f1dash.server")
+
+# ---------------------------------------------------------
+# RESPONSE COMPRESSION
+# ---------------------------------------------------------
+# Per-output totals: {output: {"responses", "raw_bytes", "sent_bytes"}}
+COMPRESSION_STATS = {}
+_STATS_LOCK = threading.Lock()
+
+
+def _record(output, raw, sent):
+    with _STATS_LOCK:
+        stats = COMPRESSION_STATS.setdefault(
+            output, {"responses": 0, "raw_bytes": 0, "sent_bytes": 0}
+        )
+        stats["responses"] += 1
+        stats["raw_bytes"] += raw
+        stats["sent_bytes"] += sent
+        return dict(stats)
+
+
+def compression_stats():
+    """Snapshot of the per-output totals since the process started."""
+    with _STATS_LOCK:
+        return {output: dict(stats) for output, stats in COMPRESSION_STATS.items()}
+
+
+def _encode(data, accept):
+    if brotli is not None and "br" in accept:
+        return brotli.compress(data, quality=BROTLI_QUALITY), "br"
+    if "gzip" in accept:
+        return gzip.compress(data, compresslevel=GZIP_LEVEL), "gzip"
+    return data, None
+
+
+def install_compression(server, min_bytes=COMPRESS_MIN_BYTES):
+    """
+    Compress callback responses above `min_bytes` with brotli (if
+    installed) or gzip, logging the bytes before and after for each
+    response and the running totals of its output.
+    """
+
+    @server.after_request
+    def compress_callback_response(response):
+        if (
+            request.path != CALLBACK_PATH
+            or response.status_code != 200
+            or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+        ):
+            return response
+
+        data = response.get_data()
+        output = (request.get_json(silent=True) or {}).get("output", "?")
+
+        body, encoding = (
+            _encode(data, request.headers.get("Accept-Encoding", ""))
+            if len(data) >= min_bytes else (data, None)
+        )
+        if encoding is not None:
+            response.set_data(body)
+            response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+
+        totals = _record(output, len(data), len(body))
+        logger.info(
+            "%s: %d -> %d bytes (%s); %d responses, %d -> %d bytes in total",
+            output, len(data), len(body), encoding or "identity",
+            totals["responses"], totals["raw_bytes"], totals["sent_bytes"],
+        )
+        return response
+
+    return server
+
+
+# ---------------------------------------------------------
+# STATIC LAYOUT CACHE
+# ---------------------------------------------------------
+# path -> (version, body)
+_LAYOUTS = {}
+
+
+def _page_version(page):
+    module = sys.modules.get(page["module"])
+    version = getattr(module, "layout_version", None)
+    return version() if callable(version) else None
+
+
+def cached_layout(page):
+    """
+    Serialized router response for a page registered with cache_layout=True.
+    Rebuilt only when the page module's layout_version() (if any) changes.
+    """
+    version = _page_version(page)
+    cached = _LAYOUTS.get(page["relative_path"])
+    if cached is not None and cached[0] == version:
+        return cached
+
+    layout = page["layout"]() if callable(page["layout"]) else page["layout"]
+    body = to_json({
+        "multi": True,
+        "response": {
+            "_pages_content": {"children": layout},
+            "_pages_store": {"data": {"title": page["title"]}},
+        },
+    }).encode()
+
+    cached = (version, body)
+    _LAYOUTS[page["relative_path"]] = cached
+    return cached
+
+
+def install_layout_cache(server):
+    """
+    Answer pages-router callbacks for cached pages from memory instead
+    of serializing the layout again on every navigation. (The router
+    callback is a POST, so browser HTTP caching does not apply to it.)
+    """
+    pages = {
+        page["relative_path"]: page
+        for page in dash.page_registry.values()
+        if page.get("cache_layout") and not callable(page["title"])
+    }
+
+    @server.before_request
+    def serve_cached_layout():
+        if request.path != CALLBACK_PATH or request.method != "POST":
+            return None
+
+        payload = request.get_json(silent=True) or {}
+        if payload.get("output") != ROUTER_OUTPUT:
+            return None
+
+        values = {i["property"]: i.get("value") for i in payload.get("inputs", [])}
+        page = pages.get((values.get("pathname") or "").rstrip("/") or "/")
+        if page is None or values.get("search"):
+            return None
+
+        _, body = cached_layout(page)
+        return server.response_class(body, mimetype="application/json")
+
+    return server
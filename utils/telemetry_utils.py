@@ -0,0 +1,234 @@
+import json
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+# Car data channels and the dtype each is stored with
+CAR_CHANNELS = {
+    "Speed": np.float32,
+    "RPM": np.float32,
+    "nGear": np.int8,
+    "Throttle": np.float32,
+    "Brake": np.bool_,
+    "DRS": np.int8,
+}
+# Position channels, interpolated onto the car data timestamps
+POS_CHANNELS = ("X", "Y")
+
+INDEX_WORKERS = 4
+
+# Exported per-session telemetry: one .npy per channel plus index.json in
+# a versioned directory; CURRENT_FILE names the version readers should use
+TELEMETRY_DATA_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "cache", "telemetry")
+)
+INDEX_FILE = "index.json"
+CURRENT_FILE = "CURRENT"
+VERSION_PREFIX = "index-"
+# Superseded versions kept for readers that resolved them just before a swap
+KEEP_VERSIONS = 2
+
+# ---------------------------------------------------------
+# PER-LAP TELEMETRY INDEX
+# ---------------------------------------------------------
+class TelemetryIndex:
+    """
+    All car telemetry of a session in one contiguous array per channel,
+    plus a (driver number, lap number) -> (start, stop) index into them.
+
+    Built once when the session is loaded; picking any lap of any driver
+    afterwards is an array slice instead of a new get_telemetry() merge.
+    """
+
+    def __init__(self, drivers, channels, index, mapped=False):
+        self.drivers = drivers
+        self.channels = channels
+        self.index = index
+        self.mapped = mapped
+
+    @classmethod
+    def from_session(cls, session):
+        laps = session.laps
+        drivers = [d for d in laps["DriverNumber"].unique() if d in session.car_data]
+
+        with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as pool:
+            blocks = list(pool.map(
+                lambda d: _driver_block(
+                    session.car_data[d],
+                    session.pos_data.get(d) if session.pos_data else None,
+                    laps[laps["DriverNumber"] == d],
+                ),
+                drivers,
+            ))
+
+        drivers = [str(d) for d in drivers]
+        channels, index = {}, {}
+
+        offset = 0
+        for drv, (cols, lap_slices) in zip(drivers, blocks):
+            for lap_no, start, stop in lap_slices:
+                index[(drv, int(lap_no))] = (offset + int(start), offset + int(stop))
+            offset += len(cols["SessionTime"])
+
+        for ch in blocks[0][0] if blocks else ():
+            channels[ch] = np.concatenate([cols[ch] for cols, _ in blocks])
+
+        return cls(drivers, channels, index)
+
+    # -----------------------------------------------------
+    # COLUMNAR EXPORT
+    # -----------------------------------------------------
+    def save(self, path):
+        """
+        Write one .npy per channel plus the lap index as JSON into a new
+        versioned directory under `path`, then atomically replace the
+        CURRENT pointer to it. Readers always see a complete export, the
+        old one until the swap and the new one after it.
+        """
+        version = f"{VERSION_PREFIX}{time.time_ns()}-{os.getpid()}"
+        target = os.path.join(path, version)
+        os.makedirs(target)
+
+        for ch, values in self.channels.items():
+            np.save(os.path.join(target, f"{ch}.npy"), values)
+        with open(os.path.join(target, INDEX_FILE), "w") as f:
+            json.dump({
+                "drivers": self.drivers,
+                "channels": list(self.channels),
+                "laps": [[drv, lap, start, stop] for (drv, lap), (start, stop) in self.index.items()],
+            }, f)
+
+        tmp = os.path.join(path, f"{CURRENT_FILE}.tmp{os.getpid()}")
+        with open(tmp, "w") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(path, CURRENT_FILE))
+
+        versions = sorted(v for v in os.listdir(path) if v.startswith(VERSION_PREFIX))
+        for old in versions[:-KEEP_VERSIONS]:
+            if old != version:
+                shutil.rmtree(os.path.join(path, old), ignore_errors=True)
+
+    @staticmethod
+    def exported(path):
+        """Whether `path` holds an export written by save()."""
+        return os.path.exists(os.path.join(path, CURRENT_FILE))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Memory-map the current export written by save(). Lap slices are
+        views into the mapped files, so worker processes share the OS page
+        cache instead of each holding its own copy of the telemetry.
+        """
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            version = os.path.join(path, f.read().strip())
+        with open(os.path.join(version, INDEX_FILE)) as f:
+            meta = json.load(f)
+
+        channels = {
+            ch: np.load(os.path.join(version, f"{ch}.npy"), mmap_mode="r")
+            for ch in meta["channels"]
+        }
+        index = {(drv, lap): (start, stop) for drv, lap, start, stop in meta["laps"]}
+        return cls(meta["drivers"], channels, index, mapped=True)
+
+    def laps(self, driver):
+        return sorted(lap for drv, lap in self.index if drv == str(driver))
+
+    def lap(self, driver, lap_number):
+        """
+        Telemetry of one lap as {channel: array}. Channel arrays are views
+        into the shared storage; Distance is measured from the lap start.
+        """
+        key = (str(driver), int(lap_number))
+        if key not in self.index:
+            return None
+        start, stop = self.index[key]
+
+        tel = {ch: values[start:stop] for ch, values in self.channels.items()}
+        tel["Distance"] = tel["CumDistance"] - tel["CumDistance"][0] if stop > start else tel["CumDistance"]
+        return tel
+
+    def samples(self, keys):
+        """
+        Sample positions of several laps at once, for vectorized passes over
+        their telemetry. `keys` are (driver number, lap number) pairs present
+        in the index. Returns (lap_id, sample, first, lengths): for every
+        sample the position of its lap in `keys` and its offset into the
+        channel arrays, plus each lap's first position and length in them.
+        """
+        spans = np.array([self.index[(str(d), int(l))] for d, l in keys], dtype=np.int64).reshape(-1, 2)
+        starts, stops = spans.T
+        lengths = stops - starts
+        first = np.r_[0, np.cumsum(lengths)[:-1]].astype(np.int64)
+        lap_id = np.repeat(np.arange(len(keys)), lengths)
+        sample = np.arange(lengths.sum()) - np.repeat(first - starts, lengths)
+        return lap_id, sample, first, lengths
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.channels.values())
+
+
+def telemetry_path(year, gp, session_type):
+    """Export directory of one session's telemetry."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", f"{gp}_{session_type}").strip("_")
+    return os.path.join(TELEMETRY_DATA_DIR, str(year), slug)
+
+
+def _driver_block(car, pos, laps):
+    """Channel arrays of one driver plus (lap, start, stop) slices into them."""
+    t = car["SessionTime"].dt.total_seconds().to_numpy()
+
+    cols = {"SessionTime": t}
+    for ch, dtype in CAR_CHANNELS.items():
+        cols[ch] = car[ch].to_numpy(dtype=dtype) if ch in car else np.zeros(len(t), dtype)
+
+    if pos is not None and len(pos):
+        pt = pos["SessionTime"].dt.total_seconds().to_numpy()
+        for ch in POS_CHANNELS:
+            cols[ch] = np.interp(t, pt, pos[ch].to_numpy(dtype=float)).astype(np.float32)
+    else:
+        for ch in POS_CHANNELS:
+            cols[ch] = np.full(len(t), np.nan, dtype=np.float32)
+
+    # Integrated distance; per-lap distance is a difference of this
+    dt = np.diff(t, prepend=t[:1])
+    cols["CumDistance"] = np.cumsum(cols["Speed"] / 3.6 * dt)
+
+    laps = laps.dropna(subset=["LapStartTime", "Time"])
+    starts = np.searchsorted(t, laps["LapStartTime"].dt.total_seconds().to_numpy())
+    stops = np.searchsorted(t, laps["Time"].dt.total_seconds().to_numpy(), side="right")
+    lap_slices = list(zip(laps["LapNumber"].astype(int), starts, stops))
+
+    return cols, lap_slices
+
+
+# ---------------------------------------------------------
+# LAP SELECTION
+# ---------------------------------------------------------
+FASTEST_LAP = "fastest"
+BEST_ON_COMPOUND = "best:"
+SPECIFIC_LAP = "lap"
+
+
+def select_lap(driver_laps, choice, lap_number=None):
+    """Resolve a lap choice (fastest / best on a compound / lap N) to a lap number."""
+    if choice == SPECIFIC_LAP:
+        return int(lap_number) if lap_number else None
+
+    if choice and choice.startswith(BEST_ON_COMPOUND):
+        compound = choice[len(BEST_ON_COMPOUND):]
+        driver_laps = driver_laps[driver_laps["Compound"] == compound]
+
+    timed = driver_laps.dropna(subset=["LapTime"])
+    if timed.empty:
+        return None
+    return int(timed.loc[timed["LapTime"].idxmin(), "LapNumber"])
@@ -0,0 +1,265 @@
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------
+# CONSTANTS
+# ---------------------------------------------------------
+# Moving-average window (samples) applied to speed before finding corners
+SPEED_SMOOTHING = 5
+# A corner is a speed minimum this far (km/h) below the surrounding maximum
+MIN_CORNER_DROP = 15.0
+# Distance (m) either side of a minimum used for that maximum
+CORNER_WINDOW_M = 250.0
+# Minima closer than this (m) are one corner
+MIN_CORNER_GAP_M = 80.0
+
+# Length (m) of a mini-sector
+MINI_SECTOR_M = 200.0
+
+# Segment kinds
+CORNER = "corner"
+MINI_SECTOR = "mini"
+
+# Circuit segmentation, one JSON file per circuit and season (layouts change)
+SEGMENT_DATA_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "cache", "segments")
+)
+
+SEGMENT_COLUMNS = ["DriverNumber", "LapNumber", "Segment", "MinSpeed", "Time", "Throttle"]
+
+# Points kept of the circuit outline drawn on the track map
+TRACK_MAP_POINTS = 1200
+
+# ---------------------------------------------------------
+# CORNERS
+# ---------------------------------------------------------
+def detect_corners(distance, speed):
+    """
+    Corner apex distances of a reference lap: smoothed speed minima that
+    sit at least MIN_CORNER_DROP below the fastest point within
+    CORNER_WINDOW_M either side. Returns a sorted float array.
+    """
+    distance = np.asarray(distance, dtype=float)
+    speed = np.asarray(speed, dtype=float)
+    if distance.size < 3:
+        return np.empty(0)
+
+    k = min(SPEED_SMOOTHING, distance.size)
+    v = np.convolve(speed, np.ones(k) / k, mode="same")
+
+    minima = np.flatnonzero((v[1:-1] < v[:-2]) & (v[1:-1] <= v[2:])) + 1
+    if minima.size == 0:
+        return np.empty(0)
+
+    # Fastest point around each minimum, one reduceat over [lo, hi) pairs
+    lo = np.searchsorted(distance, distance[minima] - CORNER_WINDOW_M)
+    hi = np.searchsorted(distance, distance[minima] + CORNER_WINDOW_M, side="right")
+    padded = np.append(v, -np.inf)  # lets hi reach len(v)
+    peaks = np.maximum.reduceat(padded, np.column_stack([lo, hi]).ravel())[::2]
+    minima = minima[peaks - v[minima] >= MIN_CORNER_DROP]
+
+    # Merge minima of the same corner, keeping the slowest
+    apex = []
+    for i in minima:
+        if apex and distance[i] - distance[apex[-1]] < MIN_CORNER_GAP_M:
+            if v[i] < v[apex[-1]]:
+                apex[-1] = i
+        else:
+            apex.append(i)
+
+    return distance[apex]
+
+
+# ---------------------------------------------------------
+# CIRCUIT SEGMENTATION
+# ---------------------------------------------------------
+class TrackSegments:
+    """
+    Corner and mini-sector boundaries of one circuit, in metres from the
+    start line. Corner segments run between the midpoints of consecutive
+    apexes; mini-sectors are MINI_SECTOR_M long. `outline` is the
+    reference lap's racing line ({"Distance", "X", "Y"}, decimated to
+    TRACK_MAP_POINTS) when position data was available.
+    """
+
+    def __init__(self, circuit, apexes, length, outline=None):
+        self.circuit = circuit
+        self.apexes = np.asarray(apexes, dtype=float)
+        self.length = float(length)
+        self.outline = (
+            {k: np.asarray(v, dtype=float) for k, v in outline.items()}
+            if outline else None
+        )
+        self.edges = {
+            CORNER: np.r_[0.0, (self.apexes[1:] + self.apexes[:-1]) / 2],
+            MINI_SECTOR: np.arange(0.0, self.length, MINI_SECTOR_M),
+        }
+
+    @classmethod
+    def from_lap(cls, circuit, distance, speed, apexes=None, x=None, y=None):
+        """Segmentation from a reference lap; corners detected when not given."""
+        distance = np.asarray(distance, dtype=float)
+        if apexes is None:
+            apexes = detect_corners(distance, speed)
+
+        outline = None
+        if x is not None and y is not None and not np.isnan(x).all():
+            keep = decimate(distance.size)
+            outline = {
+                "Distance": distance[keep].round(1),
+                "X": np.asarray(x, dtype=float)[keep].round(1),
+                "Y": np.asarray(y, dtype=float)[keep].round(1),
+            }
+        return cls(circuit, apexes, distance[-1] if distance.size else 0.0, outline)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({
+                "circuit": self.circuit,
+                "apexes": self.apexes.tolist(),
+                "length": self.length,
+                "outline": (
+                    {k: v.tolist() for k, v in self.outline.items()}
+                    if self.outline else None
+                ),
+            }, f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            meta = json.load(f)
+        return cls(meta["circuit"], meta["apexes"], meta["length"], meta.get("outline"))
+
+    def labels(self, kind=MINI_SECTOR):
+        prefix = "T" if kind == CORNER else "MS"
+        return [f"{prefix}{i}" for i in range(1, len(self.edges[kind]) + 1)]
+
+    def assign(self, distance, kind=MINI_SECTOR):
+        """Segment (0-based) of each lap distance."""
+        seg = np.searchsorted(self.edges[kind], distance, side="right") - 1
+        return np.clip(seg, 0, len(self.edges[kind]) - 1)
+
+
+def decimate(n, budget=TRACK_MAP_POINTS):
+    """Evenly spaced indices keeping at most `budget` of `n` samples."""
+    if n <= budget:
+        return np.arange(n)
+    return np.unique(np.linspace(0, n - 1, budget).round().astype(int))
+
+
+def segments_path(year, circuit):
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", str(circuit)).strip("_")
+    return os.path.join(SEGMENT_DATA_DIR, str(year), f"{slug}.json")
+
+
+def _lap_stamps(laps, keys):
+    """(LapStartTime, Time) in session seconds for each key; NaN where unknown."""
+    if laps is None:
+        nan = np.full(len(keys), np.nan)
+        return nan, nan
+    stamps = laps.set_index([laps["DriverNumber"].astype(str), laps["LapNumber"].astype(int)])
+    stamps = stamps[~stamps.index.duplicated()].reindex(pd.MultiIndex.from_tuples(keys))
+    return (
+        stamps["LapStartTime"].dt.total_seconds().to_numpy(dtype=float),
+        stamps["Time"].dt.total_seconds().to_numpy(dtype=float),
+    )
+
+
+def segment_stats(index, segments, kind=MINI_SECTOR, keys=None, laps=None):
+    """
+    Minimum speed, time and mean throttle per (lap, segment) for the laps
+    `keys` of a TelemetryIndex (all laps by default), in one pass:
+    samples are bucketed with searchsorted and every statistic is a
+    reduceat over the resulting runs.
+
+    With the session's `laps`, a lap's first segment starts at its
+    LapStartTime and its last ends at its Time, so segment times add up
+    to the lap time; otherwise the first and last samples are used.
+    """
+    keys = [k for k in (keys if keys is not None else index.index) if k in index.index]
+    keys = [k for k in keys if index.index[k][1] > index.index[k][0]]
+    if not keys or not len(segments.edges[kind]):
+        return pd.DataFrame(columns=SEGMENT_COLUMNS)
+
+    lap_id, sample, first, lengths = index.samples(keys)
+    ch = index.channels
+    t = np.asarray(ch["SessionTime"])[sample]
+    dist = np.asarray(ch["CumDistance"])[sample]
+    dist = dist - np.repeat(dist[first], lengths)
+
+    # Distance only grows within a lap, so (lap, segment) runs are contiguous
+    edges = segments.edges[kind]
+    seg = segments.assign(dist, kind)
+    group = lap_id * len(edges) + seg
+    runs = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    run_lap, run_seg = lap_id[runs], seg[runs]
+    counts = np.diff(np.r_[runs, len(sample)])
+
+    min_speed = np.minimum.reduceat(np.asarray(ch["Speed"])[sample], runs)
+    throttle = np.add.reduceat(np.asarray(ch["Throttle"])[sample].astype(float), runs) / counts
+
+    # Segment entry time, interpolated at the boundary crossing
+    entry = t[runs].copy()
+    crossing = runs != first[run_lap]
+    k = runs[crossing]
+    span = np.maximum(dist[k] - dist[k - 1], 1e-9)
+    frac = np.clip((edges[seg[k]] - dist[k - 1]) / span, 0.0, 1.0)
+    entry[crossing] = t[k - 1] + frac * (t[k] - t[k - 1])
+
+    # Outer boundaries: the lap's own start and end stamps when known
+    lap_start, lap_end = _lap_stamps(laps, keys)
+    lap_start = np.where(np.isnan(lap_start), t[first], lap_start)
+    lap_end = np.where(np.isnan(lap_end), t[first + lengths - 1], lap_end)
+    entry[~crossing] = lap_start[run_lap[~crossing]]
+
+    last = np.r_[run_lap[1:] != run_lap[:-1], True]
+    exit_ = np.r_[entry[1:], 0.0]
+    exit_[last] = lap_end[run_lap[last]]
+
+    numbers, lap_numbers = zip(*keys)
+    return pd.DataFrame({
+        "DriverNumber": np.asarray(numbers, dtype=object)[run_lap],
+        "LapNumber": np.asarray(lap_numbers, dtype=int)[run_lap],
+        "Segment": run_seg + 1,
+        "MinSpeed": min_speed,
+        "Time": exit_ - entry,
+        "Throttle": throttle,
+    })
+
+
+# ---------------------------------------------------------
+# TRACK MAP
+# ---------------------------------------------------------
+def lap_values_at(segments, tel, channel, nearest=False):
+    """
+    A lap's `channel` at every outline point. The lap's distance is scaled
+    to the reference lap length; discrete channels (gear) take the nearest
+    sample instead of interpolating.
+    """
+    distance = np.asarray(tel["Distance"], dtype=float)
+    values = np.asarray(tel[channel], dtype=float)
+    at = segments.outline["Distance"] / max(segments.length, 1.0) * distance[-1]
+
+    if nearest:
+        return values[np.clip(np.searchsorted(distance, at), 0, len(values) - 1)]
+    return np.interp(at, distance, values)
+
+
+def segment_leaders(stats, keys, n_segments):
+    """
+    Position in `keys` of the (driver number, lap number) with the lowest
+    time in each segment of a segment_stats table; -1 where none has one.
+    """
+    times = np.full((len(keys), n_segments), np.inf)
+    for i, (drv, lap) in enumerate(keys):
+        rows = stats[(stats["DriverNumber"] == str(drv)) & (stats["LapNumber"] == int(lap))]
+        times[i, rows["Segment"].to_numpy() - 1] = rows["Time"].to_numpy()
+
+    leaders = np.argmin(times, axis=0) if keys else np.zeros(n_segments, dtype=int)
+    leaders[~np.isfinite(times.min(axis=0, initial=np.inf))] = -1
+    return leaders